@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+股票计算器性能基准 / IB Stock Calculator Benchmarks
+
+测量 calculate_commission、calculate_buy_cost、calculate_sell_proceeds、calculate_profit
+和 calculate_multiple_transactions 的单次调用延迟、吞吐量和峰值内存，
+结果保存为JSON基线，并可与已保存的基线比较以发现性能回退。
+
+用法:
+    python3 benchmark_ib_calculator.py                            # 运行并打印结果
+    python3 benchmark_ib_calculator.py --save baseline.json       # 保存基线
+    python3 benchmark_ib_calculator.py --compare baseline.json    # 与基线比较，回退时退出码为1，环境不一致时为2
+    python3 benchmark_ib_calculator.py --sizes 1000,10000000      # 指定多笔交易的账本规模
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List, Optional
+
+from ib_calculator import IBStockCalculator
+
+
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+DEFAULT_CALLS = 20000
+
+# 与基线比较前必须一致的运行环境字段
+ENVIRONMENT_FIELDS = ('python', 'implementation', 'machine', 'processor', 'cpu_count', 'backend', 'cache_size')
+
+
+def _ledger(size: int, seed: int = 42) -> Iterator[Dict]:
+    """逐笔生成随机账本，不在内存中保留整个列表"""
+    rng = random.Random(seed)
+    held = 0
+    for _ in range(size):
+        if held and rng.random() < 0.4:
+            shares = rng.randint(1, held)
+            held -= shares
+            yield {'type': 'sell', 'shares': shares, 'price': round(rng.uniform(1, 500), 2)}
+        else:
+            shares = rng.choice((1, 10, 100, 500, rng.randint(1, 5000)))
+            held += shares
+            yield {'type': 'buy', 'shares': shares, 'price': round(rng.uniform(1, 500), 2)}
+
+
+def _measure(func: Callable[[], None], calls: int, repeat: int = 3) -> Dict:
+    """
+    计时并测量峰值内存
+
+    计时取 repeat 次运行中的最短时间以减少噪声；内存单独再运行一次，
+    避免 tracemalloc 的开销影响延迟数据。
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'calls': calls,
+        'seconds': round(seconds, 6),
+        'per_call_us': round(seconds / calls * 1e6, 4),
+        'throughput_per_s': round(calls / seconds, 1) if seconds else None,
+        'peak_memory_bytes': peak
+    }
+
+
+def run_benchmarks(calculator: IBStockCalculator, calls: int = DEFAULT_CALLS,
+                   sizes=DEFAULT_SIZES, repeat: int = 3) -> Dict[str, Dict]:
+    """
+    运行所有基准
+
+    Args:
+        calculator: 被测计算器
+        calls: 单笔方法的调用次数
+        sizes: calculate_multiple_transactions 的账本规模
+        repeat: 每个基准的计时次数 (取最短时间)
+
+    Returns:
+        {基准名称: 测量结果}
+    """
+    rng = random.Random(7)
+    trades = [(rng.randint(1, 5000), round(rng.uniform(1, 500), 2)) for _ in range(calls)]
+
+    def per_trade(method):
+        def run():
+            for shares, price in trades:
+                method(shares, price)
+        return run
+
+    def profits():
+        for shares, price in trades:
+            calculator.calculate_profit(shares, price, shares, round(price * 1.05, 2))
+
+    results = {
+        'calculate_commission': _measure(per_trade(calculator.calculate_commission), calls, repeat),
+        'calculate_buy_cost': _measure(per_trade(calculator.calculate_buy_cost), calls, repeat),
+        'calculate_sell_proceeds': _measure(per_trade(calculator.calculate_sell_proceeds), calls, repeat),
+        'calculate_profit': _measure(profits, calls, repeat),
+    }
+    for size in sizes:
+        # 账本在计时前生成，只测量计算本身；大账本只计时一次，避免 10^7 笔的运行时间成倍增加
+        ledger = list(_ledger(size))
+        results[f'calculate_multiple_transactions[{size}]'] = _measure(
+            lambda: calculator.calculate_multiple_transactions(ledger), size,
+            repeat if size <= 10 ** 5 else 1
+        )
+        del ledger
+    return results
+
+
+def environment(backend: str, cache_size: Optional[int]) -> Dict:
+    """返回本次运行的环境信息，保存在基线中用于比较前的校验"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'backend': backend,
+        'cache_size': cache_size,
+    }
+
+
+def environment_mismatches(report: Dict, baseline: Dict) -> List[str]:
+    """
+    检查本次运行与基线的环境是否一致
+
+    旧基线中没有的字段不参与比较。
+
+    Returns:
+        不一致的说明列表，为空表示可以比较
+    """
+    return [
+        f"{field}: {baseline[field]!r} -> {report.get(field)!r}"
+        for field in ENVIRONMENT_FIELDS
+        if field in baseline and baseline[field] != report.get(field)
+    ]
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    与基线比较单次调用延迟
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        tolerance: 允许的相对变慢比例 (0.2 表示慢20%以内不算回退)
+
+    Returns:
+        回退说明列表，为空表示没有回退
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = result['per_call_us'] / base['per_call_us'] if base['per_call_us'] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {base['per_call_us']}us -> {result['per_call_us']}us (+{(ratio - 1) * 100:.1f}%)"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='IBStockCalculator 性能基准 / benchmarks')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='多笔交易的账本规模，逗号分隔 (例如 1000,10000000)')
+    parser.add_argument('--calls', type=int, default=DEFAULT_CALLS, help='单笔方法的调用次数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个基准的计时次数，取最短时间')
+    parser.add_argument('--backend', choices=IBStockCalculator.BACKENDS, default='decimal')
+    parser.add_argument('--cache-size', type=int, default=None, help='启用LRU缓存')
+    parser.add_argument('--save', metavar='PATH', help='把结果保存为基线JSON')
+    parser.add_argument('--compare', metavar='PATH', help='与基线JSON比较')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对变慢比例 (默认0.2)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    calculator = IBStockCalculator(backend=args.backend, cache_size=args.cache_size)
+    results = run_benchmarks(calculator, args.calls, sizes, args.repeat)
+
+    report = dict(environment(args.backend, args.cache_size), results=results)
+
+    print(f"{'基准 Benchmark':<45} {'us/call':>10} {'calls/s':>12} {'peak KiB':>10}")
+    print("-" * 80)
+    for name, result in results.items():
+        print(f"{name:<45} {result['per_call_us']:>10.3f} {result['throughput_per_s'] or 0:>12.0f} "
+              f"{result['peak_memory_bytes'] / 1024:>10.1f}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\n基线已保存 Baseline saved: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        mismatches = environment_mismatches(report, baseline)
+        if mismatches:
+            print("\n运行环境与基线不一致，无法比较 Environment differs from baseline:")
+            for line in mismatches:
+                print(f"  {line}")
+            return 2
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print("\n性能回退 Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n没有性能回退 No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
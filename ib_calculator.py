@@ -4,15 +4,342 @@ Interactive Brokers Stock Cost and Profit Calculator
 盈透证券股票成本与盈利计算器
 """
 
+import math
+import sys
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
 from decimal import Decimal, ROUND_HALF_UP
-from typing import List, Dict, Tuple
+from functools import wraps
+from types import MappingProxyType
+from typing import List, Dict, Tuple, Sequence, Union, Iterable, Iterator, Optional
+
+
+
+# 价格的整数定点单位: 1美元 = 1,000,000 微单位
+MICROS_PER_UNIT = 1_000_000
+
+_CENT = Decimal('0.01')
+_BASIS_POINT = Decimal('0.0001')
+
+# numpy 模块；_UNLOADED 表示尚未尝试导入，None 表示未安装
+_UNLOADED = object()
+_np = _UNLOADED
+
+
+def _numpy():
+    """
+    按需导入numpy (可选依赖)
+    
+    只有批量、网格和保本价格接口需要numpy，延迟到第一次调用时导入，
+    单笔计算和命令行不承担导入开销。
+    
+    Returns:
+        numpy 模块，未安装时返回 None (批量接口退回纯Python实现)
+    """
+    global _np
+    if _np is _UNLOADED:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _np = numpy
+    return _np
+
+
+def _has_array(*values) -> bool:
+    """values 中是否有NumPy数组；传入数组时numpy必然已被导入，判断本身不触发导入"""
+    numpy = sys.modules.get('numpy')
+    return (numpy is not None and _numpy() is not None
+            and any(isinstance(value, numpy.ndarray) for value in values))
+
+
+def _scaled_int(value: Decimal) -> Tuple[int, int]:
+    """
+    把Decimal拆成 (整数, 小数位数)，使 value == 整数 / 10**小数位数
+    """
+    places = max(0, -value.as_tuple().exponent)
+    return int(value.scaleb(places)), places
+
+
+def _round_div(numerator: int, denominator: int) -> int:
+    """
+    整数除法并按ROUND_HALF_UP舍入 (远离零方向)，denominator必须为正
+    """
+    quotient = (2 * abs(numerator) + denominator) // (2 * denominator)
+    return quotient if numerator >= 0 else -quotient
+
+
+def _to_cents(value: int, places: int) -> int:
+    """把 value / 10**places 按ROUND_HALF_UP换算为美分"""
+    if places >= 2:
+        return _round_div(value, 10 ** (places - 2))
+    return value * 10 ** (2 - places)
+
+
+def _cents_fraction(value: int, places: int) -> Tuple[int, int]:
+    """把 value / 10**places 美元写成 美分 = 分子 / 分母 的形式"""
+    if places >= 2:
+        return value, 10 ** (places - 2)
+    return value * 10 ** (2 - places), 1
+
+
+def _from_scaled(value: int, places: int, negative: bool = False) -> Decimal:
+    """
+    把 value / 10**places 转为指数为 -places 的Decimal (places 为2或4)
+    
+    negative 为 True 且 value 为0时返回 -0，与Decimal对负数quantize的结果一致。
+    """
+    if value == 0 and negative:
+        return Decimal((1, (0,), -places))
+    return Decimal(value) * (_CENT if places == 2 else _BASIS_POINT)
+
+
+def capped_commission(shares: Decimal, trade_value: Decimal, rate: Decimal,
+                      min_commission: Decimal, max_commission_rate: Decimal) -> Decimal:
+    """
+    计算每股计费的佣金，应用最低佣金和最高佣金限制并舍入到分
+    
+    IBStockCalculator 和 ib_schedules 中的佣金方案共用这一计算。
+    
+    Args:
+        shares: 股数
+        trade_value: 交易额
+        rate: 每股费率
+        min_commission: 最低佣金
+        max_commission_rate: 最高佣金 (占交易额比例)
+        
+    Returns:
+        佣金金额
+    """
+    # 计算基础佣金 (每股费率)
+    commission = shares * rate
+    
+    # 应用最低佣金
+    if commission < min_commission:
+        commission = min_commission
+    
+    # 应用最高佣金限制 (交易额的1%)
+    max_commission = trade_value * max_commission_rate
+    if commission > max_commission:
+        commission = max_commission
+    
+    return commission.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _price_to_micros(price) -> Optional[int]:
+    """
+    把价格按 str(price) 的十进制表示精确换算为微单位
+    
+    无法精确表示 (超过6位小数、科学计数法、nan等) 时返回None。
+    """
+    if type(price) is float:
+        # 快速路径: 最多6位小数的价格乘以10**6后取整，再除回来必然等于原值
+        if -1e9 < price < 1e9:
+            micros = round(price * MICROS_PER_UNIT)
+            if micros / MICROS_PER_UNIT == price:
+                return micros
+        return None
+    if type(price) is int:
+        return price * MICROS_PER_UNIT
+    
+    text = str(price)
+    whole, _, frac = text.partition('.')
+    negative = whole.startswith('-')
+    digits = whole.lstrip('+-')
+    if len(frac) > 6 or not (digits or frac) or not (digits or '0').isdigit() \
+            or (frac and not frac.isdigit()):
+        return None
+    micros = int(digits or '0') * MICROS_PER_UNIT + int(frac.ljust(6, '0') or '0')
+    return -micros if negative else micros
+
+
+def _np_to_cents(values: 'np.ndarray', places: int) -> 'np.ndarray':
+    """_to_cents 的NumPy版本，values 必须为非负int64数组"""
+    if places >= 2:
+        divisor = 10 ** (places - 2)
+        return (2 * values + divisor) // (2 * divisor)
+    return values * 10 ** (2 - places)
+
+
+# cache_size 启用时带LRU缓存的方法
+_CACHED_METHODS = ('calculate_commission', 'calculate_buy_cost', 'calculate_sell_proceeds')
+
+
+def _lru_cached(calculator: 'IBStockCalculator', method):
+    """
+    为计算器实例的方法加上LRU缓存 (只在 cache_size 启用时安装到实例上，未启用时没有额外开销)
+    
+    参数类型也是键的一部分: 100 与 100.0 输出的 Decimal 表示不同。
+    字典结果包装为只读映射，调用方无法修改共享的缓存条目。
+    """
+    name = method.__name__
+    cache = calculator._cache
+    
+    @wraps(method)
+    def wrapper(shares, price):
+        key = (name, shares, price, type(shares), type(price))
+        try:
+            result = cache[key]
+        except KeyError:
+            pass
+        else:
+            cache.move_to_end(key)
+            calculator._cache_hits += 1
+            return result
+        
+        calculator._cache_misses += 1
+        result = method(shares, price)
+        if isinstance(result, dict):
+            result = MappingProxyType(result)
+        cache[key] = result
+        if len(cache) > calculator.cache_size:
+            cache.popitem(last=False)
+            calculator._cache_evictions += 1
+        return result
+    
+    return wrapper
+
+
+class _LazyResult(Mapping):
+    """
+    延迟舍入的只读结果对象
+    
+    只保存未舍入的原始值，读取字段时才quantize。支持与字典相同的
+    result['field'] 访问、in、keys()/items() 和与字典的相等比较，
+    也可以用属性方式读取字段。
+    """
+    
+    __slots__ = ()
+    _FIELDS: Tuple[str, ...] = ()
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 是只读的")
+    
+    def __getitem__(self, key: str):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._FIELDS)
+    
+    def __len__(self) -> int:
+        return len(self._FIELDS)
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class BuyCostResult(_LazyResult):
+    """calculate_buy_cost 的延迟舍入结果"""
+    
+    __slots__ = ('shares', 'price', 'commission', '_stock_cost')
+    _FIELDS = ('shares', 'price', 'stock_cost', 'commission', 'total_cost', 'avg_cost_per_share')
+    
+    def __init__(self, shares: Decimal, price: Decimal, stock_cost: Decimal, commission: Decimal):
+        _set = object.__setattr__
+        _set(self, 'shares', shares)
+        _set(self, 'price', price)
+        _set(self, 'commission', commission)
+        _set(self, '_stock_cost', stock_cost)
+    
+    @property
+    def stock_cost(self) -> Decimal:
+        return self._stock_cost.quantize(_CENT, rounding=ROUND_HALF_UP)
+    
+    @property
+    def total_cost(self) -> Decimal:
+        return (self._stock_cost + self.commission).quantize(_CENT, rounding=ROUND_HALF_UP)
+    
+    @property
+    def avg_cost_per_share(self) -> Decimal:
+        return ((self._stock_cost + self.commission) / self.shares).quantize(
+            _BASIS_POINT, rounding=ROUND_HALF_UP
+        )
+
+
+class SellProceedsResult(_LazyResult):
+    """calculate_sell_proceeds 的延迟舍入结果"""
+    
+    __slots__ = ('shares', 'price', 'commission', '_gross_proceeds')
+    _FIELDS = ('shares', 'price', 'gross_proceeds', 'commission', 'net_proceeds', 'avg_proceeds_per_share')
+    
+    def __init__(self, shares: Decimal, price: Decimal, gross_proceeds: Decimal, commission: Decimal):
+        _set = object.__setattr__
+        _set(self, 'shares', shares)
+        _set(self, 'price', price)
+        _set(self, 'commission', commission)
+        _set(self, '_gross_proceeds', gross_proceeds)
+    
+    @property
+    def gross_proceeds(self) -> Decimal:
+        return self._gross_proceeds.quantize(_CENT, rounding=ROUND_HALF_UP)
+    
+    @property
+    def net_proceeds(self) -> Decimal:
+        return (self._gross_proceeds - self.commission).quantize(_CENT, rounding=ROUND_HALF_UP)
+    
+    @property
+    def avg_proceeds_per_share(self) -> Decimal:
+        return ((self._gross_proceeds - self.commission) / self.shares).quantize(
+            _BASIS_POINT, rounding=ROUND_HALF_UP
+        )
+
+
+class ProfitResult(_LazyResult):
+    """calculate_profit 的延迟舍入结果，字段在读取时才计算"""
+    
+    __slots__ = ('buy_info', 'sell_info', 'remaining_shares', '_sell_shares')
+    _FIELDS = ('buy_info', 'sell_info', 'cost_for_sold_shares', 'profit', 'profit_percentage',
+               'remaining_shares', 'remaining_cost', 'remaining_avg_cost')
+    
+    def __init__(self, buy_info: Mapping, sell_info: Mapping, buy_shares: int, sell_shares: int):
+        _set = object.__setattr__
+        _set(self, 'buy_info', buy_info)
+        _set(self, 'sell_info', sell_info)
+        _set(self, 'remaining_shares', buy_shares - sell_shares)
+        _set(self, '_sell_shares', sell_shares)
+    
+    def _cost_for_sold(self) -> Decimal:
+        return self.buy_info['avg_cost_per_share'] * Decimal(str(self._sell_shares))
+    
+    @property
+    def cost_for_sold_shares(self) -> Decimal:
+        return self._cost_for_sold().quantize(_CENT, rounding=ROUND_HALF_UP)
+    
+    @property
+    def profit(self) -> Decimal:
+        return (self.sell_info['net_proceeds'] - self._cost_for_sold()).quantize(
+            _CENT, rounding=ROUND_HALF_UP
+        )
+    
+    @property
+    def profit_percentage(self) -> Decimal:
+        cost = self._cost_for_sold()
+        return (((self.sell_info['net_proceeds'] - cost) / cost) * Decimal('100')).quantize(
+            _CENT, rounding=ROUND_HALF_UP
+        )
+    
+    @property
+    def remaining_cost(self) -> Decimal:
+        return (self.buy_info['total_cost'] - self._cost_for_sold()).quantize(
+            _CENT, rounding=ROUND_HALF_UP
+        )
+    
+    @property
+    def remaining_avg_cost(self) -> Decimal:
+        return self.buy_info['avg_cost_per_share'] if self.remaining_shares > 0 else Decimal('0')
 
 
 class IBStockCalculator:
     """Interactive Brokers股票成本和盈利计算器"""
     
+    BACKENDS = ('decimal', 'integer')
+    
     def __init__(self, commission_rate: float = 0.0035, min_commission: float = 0.35, 
-                 max_commission_rate: float = 0.01):
+                 max_commission_rate: float = 0.01, backend: str = 'decimal',
+                 cache_size: Optional[int] = None, lazy_results: bool = False):
         """
         初始化计算器
         
@@ -20,10 +347,132 @@ class IBStockCalculator:
             commission_rate: 佣金费率 (默认0.0035，即每股$0.0035)
             min_commission: 最低佣金 (默认$0.35)
             max_commission_rate: 最高佣金费率 (默认1%，即交易额的0.01)
+            backend: 计算后端。'decimal' (默认) 全程使用Decimal；
+                'integer' 内部使用整数微单位运算，只在输出时构造Decimal，
+                结果与 'decimal' 完全一致 (包括舍入)
+            cache_size: 启用LRU缓存并设置最大条目数 (默认None，不缓存)。
+                缓存 calculate_commission、calculate_buy_cost 和
+                calculate_sell_proceeds 的结果，字典结果以只读映射返回
+            lazy_results: 为True时 calculate_buy_cost、calculate_sell_proceeds 和
+                calculate_profit 返回只读的 __slots__ 结果对象 (BuyCostResult 等)，
+                只保存原始值，读取字段时才舍入，可像字典一样访问。仅支持 'decimal' 后端
         """
-        self.commission_rate = Decimal(str(commission_rate))
-        self.min_commission = Decimal(str(min_commission))
-        self.max_commission_rate = Decimal(str(max_commission_rate))
+        if backend not in self.BACKENDS:
+            raise ValueError(f"未知的计算后端 {backend!r}，可选: {', '.join(self.BACKENDS)}")
+        if cache_size is not None and cache_size <= 0:
+            raise ValueError("cache_size 必须为正整数")
+        if lazy_results and backend != 'decimal':
+            raise ValueError("lazy_results 仅支持 'decimal' 后端")
+        self.backend = backend
+        self.lazy_results = lazy_results
+        self.cache_size = cache_size
+        self._cache = OrderedDict() if cache_size else None
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
+        
+        self._commission_rate = Decimal(str(commission_rate))
+        self._min_commission = Decimal(str(min_commission))
+        self._max_commission_rate = Decimal(str(max_commission_rate))
+        self._rates_changed()
+        self._install_cache()
+    
+    def _install_cache(self):
+        """启用缓存时在实例上用带缓存的包装覆盖 _CACHED_METHODS"""
+        if self._cache is not None:
+            for name in _CACHED_METHODS:
+                setattr(self, name, _lru_cached(self, getattr(type(self), name).__get__(self)))
+    
+    def __getstate__(self) -> Dict:
+        # 缓存包装是闭包，不能pickle；恢复时重新安装
+        state = self.__dict__.copy()
+        if self._cache is not None:
+            for name in _CACHED_METHODS:
+                state.pop(name, None)
+        return state
+    
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._install_cache()
+    
+    @property
+    def commission_rate(self) -> Decimal:
+        """每股佣金费率"""
+        return self._commission_rate
+    
+    @commission_rate.setter
+    def commission_rate(self, value: float):
+        self._commission_rate = Decimal(str(value))
+        self._rates_changed()
+    
+    @property
+    def min_commission(self) -> Decimal:
+        """最低佣金"""
+        return self._min_commission
+    
+    @min_commission.setter
+    def min_commission(self, value: float):
+        self._min_commission = Decimal(str(value))
+        self._rates_changed()
+    
+    @property
+    def max_commission_rate(self) -> Decimal:
+        """最高佣金费率 (占交易额的比例)"""
+        return self._max_commission_rate
+    
+    @max_commission_rate.setter
+    def max_commission_rate(self, value: float):
+        self._max_commission_rate = Decimal(str(value))
+        self._rates_changed()
+    
+    def _rates_changed(self):
+        """费率变化后重新计算整数费率并清空缓存条目"""
+        rate, rate_places = _scaled_int(self._commission_rate)
+        max_rate, max_rate_places = _scaled_int(self._max_commission_rate)
+        min_cents = _to_cents(*_scaled_int(self._min_commission))
+        # 批量接口使用的费率: (每股费率, 小数位数, 最高费率, 上限小数位数, 最低佣金美分)
+        self._scaled_rates = (rate, rate_places, max_rate, 6 + max_rate_places, min_cents)
+        # 整数后端使用的舍入项: 美分 = (x * 2num + div) // 2div
+        rate_num, rate_div = _cents_fraction(rate, rate_places)
+        max_num, max_div = _cents_fraction(max_rate, 6 + max_rate_places)
+        self._commission_terms = (2 * rate_num, rate_div, 2 * rate_div,
+                                  2 * max_num, max_div, 2 * max_div, min_cents)
+        if self._cache is not None:
+            self._cache.clear()
+    
+    def cache_info(self) -> Dict[str, int]:
+        """
+        获取缓存统计
+        
+        Returns:
+            包含 hits、misses、evictions、size、maxsize 的字典
+        """
+        return {
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'evictions': self._cache_evictions,
+            'size': len(self._cache) if self._cache is not None else 0,
+            'maxsize': self.cache_size or 0
+        }
+    
+    def cache_clear(self):
+        """清空缓存条目和统计"""
+        if self._cache is not None:
+            self._cache.clear()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
+    
+    def _commission_cents(self, shares: int, micros: int) -> int:
+        """按整数运算计算佣金 (美分)，shares 和 micros (微单位价格) 必须非负"""
+        rate2, rate_div, rate_div2, max2, max_div, max_div2, min_cents = self._commission_terms
+        commission = (shares * rate2 + rate_div) // rate_div2
+        if commission < min_cents:
+            commission = min_cents
+        max_commission = (shares * micros * max2 + max_div) // max_div2
+        if commission > max_commission:
+            commission = max_commission
+        return commission
     
     def calculate_commission(self, shares: int, price: float) -> Decimal:
         """
@@ -36,23 +485,348 @@ class IBStockCalculator:
         Returns:
             佣金金额
         """
+        if self.backend == 'integer' and shares >= 0:
+            micros = _price_to_micros(price)
+            if micros is not None and micros >= 0:
+                return Decimal(self._commission_cents(shares, micros)) * _CENT
+        
         shares_dec = Decimal(str(shares))
-        price_dec = Decimal(str(price))
-        trade_value = shares_dec * price_dec
+        return capped_commission(shares_dec, shares_dec * Decimal(str(price)), self.commission_rate,
+                                 self.min_commission, self.max_commission_rate)
+    
+    def calculate_commissions_cents(self, shares: Sequence[int],
+                                    prices: Sequence[float]) -> Union[array, 'np.ndarray']:
+        """
+        批量计算IB佣金，结果以美分为单位的整数返回
         
-        # 计算基础佣金 (每股费率)
-        commission = shares_dec * self.commission_rate
+        每股费率、最低佣金和最高佣金限制均以整数运算作用于整个数组，
+        结果与逐笔调用 calculate_commission 完全一致 (精确到分)。
+        ROUND_HALF_UP 是单调的，因此先分别舍入基础佣金、最低佣金和
+        最高佣金再取 min/max，与先取 min/max 再舍入的结果相同。
         
-        # 应用最低佣金
-        if commission < self.min_commission:
-            commission = self.min_commission
+        Args:
+            shares: 股票数量数组 (NumPy数组、array.array或任意整数序列)
+            prices: 股票价格数组。最多6位小数的价格按微单位整数计算，
+                其余价格 (更多小数位等) 逐个走 calculate_commission 的Decimal路径
+            
+        Returns:
+            佣金数组 (美分)。输入为NumPy数组时返回int64的NumPy数组，
+            否则返回 array.array('q')
+        """
+        if _has_array(shares, prices):
+            np = _numpy()
+            shares_arr = np.asarray(shares, dtype=np.int64)
+            prices_arr = np.asarray(prices, dtype=np.float64)
+            if shares_arr.shape != prices_arr.shape:
+                raise ValueError("shares 与 prices 的长度必须一致")
+            if shares_arr.size == 0:
+                return np.zeros(0, dtype=np.int64)
+            if np.any(shares_arr < 0) or np.any(prices_arr < 0):
+                raise ValueError("股数和价格不能为负数")
+            # 与 _price_to_micros 的浮点快速路径相同的精确性检查，无法精确换算的行改走Decimal路径
+            scaled = np.rint(prices_arr * MICROS_PER_UNIT)
+            inexact = ~(prices_arr < 1e9) | (scaled / MICROS_PER_UNIT != prices_arr)
+            micros = np.where(inexact, 0, scaled).astype(np.int64)
+            result = self._np_commission_cents(shares_arr, micros)
+            for index in np.flatnonzero(inexact):
+                result[index] = self._decimal_commission_cents(int(shares_arr[index]), float(prices_arr[index]))
+            return result
         
-        # 应用最高佣金限制 (交易额的1%)
-        max_commission = trade_value * self.max_commission_rate
-        if commission > max_commission:
-            commission = max_commission
+        if len(shares) != len(prices):
+            raise ValueError("shares 与 prices 的长度必须一致")
+        micros = array('q')
+        inexact = []
+        for index, price in enumerate(prices):
+            price_micros = _price_to_micros(price)
+            if price_micros is None:
+                inexact.append(index)
+                price_micros = 0
+            micros.append(price_micros)
+        result = self.calculate_commissions_cents_micros(shares, micros)
+        for index in inexact:
+            result[index] = self._decimal_commission_cents(shares[index], prices[index])
+        return result
+    
+    def _decimal_commission_cents(self, shares: int, price) -> int:
+        """用 calculate_commission 计算一笔无法精确换算为微单位的价格的佣金 (美分)"""
+        return int(self.calculate_commission(shares, price).scaleb(2))
+    
+    def calculate_commissions_cents_micros(self, shares: Sequence[int],
+                                           price_micros: Sequence[int]) -> Union[array, 'np.ndarray']:
+        """
+        批量计算IB佣金，价格已是整数微单位 (例如二进制交易日志的列)
+        
+        与 calculate_commissions_cents 相同，但不经过浮点价格换算。NumPy数组输入
+        (可以是结构化数组的字段视图、任意整数类型) 直接参与运算，不复制输入。
+        
+        Args:
+            shares: 股票数量数组
+            price_micros: 价格数组 (微单位，1美元 = 1,000,000)
+            
+        Returns:
+            佣金数组 (美分)。输入为NumPy数组时返回int64的NumPy数组，
+            否则返回 array.array('q')
+        """
+        if _has_array(shares, price_micros):
+            np = _numpy()
+            shares_arr = np.asarray(shares)
+            micros = np.asarray(price_micros)
+            if shares_arr.dtype.kind not in 'iu' or micros.dtype.kind not in 'iu':
+                raise TypeError("shares 和 price_micros 必须是整数数组")
+            if shares_arr.shape != micros.shape:
+                raise ValueError("shares 与 price_micros 的长度必须一致")
+            if shares_arr.size == 0:
+                return np.zeros(0, dtype=np.int64)
+            if shares_arr.min() < 0 or micros.min() < 0:
+                raise ValueError("股数和价格不能为负数")
+            return self._np_commission_cents(shares_arr, micros)
+        
+        if len(shares) != len(price_micros):
+            raise ValueError("shares 与 price_micros 的长度必须一致")
+        result = array('q')
+        commission_cents = self._commission_cents
+        for share_count, micros in zip(shares, price_micros):
+            result.append(commission_cents(share_count, micros))
+        return result
+    
+    def _np_commission_cents(self, shares: 'np.ndarray', micros: 'np.ndarray') -> 'np.ndarray':
+        """
+        calculate_commissions_cents 的NumPy实现，shares 和 micros 为非负整数数组 (形状相同)
+        
+        运算结果统一为int64，无需先把输入转换为int64。
+        """
+        np = _numpy()
+        rate, rate_places, max_rate, cap_places, min_cents = self._scaled_rates
+        if int(shares.max()) * int(micros.max()) * max(max_rate, 1) >= 2 ** 62:
+            raise OverflowError("交易额超出int64批量计算范围，请使用 calculate_commission")
         
-        return commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        commission = _np_to_cents(np.multiply(shares, rate, dtype=np.int64), rate_places)
+        np.maximum(commission, min_cents, out=commission)
+        trade_value = np.multiply(shares, micros, dtype=np.int64)
+        trade_value *= max_rate
+        max_commission = _np_to_cents(trade_value, cap_places)
+        np.minimum(commission, max_commission, out=commission)
+        return commission
+    
+    def calculate_profit_grid(self, buy_shares: int, buy_price: float,
+                              sell_prices: Sequence[float],
+                              sell_quantities: Sequence[int]) -> Dict:
+        """
+        一次计算多个卖出价格和卖出股数组合的盈利 (what-if 网格)
+        
+        每个网格点的结果与 calculate_profit 在该点的结果完全一致 (精确到分)，
+        最低佣金和最高佣金的切换逐点处理。整个网格用整数运算一次完成，
+        卖出股数超过买入股数的点为 nan。
+        
+        Args:
+            buy_shares: 买入股数
+            buy_price: 买入价格
+            sell_prices: 卖出价格数组 (例如 numpy.arange(50, 60, 0.01))，最多6位小数
+            sell_quantities: 卖出股数数组 (例如 range(100, 1001, 100))
+            
+        Returns:
+            包含以下字段的字典，二维结果的形状为 (len(sell_quantities), len(sell_prices)):
+                - sell_prices / sell_quantities: 网格坐标
+                - net_profit: 盈利 (美元)
+                - profit_percentage: 盈利率 (%)
+                - commission: 卖出佣金 (美元)
+            安装了NumPy时为数组，否则为嵌套列表
+        """
+        buy_info = self.calculate_buy_cost(buy_shares, buy_price)
+        avg_cost = int(buy_info['avg_cost_per_share'].scaleb(4))
+        
+        np = _numpy()
+        if np is not None:
+            quantities = np.asarray(sell_quantities, dtype=np.int64)
+            prices = np.asarray(sell_prices, dtype=np.float64)
+            if quantities.ndim != 1 or prices.ndim != 1:
+                raise ValueError("sell_prices 和 sell_quantities 必须是一维数组")
+            if quantities.size == 0 or prices.size == 0:
+                empty = np.zeros((quantities.size, prices.size))
+                return {'sell_prices': prices, 'sell_quantities': quantities,
+                        'net_profit': empty, 'profit_percentage': empty.copy(),
+                        'commission': empty.copy()}
+            if np.any(quantities < 0) or np.any(prices < 0):
+                raise ValueError("股数和价格不能为负数")
+            
+            shares, micros = np.broadcast_arrays(
+                quantities[:, None], np.rint(prices * MICROS_PER_UNIT).astype(np.int64)[None, :]
+            )
+            commission = self._np_commission_cents(shares, micros)
+            net_cents = (shares * micros + 5000) // 10000 - commission
+            cost = avg_cost * shares
+            profit = net_cents * 100 - cost
+            profit_cents = np.sign(profit) * ((2 * np.abs(profit) + 100) // 200)
+            safe_cost = np.where(cost > 0, cost, 1)
+            percentage = np.sign(profit) * ((2 * np.abs(profit) * 10000 + safe_cost) // (2 * safe_cost))
+            
+            invalid = shares > buy_shares
+            net_profit = np.where(invalid, np.nan, profit_cents / 100)
+            profit_percentage = np.where(invalid | (cost <= 0), np.nan, percentage / 100)
+            return {
+                'sell_prices': prices,
+                'sell_quantities': quantities,
+                'net_profit': net_profit,
+                'profit_percentage': profit_percentage,
+                'commission': np.where(invalid, np.nan, commission / 100)
+            }
+        
+        prices = list(sell_prices)
+        quantities = list(sell_quantities)
+        nan = float('nan')
+        net_profit, profit_percentage, commissions = [], [], []
+        for quantity in quantities:
+            profit_row, percentage_row, commission_row = [], [], []
+            for price in prices:
+                if quantity > buy_shares:
+                    profit_row.append(nan)
+                    percentage_row.append(nan)
+                    commission_row.append(nan)
+                    continue
+                micros = round(price * MICROS_PER_UNIT)
+                commission = self._commission_cents(quantity, micros)
+                net_cents = (quantity * micros + 5000) // 10000 - commission
+                cost = avg_cost * quantity
+                profit = net_cents * 100 - cost
+                profit_row.append(_round_div(profit, 100) / 100)
+                percentage_row.append(_round_div(profit * 10000, cost) / 100 if cost > 0 else nan)
+                commission_row.append(commission / 100)
+            net_profit.append(profit_row)
+            profit_percentage.append(percentage_row)
+            commissions.append(commission_row)
+        return {
+            'sell_prices': prices,
+            'sell_quantities': quantities,
+            'net_profit': net_profit,
+            'profit_percentage': profit_percentage,
+            'commission': commissions
+        }
+    
+    def _fixed_commission_cents(self, shares):
+        """未触及最高佣金限制时的佣金 (美分)，shares 可以是整数或NumPy数组"""
+        rate2, rate_div, rate_div2, _, _, _, min_cents = self._commission_terms
+        commission = (shares * rate2 + rate_div) // rate_div2
+        if isinstance(commission, int):
+            return max(commission, min_cents)
+        return _numpy().maximum(commission, min_cents)
+    
+    def _break_even_cents(self, cost: int, shares: int) -> int:
+        """按整数运算求最低的保本卖出价格 (美分)，cost 为卖出部分的成本 (万分之一美元)"""
+        max_rate = float(self._max_commission_rate)
+        price = min(-(-(cost + 100 * self._fixed_commission_cents(shares)) // (100 * shares)),
+                    math.ceil(cost / (100 * shares * (1 - max_rate))))
+        price = max(price, 0)
+        commission_cents = self._commission_cents
+        
+        # 解析解未考虑佣金舍入，最多相差一两个价位，逐价位修正
+        while (shares * price - commission_cents(shares, price * 10000)) * 100 < cost:
+            price += 1
+        while price > 0 and (shares * (price - 1)
+                             - commission_cents(shares, (price - 1) * 10000)) * 100 >= cost:
+            price -= 1
+        return price
+    
+    def calculate_break_even_price(self, buy_shares: int, buy_price: float,
+                                   sell_shares: Optional[int] = None) -> Decimal:
+        """
+        计算保本卖出价格
+        
+        返回使卖出净收入不低于 cost_for_sold_shares 的最低价格 (精确到分)，
+        即 calculate_profit 在该价格的盈利不为负、低一分则为负。
+        
+        净收入 = 股数 × 价格 - min(max(每股佣金, 最低佣金), 交易额 × 最高费率)
+               = max(股数 × 价格 - 固定佣金, 股数 × 价格 × (1 - 最高费率))
+        是价格的分段线性增函数，因此保本价格为两段解析解中较小的一个，
+        再按佣金舍入修正最多一两个价位，无需逐价试算。
+        
+        Args:
+            buy_shares: 买入股数
+            buy_price: 买入价格
+            sell_shares: 卖出股数 (默认全部卖出)
+            
+        Returns:
+            保本卖出价格
+        """
+        if sell_shares is None:
+            sell_shares = buy_shares
+        if not 0 < sell_shares <= buy_shares:
+            raise ValueError("卖出股数必须为正且不能大于买入股数")
+        if self._max_commission_rate >= 1:
+            raise ValueError("最高佣金费率不小于100%时不存在保本价格")
+        
+        buy_info = self.calculate_buy_cost(buy_shares, buy_price)
+        cost = int(buy_info['avg_cost_per_share'].scaleb(4)) * sell_shares
+        return Decimal(self._break_even_cents(cost, sell_shares)) * _CENT
+    
+    def calculate_break_even_cents(self, buy_shares: Sequence[int], buy_prices: Sequence[float],
+                                   sell_shares: Optional[Sequence[int]] = None) -> Union[array, 'np.ndarray']:
+        """
+        批量计算保本卖出价格，结果以美分为单位的整数返回
+        
+        与逐个调用 calculate_break_even_price 的结果完全一致。NumPy路径对整个数组
+        同时求解析解和舍入修正，适合一次计算整个账簿的保本价格。
+        
+        Args:
+            buy_shares: 买入股数数组
+            buy_prices: 买入价格数组，价格最多6位小数
+            sell_shares: 卖出股数数组 (默认全部卖出)
+            
+        Returns:
+            保本价格数组 (美分)。输入为NumPy数组时返回int64的NumPy数组，
+            否则返回 array.array('q')
+        """
+        if sell_shares is None:
+            sell_shares = buy_shares
+        if self._max_commission_rate >= 1:
+            raise ValueError("最高佣金费率不小于100%时不存在保本价格")
+        
+        if _has_array(buy_shares, buy_prices, sell_shares):
+            np = _numpy()
+            bought = np.asarray(buy_shares, dtype=np.int64)
+            micros = np.rint(np.asarray(buy_prices, dtype=np.float64) * MICROS_PER_UNIT).astype(np.int64)
+            shares = np.asarray(sell_shares, dtype=np.int64)
+            if not bought.shape == micros.shape == shares.shape:
+                raise ValueError("buy_shares、buy_prices 与 sell_shares 的长度必须一致")
+            if bought.size == 0:
+                return np.zeros(0, dtype=np.int64)
+            if np.any(shares <= 0) or np.any(shares > bought) or np.any(micros < 0):
+                raise ValueError("卖出股数必须为正且不能大于买入股数，价格不能为负数")
+            
+            # 与 calculate_buy_cost 相同的平均成本 (万分之一美元)
+            buy_commission = self._np_commission_cents(bought, micros)
+            avg_cost = (bought * micros + buy_commission * 10000 + bought * 50) // (bought * 100)
+            cost = avg_cost * shares
+            
+            max_rate = float(self._max_commission_rate)
+            fixed = -(-(cost + 100 * self._fixed_commission_cents(shares)) // (100 * shares))
+            capped = np.ceil(cost / (100 * shares * (1 - max_rate))).astype(np.int64)
+            price = np.maximum(np.minimum(fixed, capped), 0)
+            
+            def covered(price):
+                return (shares * price - self._np_commission_cents(shares, price * 10000)) * 100 >= cost
+            
+            short = ~covered(price)
+            while short.any():
+                price[short] += 1
+                short = ~covered(price)
+            lower = np.maximum(price - 1, 0)
+            excess = (price > 0) & covered(lower)
+            while excess.any():
+                price[excess] -= 1
+                lower = np.maximum(price - 1, 0)
+                excess = (price > 0) & covered(lower)
+            return price
+        
+        if not len(buy_shares) == len(buy_prices) == len(sell_shares):
+            raise ValueError("buy_shares、buy_prices 与 sell_shares 的长度必须一致")
+        result = array('q')
+        for bought, price, shares in zip(buy_shares, buy_prices, sell_shares):
+            if not 0 < shares <= bought:
+                raise ValueError("卖出股数必须为正且不能大于买入股数")
+            buy_info = self.calculate_buy_cost(bought, price)
+            cost = int(buy_info['avg_cost_per_share'].scaleb(4)) * shares
+            result.append(self._break_even_cents(cost, shares))
+        return result
     
     def calculate_buy_cost(self, shares: int, price: float) -> Dict[str, Decimal]:
         """
@@ -65,11 +839,31 @@ class IBStockCalculator:
         Returns:
             包含详细成本信息的字典
         """
+        if self.backend == 'integer' and shares > 0:
+            micros = _price_to_micros(price)
+            if micros is not None and micros >= 0:
+                return self._integer_buy_cost(shares, price, micros)
+        
+        return self.buy_cost_with_commission(shares, price, self.calculate_commission(shares, price))
+    
+    def buy_cost_with_commission(self, shares: int, price: float, commission: Decimal) -> Dict[str, Decimal]:
+        """
+        按给定的佣金计算买入总成本，用于其他佣金方案 (ib_schedules) 计价的成交
+        
+        Args:
+            shares: 买入股数
+            price: 买入价格
+            commission: 佣金 (以及其他费用) 合计
+            
+        Returns:
+            与 calculate_buy_cost 相同格式的字典
+        """
         shares_dec = Decimal(str(shares))
         price_dec = Decimal(str(price))
         
         stock_cost = shares_dec * price_dec
-        commission = self.calculate_commission(shares, price)
+        if self.lazy_results:
+            return BuyCostResult(shares_dec, price_dec, stock_cost, commission)
         total_cost = stock_cost + commission
         avg_cost_per_share = (total_cost / shares_dec).quantize(
             Decimal('0.0001'), rounding=ROUND_HALF_UP
@@ -95,11 +889,32 @@ class IBStockCalculator:
         Returns:
             包含详细收入信息的字典
         """
+        if self.backend == 'integer' and shares > 0:
+            micros = _price_to_micros(price)
+            if micros is not None and micros >= 0:
+                return self._integer_sell_proceeds(shares, price, micros)
+        
+        return self.sell_proceeds_with_commission(shares, price, self.calculate_commission(shares, price))
+    
+    def sell_proceeds_with_commission(self, shares: int, price: float,
+                                      commission: Decimal) -> Dict[str, Decimal]:
+        """
+        按给定的佣金计算卖出净收入，用于其他佣金方案 (ib_schedules) 计价的成交
+        
+        Args:
+            shares: 卖出股数
+            price: 卖出价格
+            commission: 佣金 (以及其他费用) 合计
+            
+        Returns:
+            与 calculate_sell_proceeds 相同格式的字典
+        """
         shares_dec = Decimal(str(shares))
         price_dec = Decimal(str(price))
         
         gross_proceeds = shares_dec * price_dec
-        commission = self.calculate_commission(shares, price)
+        if self.lazy_results:
+            return SellProceedsResult(shares_dec, price_dec, gross_proceeds, commission)
         net_proceeds = gross_proceeds - commission
         avg_proceeds_per_share = (net_proceeds / shares_dec).quantize(
             Decimal('0.0001'), rounding=ROUND_HALF_UP
@@ -134,6 +949,11 @@ class IBStockCalculator:
         buy_info = self.calculate_buy_cost(buy_shares, buy_price)
         sell_info = self.calculate_sell_proceeds(sell_shares, sell_price)
         
+        if self.backend == 'integer' and sell_shares and buy_info['avg_cost_per_share']:
+            return self._integer_profit(buy_info, sell_info, buy_shares, sell_shares)
+        if self.lazy_results:
+            return ProfitResult(buy_info, sell_info, buy_shares, sell_shares)
+        
         # 计算这部分股票的成本
         cost_for_sold_shares = (buy_info['avg_cost_per_share'] * 
                                Decimal(str(sell_shares)))
@@ -161,122 +981,319 @@ class IBStockCalculator:
             'remaining_avg_cost': buy_info['avg_cost_per_share'] if remaining_shares > 0 else Decimal('0')
         }
     
-    def calculate_multiple_transactions(self, transactions: List[Dict]) -> Dict:
+    def _integer_buy_cost(self, shares: int, price: float, micros: int) -> Dict[str, Decimal]:
+        """calculate_buy_cost 的整数后端实现，shares 为正、micros 非负"""
+        stock_micros = shares * micros
+        commission = self._commission_cents(shares, micros)
+        stock_cents = (stock_micros + 5000) // 10000
+        avg_cost = (stock_micros + commission * 10000 + shares * 50) // (shares * 100)
+        return {
+            'shares': Decimal(shares),
+            'price': Decimal(str(price)),
+            'stock_cost': Decimal(stock_cents) * _CENT,
+            'commission': Decimal(commission) * _CENT,
+            'total_cost': Decimal(stock_cents + commission) * _CENT,
+            'avg_cost_per_share': Decimal(avg_cost) * _BASIS_POINT
+        }
+    
+    def _integer_sell_proceeds(self, shares: int, price: float, micros: int) -> Dict[str, Decimal]:
+        """calculate_sell_proceeds 的整数后端实现，shares 为正、micros 非负"""
+        gross_micros = shares * micros
+        commission = self._commission_cents(shares, micros)
+        gross_cents = (gross_micros + 5000) // 10000
+        net_micros = gross_micros - commission * 10000
+        negative = net_micros < 0
+        return {
+            'shares': Decimal(shares),
+            'price': Decimal(str(price)),
+            'gross_proceeds': Decimal(gross_cents) * _CENT,
+            'commission': Decimal(commission) * _CENT,
+            'net_proceeds': _from_scaled(gross_cents - commission, 2, negative),
+            'avg_proceeds_per_share': _from_scaled(_round_div(net_micros, shares * 100), 4, negative)
+        }
+    
+    def _integer_profit(self, buy_info: Dict, sell_info: Dict,
+                        buy_shares: int, sell_shares: int) -> Dict[str, any]:
+        """calculate_profit 的整数后端实现，金额以万分之一美元计算"""
+        avg_cost = int(buy_info['avg_cost_per_share'].scaleb(4))
+        cost_for_sold = avg_cost * sell_shares
+        profit = int(sell_info['net_proceeds'].scaleb(4)) - cost_for_sold
+        remaining_shares = buy_shares - sell_shares
+        remaining_cost = int(buy_info['total_cost'].scaleb(4)) - cost_for_sold
+        
+        return {
+            'buy_info': buy_info,
+            'sell_info': sell_info,
+            'cost_for_sold_shares': Decimal((cost_for_sold + 50) // 100) * _CENT,
+            'profit': _from_scaled(_round_div(profit, 100), 2, profit < 0),
+            'profit_percentage': _from_scaled(_round_div(profit * 10000, cost_for_sold), 2,
+                                              profit < 0),
+            'remaining_shares': remaining_shares,
+            'remaining_cost': _from_scaled(_round_div(remaining_cost, 100), 2, remaining_cost < 0),
+            'remaining_avg_cost': buy_info['avg_cost_per_share'] if remaining_shares > 0 else Decimal('0')
+        }
+    
+    def calculate_multiple_transactions(self, transactions: Iterable[Dict],
+                                        schedule=None) -> Dict:
         """
         计算多笔交易的总成本和盈利
         
+        只遍历一次交易序列并维护累计值，因此可以传入任意迭代器
+        (例如CSV或JSONL读取器)，内存占用与交易笔数无关。
+        
         Args:
-            transactions: 交易列表，每个交易是一个字典，包含:
+            transactions: 交易列表或迭代器，每个交易是一个字典，包含:
                 - type: 'buy' 或 'sell'
                 - shares: 股数
                 - price: 价格
+                - month: 成交月份 (可选，阶梯费率方案按月累计成交量)
+            schedule: 佣金方案 (ib_schedules 中的 FixedSchedule / TieredSchedule 等)，
+                默认使用本计算器的固定费率
                 
         Returns:
             包含总体信息的字典
         """
-        total_shares = 0
-        total_cost = Decimal('0')
-        total_proceeds = Decimal('0')
-        total_buy_commission = Decimal('0')
-        total_sell_commission = Decimal('0')
+        totals = TransactionTotals(self, schedule)
+        for trans in transactions:
+            totals.add(trans['type'], trans['shares'], trans['price'], trans.get('month'))
+        return totals.summary()
+    
+    def iter_transaction_summaries(self, transactions: Iterable[Dict],
+                                   summary_every: Optional[int] = None) -> Iterator[Dict]:
+        """
+        流式处理多笔交易，按需产出中间摘要
         
+        适用于放不进内存的大型交易文件。股数会用 int() 转换，
+        因此可以直接传入 csv.DictReader 读出的字符串字段。
+        
+        Args:
+            transactions: 交易迭代器，字段同 calculate_multiple_transactions
+            summary_every: 每处理N笔交易产出一次中间摘要 (None 表示只产出最终摘要)
+            
+        Yields:
+            与 calculate_multiple_transactions 相同的摘要字典，
+            额外包含 transaction_count (已处理的交易笔数)；最后一个为最终摘要
+        """
+        if summary_every is not None and summary_every <= 0:
+            raise ValueError("summary_every 必须为正整数")
+        
+        totals = TransactionTotals(self)
         for trans in transactions:
-            trans_type = trans['type']
-            shares = trans['shares']
-            price = trans['price']
+            totals.add(trans['type'], int(trans['shares']), trans['price'])
+            if summary_every and totals.transaction_count % summary_every == 0:
+                yield dict(totals.summary(), transaction_count=totals.transaction_count)
+        
+        if not summary_every or totals.transaction_count % summary_every != 0:
+            yield dict(totals.summary(), transaction_count=totals.transaction_count)
+
+
+class TransactionTotals:
+    """
+    多笔交易的累计状态
+    
+    保存 calculate_multiple_transactions 所需的全部累计值，每笔交易 O(1) 更新，
+    随时可以生成摘要，无需保留交易列表。
+    
+    指定佣金方案 (schedule) 时，每笔成交的费用由 schedule.price_fill 计算，
+    其 total_fees (佣金加交易所费、清算费、监管费) 计入 commission。
+    """
+    
+    __slots__ = ('calculator', 'schedule', 'remaining_shares', 'buy_shares', 'sell_shares', 'buy_count',
+                 'transaction_count', 'total_cost', 'total_proceeds',
+                 'total_buy_commission', 'total_sell_commission')
+    
+    def __init__(self, calculator: IBStockCalculator, schedule=None):
+        """
+        Args:
+            calculator: 计算成本和收入的计算器
+            schedule: 佣金方案，需提供 price_fill(shares, price, side, month) (默认使用计算器的固定费率)
+        """
+        self.calculator = calculator
+        self.schedule = schedule
+        self.remaining_shares = 0
+        self.buy_shares = 0
+        self.sell_shares = 0
+        self.buy_count = 0
+        self.transaction_count = 0
+        self.total_cost = Decimal('0')
+        self.total_proceeds = Decimal('0')
+        self.total_buy_commission = Decimal('0')
+        self.total_sell_commission = Decimal('0')
+    
+    def add(self, trans_type: str, shares: int, price: float, month=None) -> Optional[Dict]:
+        """
+        累加一笔交易
+        
+        Args:
+            trans_type: 'buy' 或 'sell' (其他类型会被计数但不影响金额)
+            shares: 股数
+            price: 价格
+            month: 成交月份，传给佣金方案 (未指定佣金方案时不使用)
             
-            if trans_type == 'buy':
-                buy_info = self.calculate_buy_cost(shares, price)
-                total_shares += shares
-                total_cost += buy_info['total_cost']
-                total_buy_commission += buy_info['commission']
-            elif trans_type == 'sell':
-                if shares > total_shares:
-                    raise ValueError(f"卖出股数 {shares} 超过持有股数 {total_shares}")
-                sell_info = self.calculate_sell_proceeds(shares, price)
-                total_shares -= shares
-                total_proceeds += sell_info['net_proceeds']
-                total_sell_commission += sell_info['commission']
-        
-        avg_cost_per_share = (total_cost / Decimal(str(sum(
-            t['shares'] for t in transactions if t['type'] == 'buy'
-        )))).quantize(Decimal('0.0001'), rounding=ROUND_HALF_UP) if any(
-            t['type'] == 'buy' for t in transactions
-        ) else Decimal('0')
-        
-        total_profit = total_proceeds - (avg_cost_per_share * Decimal(str(sum(
-            t['shares'] for t in transactions if t['type'] == 'sell'
-        ))))
+        Returns:
+            calculate_buy_cost / calculate_sell_proceeds 的结果 (其他类型为None)，
+            可传给 subtract 撤销这笔交易
+        """
+        info = None
+        if trans_type == 'buy':
+            if self.schedule is None:
+                buy_info = self.calculator.calculate_buy_cost(shares, price)
+            else:
+                fees = self.schedule.price_fill(shares, price, 'buy', month)['total_fees']
+                buy_info = self.calculator.buy_cost_with_commission(shares, price, fees)
+            self.remaining_shares += shares
+            self.buy_shares += shares
+            self.buy_count += 1
+            self.total_cost += buy_info['total_cost']
+            self.total_buy_commission += buy_info['commission']
+            info = buy_info
+        elif trans_type == 'sell':
+            if shares > self.remaining_shares:
+                raise ValueError(f"卖出股数 {shares} 超过持有股数 {self.remaining_shares}")
+            if self.schedule is None:
+                sell_info = self.calculator.calculate_sell_proceeds(shares, price)
+            else:
+                fees = self.schedule.price_fill(shares, price, 'sell', month)['total_fees']
+                sell_info = self.calculator.sell_proceeds_with_commission(shares, price, fees)
+            self.remaining_shares -= shares
+            self.sell_shares += shares
+            self.total_proceeds += sell_info['net_proceeds']
+            self.total_sell_commission += sell_info['commission']
+            info = sell_info
+        self.transaction_count += 1
+        return info
+    
+    def subtract(self, trans_type: str, shares: int, info: Optional[Dict]):
+        """
+        撤销一笔之前用 add 累加的交易
+        
+        必须按与 add 相反的顺序撤销，才能精确恢复到之前的状态。
+        佣金方案自身的状态 (例如阶梯费率的月累计成交量) 不会回退。
+        
+        Args:
+            trans_type: 交易类型
+            shares: 股数
+            info: add 返回的结果
+        """
+        if trans_type == 'buy':
+            self.remaining_shares -= shares
+            self.buy_shares -= shares
+            self.buy_count -= 1
+            self.total_cost -= info['total_cost']
+            self.total_buy_commission -= info['commission']
+        elif trans_type == 'sell':
+            self.remaining_shares += shares
+            self.sell_shares -= shares
+            self.total_proceeds -= info['net_proceeds']
+            self.total_sell_commission -= info['commission']
+        self.transaction_count -= 1
+    
+    def summary(self) -> Dict:
+        """生成与 calculate_multiple_transactions 相同格式的摘要"""
+        avg_cost_per_share = (self.total_cost / Decimal(str(self.buy_shares))).quantize(
+            Decimal('0.0001'), rounding=ROUND_HALF_UP
+        ) if self.buy_count else Decimal('0')
+        
+        sold_cost = avg_cost_per_share * Decimal(str(self.sell_shares))
+        total_profit = self.total_proceeds - sold_cost
         
         return {
-            'remaining_shares': total_shares,
-            'total_cost': total_cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'total_proceeds': total_proceeds.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'total_buy_commission': total_buy_commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'total_sell_commission': total_sell_commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'total_commission': (total_buy_commission + total_sell_commission).quantize(
+            'remaining_shares': self.remaining_shares,
+            'total_cost': self.total_cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'total_proceeds': self.total_proceeds.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'total_buy_commission': self.total_buy_commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'total_sell_commission': self.total_sell_commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'total_commission': (self.total_buy_commission + self.total_sell_commission).quantize(
                 Decimal('0.01'), rounding=ROUND_HALF_UP
             ),
             'avg_cost_per_share': avg_cost_per_share,
             'total_profit': total_profit.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
-            'profit_percentage': ((total_profit / (avg_cost_per_share * Decimal(str(sum(
-                t['shares'] for t in transactions if t['type'] == 'sell'
-            ))))) * Decimal('100')).quantize(
+            'profit_percentage': ((total_profit / sold_cost) * Decimal('100')).quantize(
                 Decimal('0.01'), rounding=ROUND_HALF_UP
-            ) if total_proceeds > 0 else Decimal('0')
+            ) if self.total_proceeds > 0 else Decimal('0')
         }
 
 
-def print_transaction_summary(result: Dict):
-    """打印交易摘要"""
-    print("\n" + "="*60)
-    print("交易摘要 / Transaction Summary")
-    print("="*60)
+def format_transaction_summary(result: Mapping) -> str:
+    """
+    把交易摘要格式化为文本
+
+    Args:
+        result: calculate_profit 或 calculate_multiple_transactions 的结果
+
+    Returns:
+        与 print_transaction_summary 输出相同的文本 (以换行结尾)
+    """
+    lines = [
+        "\n" + "="*60,
+        "交易摘要 / Transaction Summary",
+        "="*60,
+    ]
     
     if 'buy_info' in result:
-        print("\n【买入信息 / Buy Information】")
         buy = result['buy_info']
-        print(f"  股数 Shares: {buy['shares']}")
-        print(f"  价格 Price: ${buy['price']}")
-        print(f"  股票成本 Stock Cost: ${buy['stock_cost']}")
-        print(f"  佣金 Commission: ${buy['commission']}")
-        print(f"  总成本 Total Cost: ${buy['total_cost']}")
-        print(f"  平均成本/股 Avg Cost/Share: ${buy['avg_cost_per_share']}")
-        
-        print("\n【卖出信息 / Sell Information】")
         sell = result['sell_info']
-        print(f"  股数 Shares: {sell['shares']}")
-        print(f"  价格 Price: ${sell['price']}")
-        print(f"  总收入 Gross Proceeds: ${sell['gross_proceeds']}")
-        print(f"  佣金 Commission: ${sell['commission']}")
-        print(f"  净收入 Net Proceeds: ${sell['net_proceeds']}")
-        
-        print("\n【盈利信息 / Profit Information】")
-        print(f"  卖出股票成本 Cost for Sold Shares: ${result['cost_for_sold_shares']}")
-        print(f"  盈利 Profit: ${result['profit']}")
-        print(f"  盈利率 Profit %: {result['profit_percentage']}%")
+        lines += [
+            "\n【买入信息 / Buy Information】",
+            f"  股数 Shares: {buy['shares']}",
+            f"  价格 Price: ${buy['price']}",
+            f"  股票成本 Stock Cost: ${buy['stock_cost']}",
+            f"  佣金 Commission: ${buy['commission']}",
+            f"  总成本 Total Cost: ${buy['total_cost']}",
+            f"  平均成本/股 Avg Cost/Share: ${buy['avg_cost_per_share']}",
+            "\n【卖出信息 / Sell Information】",
+            f"  股数 Shares: {sell['shares']}",
+            f"  价格 Price: ${sell['price']}",
+            f"  总收入 Gross Proceeds: ${sell['gross_proceeds']}",
+            f"  佣金 Commission: ${sell['commission']}",
+            f"  净收入 Net Proceeds: ${sell['net_proceeds']}",
+            "\n【盈利信息 / Profit Information】",
+            f"  卖出股票成本 Cost for Sold Shares: ${result['cost_for_sold_shares']}",
+            f"  盈利 Profit: ${result['profit']}",
+            f"  盈利率 Profit %: {result['profit_percentage']}%",
+        ]
         
         if result['remaining_shares'] > 0:
-            print("\n【剩余持仓 / Remaining Position】")
-            print(f"  剩余股数 Remaining Shares: {result['remaining_shares']}")
-            print(f"  剩余成本 Remaining Cost: ${result['remaining_cost']}")
-            print(f"  平均成本/股 Avg Cost/Share: ${result['remaining_avg_cost']}")
+            lines += [
+                "\n【剩余持仓 / Remaining Position】",
+                f"  剩余股数 Remaining Shares: {result['remaining_shares']}",
+                f"  剩余成本 Remaining Cost: ${result['remaining_cost']}",
+                f"  平均成本/股 Avg Cost/Share: ${result['remaining_avg_cost']}",
+            ]
     else:
-        print(f"\n剩余股数 Remaining Shares: {result['remaining_shares']}")
-        print(f"总成本 Total Cost: ${result['total_cost']}")
-        print(f"总收入 Total Proceeds: ${result['total_proceeds']}")
-        print(f"买入佣金 Buy Commission: ${result['total_buy_commission']}")
-        print(f"卖出佣金 Sell Commission: ${result['total_sell_commission']}")
-        print(f"总佣金 Total Commission: ${result['total_commission']}")
-        print(f"平均成本/股 Avg Cost/Share: ${result['avg_cost_per_share']}")
-        print(f"总盈利 Total Profit: ${result['total_profit']}")
-        print(f"盈利率 Profit %: {result['profit_percentage']}%")
+        lines += [
+            f"\n剩余股数 Remaining Shares: {result['remaining_shares']}",
+            f"总成本 Total Cost: ${result['total_cost']}",
+            f"总收入 Total Proceeds: ${result['total_proceeds']}",
+            f"买入佣金 Buy Commission: ${result['total_buy_commission']}",
+            f"卖出佣金 Sell Commission: ${result['total_sell_commission']}",
+            f"总佣金 Total Commission: ${result['total_commission']}",
+            f"平均成本/股 Avg Cost/Share: ${result['avg_cost_per_share']}",
+            f"总盈利 Total Profit: ${result['total_profit']}",
+            f"盈利率 Profit %: {result['profit_percentage']}%",
+        ]
+    
+    lines.append("="*60 + "\n")
+    return "\n".join(lines) + "\n"
+
+
+def print_transaction_summary(result: Dict, file=None):
+    """
+    打印交易摘要
     
-    print("="*60 + "\n")
+    整个摘要一次写出；批量输出多个摘要请使用 ib_reports.ReportWriter。
+    
+    Args:
+        result: calculate_profit 或 calculate_multiple_transactions 的结果
+        file: 输出目标 (默认标准输出)
+    """
+    if file is None:
+        file = sys.stdout
+    file.write(format_transaction_summary(result))
 
 
-def main():
-    """主程序 - 演示示例"""
+def demo():
+    """演示示例"""
     print("盈透证券股票成本与盈利计算器")
     print("Interactive Brokers Stock Cost and Profit Calculator\n")
     
@@ -314,5 +1331,232 @@ def main():
     print_transaction_summary(result3)
 
 
+
+# 批量模式每行追加的结果字段
+BULK_FIELDS = ('gross', 'commission', 'net', 'avg_per_share')
+
+_bulk_calculator = None
+
+
+def _init_bulk_worker(calculator: 'IBStockCalculator'):
+    global _bulk_calculator
+    _bulk_calculator = calculator
+
+
+def _parse_row(line: int, row: Dict) -> Tuple[str, int, float]:
+    """把CSV/JSONL交易行转换为 (类型, 股数, 价格)，出错时在消息中注明行号"""
+    try:
+        trans_type = str(row['type']).strip().lower()
+        if trans_type not in ('buy', 'sell'):
+            raise ValueError(f"未知的交易类型 {row['type']!r}")
+        return trans_type, int(row['shares']), float(row['price'])
+    except KeyError as e:
+        raise ValueError(f"第{line}行: 缺少字段 {e}") from None
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"第{line}行: {e}") from None
+
+
+def _evaluate_rows(rows: List[Tuple[int, Dict]],
+                   calculator: Optional['IBStockCalculator'] = None) -> List[Dict]:
+    """
+    计算一块交易行，每行独立计算买入成本或卖出收入
+
+    Args:
+        rows: (行号, 交易) 列表，交易包含 type、shares、price (可以是字符串)
+        calculator: 使用的计算器 (默认使用工作进程初始化时的计算器)
+
+    Returns:
+        原交易字段加上 BULK_FIELDS 的结果列表，金额为字符串
+    """
+    calculator = calculator or _bulk_calculator
+    results = []
+    for line, row in rows:
+        trans_type, shares, price = _parse_row(line, row)
+        if trans_type == 'buy':
+            info = calculator.calculate_buy_cost(shares, price)
+            gross, net, avg = info['stock_cost'], info['total_cost'], info['avg_cost_per_share']
+        else:
+            info = calculator.calculate_sell_proceeds(shares, price)
+            gross, net, avg = info['gross_proceeds'], info['net_proceeds'], info['avg_proceeds_per_share']
+        result = dict(row)
+        result.update(gross=str(gross), commission=str(info['commission']),
+                      net=str(net), avg_per_share=str(avg))
+        results.append(result)
+    return results
+
+
+def _read_rows(paths: List[str], input_format: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    逐行读取CSV或JSONL交易，不把整个文件读入内存
+
+    Yields:
+        (行号, 交易字典)
+    """
+    import csv
+    import io
+    import json
+
+    for path in paths or ['-']:
+        if path == '-':
+            handle = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            handle = open(path, encoding='utf-8', newline='')
+        try:
+            file_format = input_format
+            if file_format == 'auto':
+                if path.endswith(('.jsonl', '.ndjson', '.json')):
+                    file_format = 'jsonl'
+                elif path.endswith('.csv'):
+                    file_format = 'csv'
+                else:
+                    first = handle.buffer.peek(1)[:1]
+                    file_format = 'jsonl' if first in (b'{', b'[') else 'csv'
+            if file_format == 'csv':
+                # 行号从数据的第一行 (表头之后) 开始计为2
+                for line, row in enumerate(csv.DictReader(handle), 2):
+                    yield line, row
+            else:
+                for line, text in enumerate(handle, 1):
+                    if text.strip():
+                        try:
+                            yield line, json.loads(text)
+                        except ValueError:
+                            raise ValueError(f"第{line}行: 无效的JSON") from None
+        finally:
+            if path == '-':
+                handle.detach()
+            else:
+                handle.close()
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[List]:
+    from itertools import islice
+
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_results(calculator: 'IBStockCalculator', rows: Iterable[Tuple[int, Dict]],
+                  workers: int, chunk_size: int) -> Iterator[List[Dict]]:
+    """按块计算结果，多进程时最多同时提交 2 × workers 块，保持输出顺序且内存有界"""
+    chunks = _chunked(rows, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield _evaluate_rows(chunk, calculator)
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_bulk_worker,
+                             initargs=(calculator,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_evaluate_rows, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _bulk(args) -> int:
+    import csv
+    import json
+
+    calculator = IBStockCalculator(backend=args.backend, cache_size=args.cache_size)
+    rows = _read_rows(args.inputs, args.input_format)
+    output = open(args.output, 'w', encoding='utf-8', newline='', buffering=1 << 20) \
+        if args.output else sys.stdout
+
+    try:
+        if args.summary:
+            transactions = (dict(zip(('type', 'shares', 'price'), _parse_row(line, row)))
+                            for line, row in rows)
+            for summary in calculator.iter_transaction_summaries(transactions, args.summary_every):
+                record = {key: str(value) if isinstance(value, Decimal) else value
+                          for key, value in summary.items()}
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            return 0
+
+        writer = None
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        for results in _iter_results(calculator, rows, args.workers, args.chunk_size):
+            if args.output_format == 'jsonl':
+                output.write(''.join([encode(result) + '\n' for result in results]))
+                continue
+            if writer is None:
+                fields = list(results[0])
+                fields += [field for field in BULK_FIELDS if field not in fields]
+                writer = csv.DictWriter(output, fields, extrasaction='ignore', lineterminator='\n')
+                writer.writeheader()
+            writer.writerows(results)
+        return 0
+    except ValueError as e:
+        output.flush()
+        print(f"错误 Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    不带参数或使用 demo 子命令时运行演示示例；bulk 子命令批量处理CSV/JSONL交易:
+        python3 ib_calculator.py bulk trades.csv --output-format csv > results.csv
+        cat trades.jsonl | python3 ib_calculator.py bulk --workers 4 --chunk-size 5000
+        python3 ib_calculator.py bulk trades.csv --summary --summary-every 100000
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv == ['demo']:
+        demo()
+        return 0
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='ib_calculator.py',
+                                     description='盈透证券股票成本与盈利计算器 / IB stock calculator')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('demo', help='运行演示示例')
+    bulk = commands.add_parser('bulk', help='批量计算CSV/JSONL交易')
+    bulk.add_argument('inputs', nargs='*', metavar='FILE', help="输入文件 (默认或 '-' 为标准输入)")
+    bulk.add_argument('-o', '--output', help='输出文件 (默认标准输出)')
+    bulk.add_argument('--input-format', choices=('auto', 'csv', 'jsonl'), default='auto',
+                      help='输入格式 (默认按扩展名或首字符判断)')
+    bulk.add_argument('--output-format', choices=('jsonl', 'csv'), default='jsonl')
+    bulk.add_argument('--summary', action='store_true',
+                      help='只输出 calculate_multiple_transactions 的汇总 (JSONL)')
+    bulk.add_argument('--summary-every', type=int, default=None, help='与 --summary 同用，每N笔输出一次中间汇总')
+    bulk.add_argument('--workers', type=int, default=1, help='工作进程数 (默认1，在当前进程计算)')
+    bulk.add_argument('--chunk-size', type=int, default=1000, help='每块交易行数')
+    bulk.add_argument('--backend', choices=IBStockCalculator.BACKENDS, default='integer')
+    bulk.add_argument('--cache-size', type=int, default=None, help='启用LRU缓存')
+    args = parser.parse_args(argv)
+
+    if args.command == 'demo':
+        demo()
+        return 0
+    if args.chunk_size <= 0 or args.workers <= 0:
+        parser.error('--chunk-size 和 --workers 必须为正整数')
+    if args.summary and args.workers > 1:
+        parser.error('--summary 需要按顺序计算，不能与 --workers 同用')
+    try:
+        return _bulk(args)
+    except BrokenPipeError:
+        # 下游 (例如 head) 提前关闭管道: 把标准输出指向空设备，避免退出时再次报错
+        import os
+
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+账本重放检查点 / Ledger Replay Checkpoints
+
+长账本重放时定期把累计状态 (剩余股数、成本、收入、佣金，以及可选的投资组合批次)
+写入磁盘。重放中断或重启后从最近的检查点继续，只需计算检查点之后的交易。
+
+检查点格式: 魔数 b'IBCK'、1字节版本号，之后是zlib压缩的JSON。
+金额以字符串保存，恢复后与不中断的重放结果完全一致。
+
+用法:
+    replay = replay_with_checkpoints(read_fills(), 'fills.ckpt', every=100000)
+    replay.summary()
+"""
+
+import json
+import os
+import zlib
+from collections import deque
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from ib_calculator import IBStockCalculator, TransactionTotals
+from ib_portfolio import LOT_METHODS, Lot, Portfolio, Position
+
+
+MAGIC = b'IBCK'
+VERSION = 1
+
+# TransactionTotals 中需要保存的字段 (Decimal 字段以字符串保存)
+_TOTALS_INT_FIELDS = ('remaining_shares', 'buy_shares', 'sell_shares', 'buy_count', 'transaction_count')
+_TOTALS_DECIMAL_FIELDS = ('total_cost', 'total_proceeds', 'total_buy_commission', 'total_sell_commission')
+
+
+def _transaction_key(trans_type: str, shares: int, price) -> list:
+    """检查点记录的最后一笔交易，价格以字符串保存 (Decimal 价格不能直接JSON序列化)"""
+    return [trans_type, shares, str(price)]
+
+
+def _rates(calculator: IBStockCalculator):
+    return [str(calculator.commission_rate), str(calculator.min_commission),
+            str(calculator.max_commission_rate)]
+
+
+def _lots_state(lots) -> Dict:
+    """批次容器的状态: 股数、成本，以及按容器内部顺序排列的批次"""
+    state = {'shares': lots.shares, 'cost': str(lots.cost)}
+    if hasattr(lots, 'heap'):
+        # 保存堆的数组顺序和键，恢复后堆结构与原来完全相同
+        state['sequence'] = lots.sequence
+        state['lots'] = [[str(key), sequence, lot.shares, str(lot.cost)]
+                         for key, sequence, lot in lots.heap]
+    elif hasattr(lots, 'lots'):
+        state['lots'] = [[lot.shares, str(lot.cost)] for lot in lots.lots]
+    return state
+
+
+def _restore_lots(lots, state: Dict):
+    lots.shares = state['shares']
+    lots.cost = Decimal(state['cost'])
+    if hasattr(lots, 'heap'):
+        lots.sequence = state['sequence']
+        lots.heap = [(Decimal(key), sequence, Lot(shares, Decimal(cost)))
+                     for key, sequence, shares, cost in state['lots']]
+    elif hasattr(lots, 'lots'):
+        lots.lots = deque(Lot(shares, Decimal(cost)) for shares, cost in state['lots'])
+
+
+class LedgerReplay:
+    """
+    可检查点的账本重放
+
+    始终累计 calculate_multiple_transactions 的状态；指定 lot_method 时
+    另外维护一个按股票代码匹配批次的投资组合 (交易需包含 symbol)。
+    """
+
+    def __init__(self, calculator: Optional[IBStockCalculator] = None,
+                 lot_method: Optional[str] = None):
+        """
+        Args:
+            calculator: 使用的计算器 (默认IB默认费率)
+            lot_method: 投资组合的批次匹配方法 (见 LOT_METHODS)，None 表示不跟踪批次
+        """
+        if lot_method is not None and lot_method not in LOT_METHODS:
+            raise ValueError(f"未知的批次匹配方法 {lot_method!r}，可选: {', '.join(LOT_METHODS)}")
+        self.calculator = calculator or IBStockCalculator()
+        self.totals = TransactionTotals(self.calculator)
+        self.portfolio = Portfolio(self.calculator, lot_method) if lot_method else None
+        self.last_transaction = None
+
+    def apply(self, trans: Dict):
+        """
+        处理一笔交易
+
+        Args:
+            trans: 交易字典，包含 type、shares、price (跟踪批次时还需 symbol)
+        """
+        trans_type, shares, price = trans['type'], trans['shares'], trans['price']
+        if self.portfolio is not None:
+            if trans_type == 'buy':
+                self.portfolio.buy(trans['symbol'], shares, price)
+            elif trans_type == 'sell':
+                self.portfolio.sell(trans['symbol'], shares, price)
+        self.totals.add(trans_type, shares, price)
+        self.last_transaction = _transaction_key(trans_type, shares, price)
+
+    @property
+    def transaction_count(self) -> int:
+        """已处理的交易笔数"""
+        return self.totals.transaction_count
+
+    def summary(self) -> Dict:
+        """生成与 calculate_multiple_transactions 相同格式的摘要"""
+        return self.totals.summary()
+
+    def state(self) -> Dict:
+        """可JSON序列化的完整状态"""
+        totals = self.totals
+        state = {
+            'rates': _rates(self.calculator),
+            'last_transaction': self.last_transaction,
+            'totals': {field: getattr(totals, field) for field in _TOTALS_INT_FIELDS},
+            'portfolio': None
+        }
+        state['totals'].update((field, str(getattr(totals, field))) for field in _TOTALS_DECIMAL_FIELDS)
+        if self.portfolio is not None:
+            state['portfolio'] = {
+                'method': self.portfolio.method,
+                'positions': {
+                    symbol: {
+                        'lots': _lots_state(position.lots),
+                        'realized_profit': str(position.realized_profit),
+                        'buy_commission': str(position.buy_commission),
+                        'sell_commission': str(position.sell_commission)
+                    }
+                    for symbol, position in self.portfolio._positions.items()
+                }
+            }
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict, calculator: Optional[IBStockCalculator] = None) -> 'LedgerReplay':
+        """
+        从 state() 的结果恢复
+
+        Raises:
+            ValueError: 计算器的费率与保存检查点时不同
+        """
+        calculator = calculator or IBStockCalculator()
+        if state['rates'] != _rates(calculator):
+            raise ValueError(f"计算器费率 {_rates(calculator)} 与检查点 {state['rates']} 不同，不能继续重放")
+        portfolio_state = state['portfolio']
+        replay = cls(calculator, portfolio_state['method'] if portfolio_state else None)
+        replay.last_transaction = state['last_transaction']
+        for field in _TOTALS_INT_FIELDS:
+            setattr(replay.totals, field, state['totals'][field])
+        for field in _TOTALS_DECIMAL_FIELDS:
+            setattr(replay.totals, field, Decimal(state['totals'][field]))
+
+        if portfolio_state:
+            for symbol, saved in portfolio_state['positions'].items():
+                position = replay.portfolio._positions[symbol] = Position(symbol, portfolio_state['method'])
+                _restore_lots(position.lots, saved['lots'])
+                position.realized_profit = Decimal(saved['realized_profit'])
+                position.buy_commission = Decimal(saved['buy_commission'])
+                position.sell_commission = Decimal(saved['sell_commission'])
+        return replay
+
+    def save(self, path: str):
+        """
+        写入检查点
+
+        先写临时文件再重命名，写入过程中崩溃不会损坏已有的检查点。
+        """
+        payload = json.dumps(self.state(), separators=(',', ':')).encode()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(MAGIC + bytes([VERSION]) + zlib.compress(payload))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, calculator: Optional[IBStockCalculator] = None) -> 'LedgerReplay':
+        """
+        读取检查点
+
+        Args:
+            path: 检查点文件
+            calculator: 使用的计算器，费率必须与保存时相同
+        """
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        if data[:4] != MAGIC or len(data) < 5:
+            raise ValueError(f"{path} 不是有效的检查点文件")
+        if data[4] != VERSION:
+            raise ValueError(f"{path} 的检查点版本 {data[4]} 不受支持")
+        try:
+            state = json.loads(zlib.decompress(data[5:]))
+        except (zlib.error, ValueError):
+            raise ValueError(f"{path} 已损坏") from None
+        return cls.from_state(state, calculator)
+
+
+def replay_with_checkpoints(transactions: Iterable[Dict], path: str, every: int = 10000,
+                            calculator: Optional[IBStockCalculator] = None,
+                            lot_method: Optional[str] = None) -> LedgerReplay:
+    """
+    带检查点地重放账本
+
+    path 处已有检查点时从检查点恢复，跳过账本中已经处理过的交易 (只读取、不计算)，
+    并核对检查点记录的最后一笔交易与账本中对应位置的交易相同。
+    之后每处理 every 笔交易写一次检查点，结束时再写一次。
+
+    Args:
+        transactions: 完整账本的交易迭代器 (每次重放必须按相同顺序给出相同的交易)
+        path: 检查点文件
+        every: 检查点间隔 (交易笔数)
+        calculator: 使用的计算器 (默认IB默认费率)
+        lot_method: 投资组合的批次匹配方法，None 表示不跟踪批次 (恢复时以检查点为准)
+
+    Returns:
+        重放结束时的 LedgerReplay
+    """
+    if every <= 0:
+        raise ValueError("every 必须为正整数")
+    if os.path.exists(path):
+        replay = LedgerReplay.load(path, calculator)
+    else:
+        replay = LedgerReplay(calculator, lot_method)
+
+    iterator = iter(transactions)
+    skipped = replay.transaction_count
+    if skipped:
+        last = None
+        for _ in range(skipped):
+            last = next(iterator, None)
+            if last is None:
+                raise ValueError(f"账本只有不到 {skipped} 笔交易，与检查点不符")
+        if _transaction_key(last['type'], last['shares'], last['price']) != \
+                _transaction_key(*replay.last_transaction):
+            raise ValueError(f"账本第 {skipped} 笔交易与检查点记录的不同，账本可能已被修改")
+
+    apply = replay.apply
+    since_checkpoint = 0
+    for trans in iterator:
+        apply(trans)
+        since_checkpoint += 1
+        if since_checkpoint == every:
+            replay.save(path)
+            since_checkpoint = 0
+    if since_checkpoint or not os.path.exists(path):
+        replay.save(path)
+    return replay
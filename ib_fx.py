@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+多币种换算 / Multi-Currency Support
+
+汇率序列一次载入为按日期排序的数组，按交易日二分查找当日或之前最近的汇率 (as-of)，
+重复的 (币种, 日期) 换算走LRU缓存。每笔交易用本币计算佣金和金额，
+再按交易日汇率折算为基准货币汇总佣金和已实现盈亏。
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from ib_calculator import IBStockCalculator, TransactionTotals
+
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+When = Union[date, str, int, float]
+
+
+def _day(when: When) -> int:
+    """
+    把时间转换为日期序号 (date.toordinal)
+
+    Args:
+        when: date / datetime、ISO格式字符串 (只取日期部分) 或Unix时间戳 (秒，UTC)
+    """
+    if isinstance(when, date):
+        return when.toordinal()
+    if isinstance(when, str):
+        return date.fromisoformat(when[:10]).toordinal()
+    if isinstance(when, (int, float)):
+        return _EPOCH + int(when // 86400)
+    raise TypeError(f"无法识别的时间 {when!r}")
+
+
+def _cents(value: Decimal) -> Decimal:
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class FXRates:
+    """
+    汇率序列
+
+    每个币种保存按日期升序的日期序号数组 (array('q')) 和对应汇率 (1单位该币种折合多少基准货币)。
+    查询时二分查找不晚于交易日的最后一个汇率，O(log n)；同一天有多个汇率时取最后载入的一个。
+    """
+
+    def __init__(self, base: str = 'USD', cache_size: int = 4096):
+        """
+        Args:
+            base: 基准货币
+            cache_size: (币种, 日期) 汇率缓存的最大条目数
+        """
+        if cache_size <= 0:
+            raise ValueError("cache_size 必须为正整数")
+        self.base = base
+        self.cache_size = cache_size
+        self._days: Dict[str, array] = {}
+        self._rates: Dict[str, list] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def add_series(self, currency: str, points: Iterable[Tuple[When, Union[str, float, Decimal]]]):
+        """
+        载入 (或替换) 一个币种的汇率序列
+
+        Args:
+            currency: 币种
+            points: (时间, 汇率) 的迭代器，汇率为1单位该币种折合的基准货币，顺序不限
+        """
+        if currency == self.base:
+            raise ValueError(f"{currency} 是基准货币，不需要汇率")
+        by_day = {}
+        for when, rate in points:
+            rate = Decimal(str(rate))
+            if rate <= 0:
+                raise ValueError(f"{currency} 汇率必须为正数: {rate}")
+            by_day[_day(when)] = rate
+        days = sorted(by_day)
+        self._days[currency] = array('q', days)
+        self._rates[currency] = [by_day[day] for day in days]
+        self._cache.clear()
+
+    def load(self, rows: Iterable[Tuple[str, When, Union[str, float, Decimal]]]):
+        """
+        一次载入多个货币对的汇率
+
+        Args:
+            rows: (货币对, 时间, 汇率) 的迭代器。货币对写作 'EURUSD' 或 'EUR/USD'，
+                报价货币必须是基准货币；'USDJPY' 这样基准货币在前的货币对会自动取倒数
+        """
+        series: Dict[str, list] = {}
+        for pair, when, rate in rows:
+            pair = pair.replace('/', '').upper()
+            if len(pair) != 6:
+                raise ValueError(f"无法识别的货币对 {pair!r}")
+            first, second = pair[:3], pair[3:]
+            rate = Decimal(str(rate))
+            if second == self.base:
+                series.setdefault(first, []).append((when, rate))
+            elif first == self.base:
+                series.setdefault(second, []).append((when, 1 / rate))
+            else:
+                raise ValueError(f"货币对 {pair} 不包含基准货币 {self.base}")
+        for currency, points in series.items():
+            self.add_series(currency, points)
+
+    @property
+    def currencies(self) -> Tuple[str, ...]:
+        """已载入汇率的币种"""
+        return tuple(self._days)
+
+    def rate(self, currency: str, when: When) -> Decimal:
+        """
+        查询交易日当天或之前最近的汇率
+
+        Args:
+            currency: 币种
+            when: 交易时间
+
+        Returns:
+            1单位该币种折合的基准货币
+
+        Raises:
+            KeyError: 没有该币种的汇率
+            ValueError: 交易日早于该币种的第一个汇率
+        """
+        if currency == self.base:
+            return Decimal('1')
+        key = (currency, _day(when))
+        cache = self._cache
+        rate = cache.get(key)
+        if rate is not None:
+            cache.move_to_end(key)
+            self._cache_hits += 1
+            return rate
+
+        self._cache_misses += 1
+        try:
+            days = self._days[currency]
+        except KeyError:
+            raise KeyError(f"没有 {currency} 的汇率") from None
+        index = bisect_right(days, key[1]) - 1
+        if index < 0:
+            raise ValueError(f"{date.fromordinal(key[1])} 早于 {currency} 的第一个汇率")
+        rate = self._rates[currency][index]
+        cache[key] = rate
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return rate
+
+    def convert(self, amount: Decimal, currency: str, when: When) -> Decimal:
+        """把金额按交易日汇率换算为基准货币 (精确到分)"""
+        if currency == self.base:
+            return amount
+        return _cents(amount * self.rate(currency, when))
+
+    def cache_info(self) -> Dict[str, int]:
+        """
+        Returns:
+            包含 hits、misses、size、maxsize 的字典
+        """
+        return {'hits': self._cache_hits, 'misses': self._cache_misses,
+                'size': len(self._cache), 'maxsize': self.cache_size}
+
+
+class _BasePosition:
+    """一个 (币种, 股票) 持仓的股数和基准货币成本，按移动平均成本结转"""
+
+    __slots__ = ('shares', 'cost')
+
+    def __init__(self):
+        self.shares = 0
+        self.cost = Decimal('0')
+
+
+class MultiCurrencyLedger:
+    """
+    多币种账本
+
+    每笔交易包含 currency、timestamp、type、shares、price (可选 symbol)。
+    佣金和金额用该币种的计算器以本币计算，按交易日汇率折算为基准货币后汇总；
+    已实现盈亏 = 卖出净收入 (基准货币) - 卖出股数 × 持仓平均成本 (基准货币)，包含汇率变动的影响。
+    """
+
+    def __init__(self, fx: FXRates,
+                 calculators: Optional[Dict[str, IBStockCalculator]] = None,
+                 default_calculator: Optional[IBStockCalculator] = None):
+        """
+        Args:
+            fx: 汇率序列
+            calculators: {币种: 计算器}，用于不同市场的佣金规则
+            default_calculator: 未在 calculators 中指定的币种使用的计算器 (默认IB默认费率)
+        """
+        self.fx = fx
+        self.calculators = dict(calculators or {})
+        self.default_calculator = default_calculator or IBStockCalculator()
+        self._totals: Dict[str, TransactionTotals] = {}
+        self._positions: Dict[Tuple[str, str], _BasePosition] = {}
+        self.total_cost = Decimal('0')
+        self.total_proceeds = Decimal('0')
+        self.total_buy_commission = Decimal('0')
+        self.total_sell_commission = Decimal('0')
+        self.realized_profit = Decimal('0')
+
+    def add(self, trans: Dict) -> Dict:
+        """
+        处理一笔交易
+
+        Returns:
+            本币计算结果，额外包含 fx_rate (交易日汇率)
+        """
+        currency = trans['currency']
+        when = trans['timestamp']
+        trans_type, shares = trans['type'], trans['shares']
+        rate = self.fx.rate(currency, when)
+
+        totals = self._totals.get(currency)
+        if totals is None:
+            calculator = self.calculators.get(currency, self.default_calculator)
+            totals = self._totals[currency] = TransactionTotals(calculator)
+        key = (currency, trans.get('symbol', ''))
+        position = self._positions.get(key)
+        if position is None:
+            position = self._positions[key] = _BasePosition()
+        if trans_type == 'sell' and shares > position.shares:
+            raise ValueError(f"{key[1] or currency} 卖出股数 {shares} 超过持有股数 {position.shares}")
+
+        info = totals.add(trans_type, shares, trans['price'])
+        if trans_type == 'buy':
+            cost = _cents(info['total_cost'] * rate)
+            self.total_cost += cost
+            self.total_buy_commission += _cents(info['commission'] * rate)
+            position.shares += shares
+            position.cost += cost
+        elif trans_type == 'sell':
+            proceeds = _cents(info['net_proceeds'] * rate)
+            sold_cost = position.cost if shares == position.shares \
+                else position.cost * shares / position.shares
+            self.total_proceeds += proceeds
+            self.total_sell_commission += _cents(info['commission'] * rate)
+            self.realized_profit += proceeds - sold_cost
+            position.shares -= shares
+            position.cost -= sold_cost
+        return dict(info or {}, fx_rate=rate)
+
+    def extend(self, transactions: Iterable[Dict]) -> 'MultiCurrencyLedger':
+        """依次处理多笔交易，返回账本本身"""
+        for trans in transactions:
+            self.add(trans)
+        return self
+
+    def summary(self) -> Dict:
+        """
+        生成汇总
+
+        Returns:
+            包含基准货币合计 (成本、收入、佣金、已实现盈亏、持仓成本) 和
+            by_currency ({币种: 本币的 calculate_multiple_transactions 摘要}) 的字典
+        """
+        return {
+            'base_currency': self.fx.base,
+            'total_cost': _cents(self.total_cost),
+            'total_proceeds': _cents(self.total_proceeds),
+            'total_buy_commission': _cents(self.total_buy_commission),
+            'total_sell_commission': _cents(self.total_sell_commission),
+            'total_commission': _cents(self.total_buy_commission + self.total_sell_commission),
+            'realized_profit': _cents(self.realized_profit),
+            'open_cost_basis': _cents(sum((p.cost for p in self._positions.values()), Decimal('0'))),
+            'by_currency': {currency: totals.summary() for currency, totals in self._totals.items()}
+        }
+
+
+def calculate_multi_currency(transactions: Iterable[Dict], fx: FXRates,
+                             calculators: Optional[Dict[str, IBStockCalculator]] = None) -> Dict:
+    """
+    计算多币种交易并以基准货币汇总
+
+    Args:
+        transactions: 交易迭代器，每个交易包含 currency、timestamp、type、shares、price (可选 symbol)
+        fx: 汇率序列
+        calculators: {币种: 计算器} (默认所有币种使用IB默认费率)
+
+    Returns:
+        MultiCurrencyLedger.summary() 的结果
+    """
+    return MultiCurrencyLedger(fx, calculators).extend(transactions).summary()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+计算器运行指标 / Calculator Instrumentation
+
+按需开启的计算器指标采集，记录每个方法的调用次数、延迟直方图、
+Decimal 构造次数和缓存命中率，快照可导出为JSON或Prometheus文本格式。
+
+未挂载时计算器不做任何额外工作: attach() 只在计算器实例上用计时包装覆盖方法，
+detach() 删除这些实例属性后即恢复原来的方法。Decimal 构造计数需要在挂载期间替换
+ib_calculator.Decimal (对整个进程生效)，但只统计当前线程中被挂载方法内部的构造。
+
+用法:
+    instrumentation = Instrumentation()
+    with instrumentation.attached(calculator):
+        calculator.calculate_multiple_transactions(transactions)
+    instrumentation.write_prometheus('/var/lib/node_exporter/ib_calculator.prom')
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import wraps
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import ib_calculator
+from ib_calculator import IBStockCalculator
+
+
+# 默认挂载的方法
+METHODS = (
+    'calculate_commission',
+    'calculate_buy_cost',
+    'calculate_sell_proceeds',
+    'calculate_profit',
+    'calculate_multiple_transactions',
+    'calculate_commissions_cents',
+    'calculate_profit_grid',
+    'calculate_break_even_price',
+    'calculate_break_even_cents',
+)
+
+# 延迟直方图的桶上限 (秒)
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2, 0.1, 1.0)
+
+
+class _DecimalCounter(threading.local):
+    """
+    每个线程各自的 Decimal 构造计数
+
+    active 为当前线程正在执行的被挂载方法层数，只有 active 不为0时才计数，
+    因此其他线程、未挂载的计算器和挂载方法之外的代码构造的 Decimal 都不会计入。
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.count = 0
+
+
+_decimals = _DecimalCounter()
+_decimal_users = 0
+
+
+class _CountingDecimalType(type):
+    def __instancecheck__(cls, instance):
+        return isinstance(instance, Decimal)
+
+    def __subclasscheck__(cls, subclass):
+        return issubclass(subclass, Decimal)
+
+
+class _CountingDecimal(Decimal, metaclass=_CountingDecimalType):
+    """
+    挂载期间替换 ib_calculator.Decimal，构造时计数并返回普通的 Decimal
+
+    只统计 ib_calculator 中显式的 Decimal(...) 构造，不包括运算产生的中间结果。
+    isinstance 检查与 Decimal 等价。替换对整个进程生效 (模块属性无法按线程替换)，
+    但只有当前线程处于被挂载方法的调用中时才计数；其他代码只多一次函数调用的开销。
+    """
+
+    def __new__(cls, value='0', context=None):
+        counter = _decimals
+        if counter.active:
+            counter.count += 1
+        return Decimal(value, context)
+
+
+def _count_decimals(enable: bool):
+    """按引用计数替换或恢复 ib_calculator.Decimal"""
+    global _decimal_users
+    _decimal_users += 1 if enable else -1
+    ib_calculator.Decimal = _CountingDecimal if _decimal_users else Decimal
+
+
+class _MethodStats:
+    """单个方法的累计指标"""
+
+    __slots__ = ('calls', 'errors', 'seconds', 'decimals', 'buckets')
+
+    def __init__(self, bucket_count: int):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.decimals = 0
+        # 最后一个桶对应 +Inf
+        self.buckets = [0] * (bucket_count + 1)
+
+
+class Instrumentation:
+    """
+    计算器指标采集器
+
+    一个采集器可以同时挂载到多个计算器，指标按方法名合并。
+    嵌套调用 (例如 calculate_buy_cost 内部调用 calculate_commission) 在两个方法中都会计入。
+    同一时刻只应在一个线程中使用被挂载的计算器；挂载期间计算器不能被pickle
+    (例如传给 ib_parallel 的工作进程)。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 methods: Sequence[str] = METHODS):
+        """
+        Args:
+            buckets: 升序的延迟直方图桶上限 (秒)
+            methods: 需要记录的计算器方法名
+        """
+        if any(a >= b for a, b in zip(buckets, buckets[1:])):
+            raise ValueError("buckets 必须严格升序")
+        self.buckets = tuple(buckets)
+        self.methods = tuple(methods)
+        self._stats: Dict[str, _MethodStats] = {}
+        # {id(计算器): (计算器, 挂载时的缓存统计, 挂载前实例上的方法)}
+        self._calculators: Dict[int, tuple] = {}
+        # 已卸载的计算器在挂载期间的缓存统计
+        self._cache_totals = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _wrap(self, name: str, method):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _MethodStats(len(self.buckets))
+        buckets = self.buckets
+        counter = _decimals
+        perf_counter = time.perf_counter
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            counter.active += 1
+            decimals = counter.count
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                counter.active -= 1
+                stats.calls += 1
+                stats.seconds += elapsed
+                stats.decimals += counter.count - decimals
+                stats.buckets[bisect_left(buckets, elapsed)] += 1
+
+        return timed
+
+    def attach(self, calculator: IBStockCalculator):
+        """开始记录一个计算器的调用"""
+        if id(calculator) in self._calculators:
+            return
+        # 保存实例上原有的方法 (例如启用缓存时的缓存包装)，卸载时恢复
+        saved = {name: vars(calculator)[name] for name in self.methods if name in vars(calculator)}
+        for name in self.methods:
+            setattr(calculator, name, self._wrap(name, getattr(calculator, name)))
+        self._calculators[id(calculator)] = (calculator, calculator.cache_info(), saved)
+        _count_decimals(True)
+
+    def detach(self, calculator: IBStockCalculator):
+        """停止记录，计算器恢复为未挂载时的方法 (已采集的指标保留)"""
+        entry = self._calculators.pop(id(calculator), None)
+        if entry is None:
+            return
+        for name in self.methods:
+            calculator.__dict__.pop(name, None)
+        calculator.__dict__.update(entry[2])
+        self._record_cache(calculator, entry[1])
+        _count_decimals(False)
+
+    @contextmanager
+    def attached(self, calculator: IBStockCalculator) -> Iterator[IBStockCalculator]:
+        """在 with 块内记录计算器的调用"""
+        self.attach(calculator)
+        try:
+            yield calculator
+        finally:
+            self.detach(calculator)
+
+    def _record_cache(self, calculator: IBStockCalculator, baseline: Dict[str, int]):
+        info = calculator.cache_info()
+        for key in ('hits', 'misses', 'evictions'):
+            self._cache_totals[key] += max(info[key] - baseline[key], 0)
+
+    def reset(self):
+        """清空已采集的指标，已挂载的计算器继续记录"""
+        for stats in self._stats.values():
+            stats.calls = stats.errors = stats.decimals = 0
+            stats.seconds = 0.0
+            stats.buckets = [0] * (len(self.buckets) + 1)
+        self._cache_totals = {'hits': 0, 'misses': 0, 'evictions': 0}
+        for key, (calculator, _, saved) in self._calculators.items():
+            self._calculators[key] = (calculator, calculator.cache_info(), saved)
+
+    def snapshot(self) -> Dict:
+        """
+        获取当前指标
+
+        Returns:
+            包含 methods ({方法名: 调用次数、错误次数、总耗时、平均耗时、Decimal构造次数、直方图})
+            和 cache (命中、未命中、淘汰次数和命中率) 的字典
+        """
+        methods = {}
+        for name, stats in self._stats.items():
+            methods[name] = {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'total_seconds': stats.seconds,
+                'mean_seconds': stats.seconds / stats.calls if stats.calls else 0.0,
+                'decimals_constructed': stats.decimals,
+                'decimals_per_call': stats.decimals / stats.calls if stats.calls else 0.0,
+                'histogram': {
+                    'buckets': list(self.buckets) + ['+Inf'],
+                    'counts': list(stats.buckets)
+                }
+            }
+
+        cache = dict(self._cache_totals)
+        for calculator, baseline, _ in self._calculators.values():
+            info = calculator.cache_info()
+            for key in ('hits', 'misses', 'evictions'):
+                cache[key] += max(info[key] - baseline[key], 0)
+        lookups = cache['hits'] + cache['misses']
+        cache['hit_rate'] = cache['hits'] / lookups if lookups else 0.0
+        return {'methods': methods, 'cache': cache}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """把快照导出为JSON文本"""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix: str = 'ib_calculator') -> str:
+        """
+        把快照导出为Prometheus文本格式 (exposition format 0.0.4)
+
+        Args:
+            prefix: 指标名前缀
+        """
+        snapshot = self.snapshot()
+        methods = snapshot['methods']
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, description: str):
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        metric('calls_total', 'counter', 'Calculator method calls.')
+        for name, stats in methods.items():
+            lines.append(f'{prefix}_calls_total{{method="{name}"}} {stats["calls"]}')
+        metric('errors_total', 'counter', 'Calculator method calls that raised.')
+        for name, stats in methods.items():
+            lines.append(f'{prefix}_errors_total{{method="{name}"}} {stats["errors"]}')
+        metric('decimals_constructed_total', 'counter', 'Decimal objects constructed inside calls.')
+        for name, stats in methods.items():
+            lines.append(f'{prefix}_decimals_constructed_total{{method="{name}"}} '
+                         f'{stats["decimals_constructed"]}')
+
+        metric('call_duration_seconds', 'histogram', 'Calculator method latency.')
+        for name, stats in methods.items():
+            cumulative = 0
+            for bound, count in zip(stats['histogram']['buckets'], stats['histogram']['counts']):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f'{prefix}_call_duration_seconds_bucket{{method="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_call_duration_seconds_sum{{method="{name}"}} {stats["total_seconds"]!r}')
+            lines.append(f'{prefix}_call_duration_seconds_count{{method="{name}"}} {stats["calls"]}')
+
+        cache = snapshot['cache']
+        for key in ('hits', 'misses', 'evictions'):
+            metric(f'cache_{key}_total', 'counter', f'Result cache {key}.')
+            lines.append(f'{prefix}_cache_{key}_total {cache[key]}')
+        metric('cache_hit_ratio', 'gauge', 'Result cache hit ratio.')
+        lines.append(f'{prefix}_cache_hit_ratio {cache["hit_rate"]!r}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str):
+        """把JSON快照写入文件"""
+        _write_atomic(path, self.to_json())
+
+    def write_prometheus(self, path: str, prefix: str = 'ib_calculator'):
+        """
+        把Prometheus文本写入文件 (例如 node_exporter 的 textfile 目录)
+
+        先写临时文件再重命名，采集方不会读到写了一半的文件。
+        """
+        _write_atomic(path, self.to_prometheus(prefix))
+
+
+def _write_atomic(path: str, text: str):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+    os.replace(temporary, path)
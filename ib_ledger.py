@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+增量账本 / Incremental Ledgers
+
+逐笔追加交易并随时给出与 calculate_multiple_transactions 相同的摘要，
+无需在每次成交后重新计算整个交易列表。
+带时间戳的账本另外保存累计前缀和，任意时间区间的已实现盈亏、佣金和成交量
+只需两次二分查找和一次相减。
+"""
+
+from bisect import bisect_left
+from collections import deque
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional
+
+from ib_calculator import IBStockCalculator, TransactionTotals
+
+
+class IncrementalLedger:
+    """
+    增量账本
+
+    每笔交易 O(1) 更新累计值，并保留最近交易的增量以支持撤销 (成交取消或更正)。
+
+    用法:
+        ledger = IncrementalLedger()
+        ledger.append('buy', 100, 50.00)
+        ledger.append('sell', 40, 55.00)
+        ledger.rollback(1)
+        ledger.summary()
+    """
+
+    def __init__(self, calculator: Optional[IBStockCalculator] = None,
+                 max_history: Optional[int] = None):
+        """
+        初始化账本
+
+        Args:
+            calculator: 使用的计算器 (默认IB默认费率)
+            max_history: 最多可撤销的交易笔数 (默认None，不限)；
+                限制后内存占用为常数，更早的交易不能再撤销
+        """
+        self.calculator = calculator or IBStockCalculator()
+        self._totals = TransactionTotals(self.calculator)
+        self._history = deque(maxlen=max_history)
+
+    def append(self, trans_type: str, shares: int, price: float) -> Optional[Dict]:
+        """
+        追加一笔交易
+
+        Args:
+            trans_type: 'buy' 或 'sell'
+            shares: 股数
+            price: 价格
+
+        Returns:
+            calculate_buy_cost / calculate_sell_proceeds 的结果
+        """
+        info = self._totals.add(trans_type, shares, price)
+        self._history.append((trans_type, shares, info))
+        return info
+
+    def extend(self, transactions: Iterable[Dict]):
+        """
+        依次追加多笔交易
+
+        Args:
+            transactions: 交易迭代器，每个交易包含 type、shares、price
+        """
+        for trans in transactions:
+            self.append(trans['type'], trans['shares'], trans['price'])
+
+    def rollback(self, count: int = 1):
+        """
+        撤销最近的 count 笔交易
+
+        Args:
+            count: 撤销笔数
+
+        Raises:
+            ValueError: 可撤销的历史不足 count 笔
+        """
+        if count < 0:
+            raise ValueError("撤销笔数不能为负数")
+        if count > len(self._history):
+            raise ValueError(f"只能撤销最近 {len(self._history)} 笔交易，无法撤销 {count} 笔")
+        for _ in range(count):
+            trans_type, shares, info = self._history.pop()
+            self._totals.subtract(trans_type, shares, info)
+
+    @property
+    def remaining_shares(self) -> int:
+        """当前持有股数"""
+        return self._totals.remaining_shares
+
+    def __len__(self) -> int:
+        return self._totals.transaction_count
+
+    def summary(self) -> Dict:
+        """生成与 calculate_multiple_transactions 相同格式的摘要"""
+        return self._totals.summary()
+
+
+# 带时间戳账本的累计字段
+PREFIX_FIELDS = (
+    'buy_shares',
+    'sell_shares',
+    'total_cost',
+    'total_proceeds',
+    'buy_commission',
+    'sell_commission',
+    'realized_profit',
+)
+
+
+class TimestampedLedger:
+    """
+    带时间戳的账本
+
+    交易按时间顺序追加，构建时一次计算每个字段的累计前缀和，
+    之后任意时间区间 [start, end) 的查询为 O(log n): 二分查找区间两端，前缀和相减。
+
+    卖出的已实现盈亏按移动平均成本计算 (与 Portfolio(method='average') 相同)，
+    即卖出净收入减去卖出时持仓平均成本 × 卖出股数。
+
+    用法:
+        ledger = TimestampedLedger(transactions)     # 每个交易包含 timestamp
+        ledger.realized_profit(start, end)
+        ledger.range_summary(start, end)
+    """
+
+    def __init__(self, transactions: Iterable[Dict] = (),
+                 calculator: Optional[IBStockCalculator] = None):
+        """
+        初始化账本
+
+        Args:
+            transactions: 交易迭代器，每个交易包含 timestamp、type、shares、price；
+                构建时按 timestamp 稳定排序。时间戳可以是任意可比较的值
+                (例如 datetime、纳秒整数或ISO日期字符串)，但同一账本内必须一致
+            calculator: 使用的计算器 (默认IB默认费率)
+        """
+        self.calculator = calculator or IBStockCalculator()
+        self._timestamps: List[Any] = []
+        # 每个字段的前缀和，第i项为前i笔交易的合计
+        self._prefix = {field: [0 if field.endswith('_shares') else Decimal('0')]
+                        for field in PREFIX_FIELDS}
+        self._held_shares = 0
+        self._held_cost = Decimal('0')
+        for trans in sorted(transactions, key=lambda trans: trans['timestamp']):
+            self.append(trans['timestamp'], trans['type'], trans['shares'], trans['price'])
+
+    def append(self, timestamp, trans_type: str, shares: int, price: float):
+        """
+        追加一笔交易，摊还 O(1)
+
+        Args:
+            timestamp: 时间戳，不能早于已有的最后一笔交易
+            trans_type: 'buy' 或 'sell'
+            shares: 股数
+            price: 价格
+        """
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            raise ValueError(f"时间戳 {timestamp!r} 早于最后一笔交易 {self._timestamps[-1]!r}")
+
+        buy_shares = sell_shares = 0
+        cost = proceeds = buy_commission = sell_commission = realized = Decimal('0')
+        if trans_type == 'buy':
+            info = self.calculator.calculate_buy_cost(shares, price)
+            buy_shares = shares
+            cost = info['total_cost']
+            buy_commission = info['commission']
+            self._held_shares += shares
+            self._held_cost += cost
+        elif trans_type == 'sell':
+            if shares > self._held_shares:
+                raise ValueError(f"卖出股数 {shares} 超过持有股数 {self._held_shares}")
+            info = self.calculator.calculate_sell_proceeds(shares, price)
+            sold_cost = self._held_cost if shares == self._held_shares \
+                else self._held_cost * shares / self._held_shares
+            self._held_shares -= shares
+            self._held_cost -= sold_cost
+            sell_shares = shares
+            proceeds = info['net_proceeds']
+            sell_commission = info['commission']
+            realized = proceeds - sold_cost
+        else:
+            raise ValueError(f"未知的交易类型 {trans_type!r}")
+
+        self._timestamps.append(timestamp)
+        prefix = self._prefix
+        for field, value in (('buy_shares', buy_shares), ('sell_shares', sell_shares),
+                             ('total_cost', cost), ('total_proceeds', proceeds),
+                             ('buy_commission', buy_commission), ('sell_commission', sell_commission),
+                             ('realized_profit', realized)):
+            column = prefix[field]
+            column.append(column[-1] + value)
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def _bounds(self, start, end):
+        """时间区间 [start, end) 对应的交易下标区间，None 表示不限"""
+        timestamps = self._timestamps
+        low = 0 if start is None else bisect_left(timestamps, start)
+        high = len(timestamps) if end is None else bisect_left(timestamps, end)
+        return low, max(low, high)
+
+    def _range(self, field: str, start, end):
+        low, high = self._bounds(start, end)
+        column = self._prefix[field]
+        return column[high] - column[low]
+
+    def realized_profit(self, start=None, end=None) -> Decimal:
+        """时间区间 [start, end) 内卖出的已实现盈亏"""
+        return _cents(self._range('realized_profit', start, end))
+
+    def commission(self, start=None, end=None) -> Decimal:
+        """时间区间 [start, end) 内的买卖佣金合计"""
+        return _cents(self._range('buy_commission', start, end)
+                      + self._range('sell_commission', start, end))
+
+    def volume(self, start=None, end=None) -> int:
+        """时间区间 [start, end) 内的成交股数 (买入加卖出)"""
+        return self._range('buy_shares', start, end) + self._range('sell_shares', start, end)
+
+    def range_summary(self, start=None, end=None) -> Dict:
+        """
+        时间区间 [start, end) 的汇总
+
+        Args:
+            start: 起始时间 (包含)，None 表示从第一笔开始
+            end: 结束时间 (不包含)，None 表示到最后一笔
+
+        Returns:
+            包含交易笔数、买卖股数、成本、收入、佣金和已实现盈亏的字典
+        """
+        low, high = self._bounds(start, end)
+        prefix = self._prefix
+        totals = {field: prefix[field][high] - prefix[field][low] for field in PREFIX_FIELDS}
+        commission = totals['buy_commission'] + totals['sell_commission']
+        return {
+            'transaction_count': high - low,
+            'buy_shares': totals['buy_shares'],
+            'sell_shares': totals['sell_shares'],
+            'volume': totals['buy_shares'] + totals['sell_shares'],
+            'total_cost': _cents(totals['total_cost']),
+            'total_proceeds': _cents(totals['total_proceeds']),
+            'total_buy_commission': _cents(totals['buy_commission']),
+            'total_sell_commission': _cents(totals['sell_commission']),
+            'total_commission': _cents(commission),
+            'realized_profit': _cents(totals['realized_profit'])
+        }
+
+
+def _cents(value: Decimal) -> Decimal:
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+多账户并行计算 / Parallel Multi-Account Evaluation
+
+把大量相互独立的账户交易记录分块分发到进程池，
+用 calculate_multiple_transactions 计算每个账户的摘要，再合并为全公司汇总。
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from ib_calculator import IBStockCalculator
+
+
+# 汇总时直接相加的金额字段
+ROLLUP_FIELDS = (
+    'total_cost',
+    'total_proceeds',
+    'total_buy_commission',
+    'total_sell_commission',
+    'total_commission',
+    'total_profit',
+)
+
+Ledgers = Union[Mapping[str, List[Dict]], Iterable[Tuple[str, List[Dict]]]]
+
+
+_worker_calculator = None
+
+
+def _init_worker(calculator: IBStockCalculator):
+    global _worker_calculator
+    _worker_calculator = calculator
+
+
+def _evaluate_chunk(chunk: List[Tuple[str, List[Dict]]],
+                    calculator: Optional[IBStockCalculator] = None) -> List[Tuple[str, Dict]]:
+    """计算一块账户的摘要 (默认使用工作进程初始化时的计算器)"""
+    calculator = calculator or _worker_calculator
+    results = []
+    for account, transactions in chunk:
+        try:
+            results.append((account, calculator.calculate_multiple_transactions(transactions)))
+        except ValueError as e:
+            raise ValueError(f"账户 {account}: {e}") from None
+    return results
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _unique_accounts(items: Iterable[Tuple[str, List[Dict]]]) -> Iterator[Tuple[str, List[Dict]]]:
+    """逐个产出账户，遇到重复的账户ID时报错，避免结果字典中互相覆盖"""
+    seen = set()
+    for account, transactions in items:
+        if account in seen:
+            raise ValueError(f"重复的账户ID: {account!r}")
+        seen.add(account)
+        yield account, transactions
+
+
+def _iter_chunk_results(calculator: IBStockCalculator, chunks: Iterable[List],
+                        max_workers: Optional[int]) -> Iterator[List[Tuple[str, Dict]]]:
+    """按块计算，多进程时最多同时提交 2 × 进程数 块，保持输入顺序且内存有界"""
+    if max_workers == 1:
+        for chunk in chunks:
+            yield _evaluate_chunk(chunk, calculator)
+        return
+
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(calculator,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_evaluate_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def merge_summaries(summaries: Iterable[Dict]) -> Dict:
+    """
+    合并多个账户摘要为汇总
+
+    各金额字段已按分舍入，直接相加即可得到精确结果，与合并顺序无关。
+
+    Args:
+        summaries: calculate_multiple_transactions 返回的摘要
+
+    Returns:
+        包含账户数、剩余股数和各金额合计的字典
+    """
+    rollup = {'accounts': 0, 'remaining_shares': 0}
+    rollup.update((field, Decimal('0.00')) for field in ROLLUP_FIELDS)
+    for summary in summaries:
+        rollup['accounts'] += 1
+        rollup['remaining_shares'] += summary['remaining_shares']
+        for field in ROLLUP_FIELDS:
+            rollup[field] += summary[field]
+    return rollup
+
+
+def evaluate_ledgers(ledgers: Ledgers, calculator: Optional[IBStockCalculator] = None,
+                     max_workers: Optional[int] = None, chunk_size: int = 64) -> Dict:
+    """
+    并行计算多个账户并生成全公司汇总
+
+    账户按 chunk_size 分块提交，同时在途的块数有上限，计算器只在进程池初始化时
+    复制到每个工作进程一次。结果按输入顺序合并，与串行计算完全一致。
+
+    Args:
+        ledgers: {账户: 交易列表} 或 (账户, 交易列表) 的迭代器；账户ID不能重复
+        calculator: 使用的计算器 (默认IB默认费率)，会复制到每个工作进程
+        max_workers: 进程数 (默认CPU核数)；为1时在当前进程串行计算
+        chunk_size: 每个任务包含的账户数
+
+    Returns:
+        包含 accounts ({账户: 摘要}) 和 rollup (汇总) 的字典
+
+    Raises:
+        ValueError: chunk_size 不是正整数、账户ID重复或某个账户的交易无效
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size 必须为正整数")
+    calculator = calculator or IBStockCalculator()
+    items = ledgers.items() if isinstance(ledgers, Mapping) else ledgers
+    chunks = _chunks(_unique_accounts(items), chunk_size)
+    chunk_results = _iter_chunk_results(calculator, chunks, max_workers)
+    accounts = dict(pair for results in chunk_results for pair in results)
+
+    return {
+        'accounts': accounts,
+        'rollup': merge_summaries(accounts.values())
+    }
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+多股票投资组合引擎 / Multi-Symbol Portfolio Engine
+
+按股票代码分别记录持仓，并按所选方法 (FIFO、LIFO、最高成本优先或平均成本)
+匹配卖出与买入批次 (lot)，计算已实现盈亏。
+"""
+
+import heapq
+from collections import deque
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Optional
+
+from ib_calculator import IBStockCalculator
+
+
+LOT_METHODS = ('fifo', 'lifo', 'highest_cost', 'average')
+
+
+class Lot:
+    """一个买入批次: 剩余股数和剩余成本 (含买入佣金)"""
+
+    __slots__ = ('shares', 'cost')
+
+    def __init__(self, shares: int, cost: Decimal):
+        self.shares = shares
+        self.cost = cost
+
+    def take(self, shares: int) -> Decimal:
+        """
+        从批次中取出部分股数
+
+        Returns:
+            取出部分的成本，按剩余成本等比例分摊；取完时返回全部剩余成本，避免舍入残差
+        """
+        if shares >= self.shares:
+            cost = self.cost
+        else:
+            cost = self.cost * shares / self.shares
+        self.shares -= shares
+        self.cost -= cost
+        return cost
+
+
+class _LotQueue:
+    """按FIFO或LIFO顺序匹配的批次队列，每次买卖摊还 O(1)"""
+
+    __slots__ = ('lots', 'shares', 'cost', 'lifo')
+
+    def __init__(self, lifo: bool = False):
+        self.lots = deque()
+        self.shares = 0
+        self.cost = Decimal('0')
+        self.lifo = lifo
+
+    def add(self, shares: int, cost: Decimal):
+        self.lots.append(Lot(shares, cost))
+        self.shares += shares
+        self.cost += cost
+
+    def remove(self, shares: int) -> Decimal:
+        lots = self.lots
+        removed = Decimal('0')
+        remaining = shares
+        while remaining:
+            lot = lots[-1] if self.lifo else lots[0]
+            taken = min(remaining, lot.shares)
+            removed += lot.take(taken)
+            remaining -= taken
+            if not lot.shares:
+                if self.lifo:
+                    lots.pop()
+                else:
+                    lots.popleft()
+        self.shares -= shares
+        self.cost -= removed
+        return removed
+
+    def __len__(self) -> int:
+        return len(self.lots)
+
+
+class _HighestCostLots:
+    """最高单位成本优先匹配的批次堆，每次买卖 O(log n)"""
+
+    __slots__ = ('heap', 'shares', 'cost', 'sequence')
+
+    def __init__(self):
+        self.heap = []
+        self.shares = 0
+        self.cost = Decimal('0')
+        self.sequence = 0
+
+    def add(self, shares: int, cost: Decimal):
+        # 单位成本相同时按买入顺序匹配
+        heapq.heappush(self.heap, (-(cost / shares), self.sequence, Lot(shares, cost)))
+        self.sequence += 1
+        self.shares += shares
+        self.cost += cost
+
+    def remove(self, shares: int) -> Decimal:
+        heap = self.heap
+        removed = Decimal('0')
+        remaining = shares
+        while remaining:
+            lot = heap[0][2]
+            taken = min(remaining, lot.shares)
+            removed += lot.take(taken)
+            remaining -= taken
+            if not lot.shares:
+                heapq.heappop(heap)
+        self.shares -= shares
+        self.cost -= removed
+        return removed
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class _AverageCost:
+    """平均成本法: 只保存总股数和总成本，不区分批次"""
+
+    __slots__ = ('shares', 'cost')
+
+    def __init__(self):
+        self.shares = 0
+        self.cost = Decimal('0')
+
+    def add(self, shares: int, cost: Decimal):
+        self.shares += shares
+        self.cost += cost
+
+    def remove(self, shares: int) -> Decimal:
+        removed = self.cost if shares == self.shares else self.cost * shares / self.shares
+        self.shares -= shares
+        self.cost -= removed
+        return removed
+
+    def __len__(self) -> int:
+        return 1 if self.shares else 0
+
+
+def _new_lots(method: str):
+    if method == 'fifo':
+        return _LotQueue()
+    if method == 'lifo':
+        return _LotQueue(lifo=True)
+    if method == 'highest_cost':
+        return _HighestCostLots()
+    return _AverageCost()
+
+
+class Position:
+    """单只股票的持仓: 批次、已实现盈亏和佣金累计"""
+
+    __slots__ = ('symbol', 'lots', 'realized_profit', 'buy_commission', 'sell_commission')
+
+    def __init__(self, symbol: str, method: str):
+        self.symbol = symbol
+        self.lots = _new_lots(method)
+        self.realized_profit = Decimal('0')
+        self.buy_commission = Decimal('0')
+        self.sell_commission = Decimal('0')
+
+    def summary(self) -> Dict:
+        """生成持仓摘要"""
+        shares = self.lots.shares
+        cost = self.lots.cost
+        return {
+            'symbol': self.symbol,
+            'shares': shares,
+            'lot_count': len(self.lots),
+            'cost_basis': cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'avg_cost_per_share': (cost / Decimal(shares)).quantize(
+                Decimal('0.0001'), rounding=ROUND_HALF_UP
+            ) if shares else Decimal('0'),
+            'realized_profit': self.realized_profit.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'total_commission': (self.buy_commission + self.sell_commission).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP
+            )
+        }
+
+
+class Portfolio:
+    """
+    多股票投资组合
+
+    每只股票独立记录买入批次，卖出时按 method 匹配批次并计算已实现盈亏:
+        - 'fifo': 先进先出
+        - 'lifo': 后进先出
+        - 'highest_cost': 单位成本最高的批次优先
+        - 'average': 平均成本法
+    """
+
+    def __init__(self, calculator: Optional[IBStockCalculator] = None, method: str = 'fifo'):
+        """
+        初始化投资组合
+
+        Args:
+            calculator: 用于计算佣金的计算器 (默认使用IB默认费率)
+            method: 批次匹配方法，见 LOT_METHODS
+        """
+        if method not in LOT_METHODS:
+            raise ValueError(f"未知的批次匹配方法 {method!r}，可选: {', '.join(LOT_METHODS)}")
+        self.calculator = calculator or IBStockCalculator()
+        self.method = method
+        self._positions: Dict[str, Position] = {}
+
+    def _position(self, symbol: str) -> Position:
+        position = self._positions.get(symbol)
+        if position is None:
+            position = self._positions[symbol] = Position(symbol, self.method)
+        return position
+
+    def buy(self, symbol: str, shares: int, price: float) -> Dict:
+        """
+        买入并新增一个批次
+
+        Returns:
+            calculate_buy_cost 的结果
+        """
+        buy_info = self.calculator.calculate_buy_cost(shares, price)
+        position = self._position(symbol)
+        position.lots.add(shares, buy_info['total_cost'])
+        position.buy_commission += buy_info['commission']
+        return buy_info
+
+    def sell(self, symbol: str, shares: int, price: float) -> Dict:
+        """
+        卖出并按匹配方法消耗批次
+
+        Returns:
+            包含净收入、匹配成本和已实现盈亏的字典
+        """
+        position = self._positions.get(symbol)
+        held = position.lots.shares if position else 0
+        if shares > held:
+            raise ValueError(f"{symbol} 卖出股数 {shares} 超过持有股数 {held}")
+        position = self._position(symbol)
+
+        sell_info = self.calculator.calculate_sell_proceeds(shares, price)
+        cost_basis = position.lots.remove(shares)
+        profit = sell_info['net_proceeds'] - cost_basis
+        position.realized_profit += profit
+        position.sell_commission += sell_info['commission']
+
+        return {
+            'symbol': symbol,
+            'shares': shares,
+            'net_proceeds': sell_info['net_proceeds'],
+            'commission': sell_info['commission'],
+            'cost_basis': cost_basis.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'realized_profit': profit.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        }
+
+    def apply(self, transactions: Iterable[Dict]) -> 'Portfolio':
+        """
+        依次处理交易
+
+        Args:
+            transactions: 交易迭代器，每个交易包含 symbol、type ('buy'/'sell')、shares、price
+
+        Returns:
+            投资组合本身，便于链式调用
+        """
+        for trans in transactions:
+            if trans['type'] == 'buy':
+                self.buy(trans['symbol'], trans['shares'], trans['price'])
+            elif trans['type'] == 'sell':
+                self.sell(trans['symbol'], trans['shares'], trans['price'])
+        return self
+
+    def position(self, symbol: str) -> Dict:
+        """获取单只股票的持仓摘要"""
+        position = self._positions.get(symbol) or Position(symbol, self.method)
+        return position.summary()
+
+    def positions(self) -> Dict[str, Dict]:
+        """获取所有股票的持仓摘要"""
+        return {symbol: position.summary() for symbol, position in self._positions.items()}
+
+    def summary(self) -> Dict:
+        """汇总所有股票的成本、已实现盈亏和佣金"""
+        cost_basis = Decimal('0')
+        realized_profit = Decimal('0')
+        commission = Decimal('0')
+        for position in self._positions.values():
+            cost_basis += position.lots.cost
+            realized_profit += position.realized_profit
+            commission += position.buy_commission + position.sell_commission
+        return {
+            'symbols': len(self._positions),
+            'open_symbols': sum(1 for p in self._positions.values() if p.lots.shares),
+            'cost_basis': cost_basis.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'realized_profit': realized_profit.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            'total_commission': commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        }
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+批量报告输出 / Bulk Report Rendering
+
+把大量交易摘要写入同一个带缓冲的输出流，支持纯文本、CSV和自包含的HTML表格。
+摘要先在内存中拼接，累计到缓冲区大小后一次写出，避免逐行 print 的开销。
+
+用法:
+    with open('eod.html', 'w', encoding='utf-8') as handle:
+        with ReportWriter(handle, 'html') as report:
+            for account, summary in summaries.items():
+                report.write(summary, account)
+"""
+
+import csv
+import html
+from collections.abc import Mapping
+from typing import Iterable, List, Optional, TextIO, Tuple, Union
+
+from ib_calculator import format_transaction_summary
+
+
+REPORT_FORMATS = ('text', 'csv', 'html')
+
+# calculate_profit 结果的列: (列名, 所在子字典, 字段)
+PROFIT_COLUMNS = (
+    ('buy_shares', 'buy_info', 'shares'),
+    ('buy_price', 'buy_info', 'price'),
+    ('buy_stock_cost', 'buy_info', 'stock_cost'),
+    ('buy_commission', 'buy_info', 'commission'),
+    ('buy_total_cost', 'buy_info', 'total_cost'),
+    ('buy_avg_cost_per_share', 'buy_info', 'avg_cost_per_share'),
+    ('sell_shares', 'sell_info', 'shares'),
+    ('sell_price', 'sell_info', 'price'),
+    ('sell_gross_proceeds', 'sell_info', 'gross_proceeds'),
+    ('sell_commission', 'sell_info', 'commission'),
+    ('sell_net_proceeds', 'sell_info', 'net_proceeds'),
+    ('cost_for_sold_shares', None, 'cost_for_sold_shares'),
+    ('profit', None, 'profit'),
+    ('profit_percentage', None, 'profit_percentage'),
+    ('remaining_shares', None, 'remaining_shares'),
+    ('remaining_cost', None, 'remaining_cost'),
+    ('remaining_avg_cost', None, 'remaining_avg_cost'),
+)
+
+# calculate_multiple_transactions 摘要的列
+SUMMARY_COLUMNS = (
+    'remaining_shares',
+    'total_cost',
+    'total_proceeds',
+    'total_buy_commission',
+    'total_sell_commission',
+    'total_commission',
+    'avg_cost_per_share',
+    'total_profit',
+    'profit_percentage',
+)
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="zh">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: -apple-system, "Segoe UI", "PingFang SC", sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; }}
+th {{ background: #f0f0f0; position: sticky; top: 0; }}
+td {{ text-align: right; font-variant-numeric: tabular-nums; }}
+td:first-child {{ text-align: left; }}
+tr:nth-child(even) td {{ background: #fafafa; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<table>
+"""
+
+_HTML_TAIL = """</table>
+</body>
+</html>
+"""
+
+
+def _row(result: Mapping) -> Tuple[str, List]:
+    """把摘要展开为一行，返回 (摘要类型, 值列表)"""
+    if 'buy_info' in result:
+        return 'profit', [result[field] if parent is None else result[parent][field]
+                          for _, parent, field in PROFIT_COLUMNS]
+    return 'summary', [result[field] for field in SUMMARY_COLUMNS]
+
+
+class _Sink:
+    """csv.writer 的写入目标，把格式化好的行交给报告缓冲区"""
+
+    __slots__ = ('write',)
+
+    def __init__(self, write):
+        self.write = write
+
+
+class ReportWriter:
+    """
+    带缓冲的报告输出
+
+    text 格式与 print_transaction_summary 的输出相同 (可选地在每个摘要前加账户行)；
+    csv 和 html 格式每个摘要一行，列由第一个摘要的类型 (calculate_profit 的结果或
+    calculate_multiple_transactions 的摘要) 决定，同一报告内不能混用两种摘要。
+    """
+
+    def __init__(self, target: TextIO, format: str = 'text', buffer_size: int = 1 << 16,
+                 title: str = '交易报告 Transaction Report'):
+        """
+        Args:
+            target: 可写的文本文件对象 (例如 open(..., 'w')、sys.stdout 或 io.StringIO)
+            format: 'text'、'csv' 或 'html'
+            buffer_size: 累计多少个字符后写出一次
+            title: HTML报告的标题
+        """
+        if format not in REPORT_FORMATS:
+            raise ValueError(f"未知的报告格式 {format!r}，可选: {', '.join(REPORT_FORMATS)}")
+        self.target = target
+        self.format = format
+        self.buffer_size = buffer_size
+        self.title = title
+        self.count = 0
+        self._chunks: List[str] = []
+        self._size = 0
+        self._kind: Optional[str] = None
+        self._csv = csv.writer(_Sink(self._append), lineterminator='\n') if format == 'csv' else None
+        self._closed = False
+
+    def write(self, result: Mapping, account: Optional[str] = None):
+        """
+        写入一个摘要
+
+        Args:
+            result: calculate_profit 或 calculate_multiple_transactions 的结果
+            account: 账户名 (可选)，作为第一列或文本摘要前的标题行
+        """
+        if self._closed:
+            raise ValueError("报告已关闭")
+
+        if self.format == 'text':
+            if account is not None:
+                self._append(f"\n账户 Account: {account}")
+            self._append(format_transaction_summary(result))
+        else:
+            kind, values = _row(result)
+            if self._kind is None:
+                self._kind = kind
+                self._header(kind)
+            elif kind != self._kind:
+                raise ValueError("同一报告内不能混用盈利结果和多笔交易摘要")
+            values.insert(0, '' if account is None else account)
+            if self._csv is not None:
+                self._csv.writerow(values)
+            else:
+                cells = ''.join(f"<td>{html.escape(str(value))}</td>" for value in values)
+                self._append(f"<tr>{cells}</tr>\n")
+        self.count += 1
+
+    def write_many(self, results: Iterable[Union[Mapping, Tuple[str, Mapping]]]):
+        """
+        写入多个摘要
+
+        Args:
+            results: 摘要或 (账户, 摘要) 的迭代器；也可以直接传入 {账户: 摘要} 字典的 items()
+        """
+        for item in results:
+            if isinstance(item, tuple):
+                account, result = item
+                self.write(result, account)
+            else:
+                self.write(item)
+
+    def _header(self, kind: str):
+        if kind == 'profit':
+            columns = ['account'] + [column for column, _, _ in PROFIT_COLUMNS]
+        else:
+            columns = ['account'] + list(SUMMARY_COLUMNS)
+        if self._csv is not None:
+            self._csv.writerow(columns)
+        else:
+            self._append(_HTML_HEAD.format(title=html.escape(self.title)))
+            cells = ''.join(f"<th>{html.escape(column)}</th>" for column in columns)
+            self._append(f"<thead><tr>{cells}</tr></thead>\n<tbody>\n")
+
+    def _append(self, text: str):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区写入目标"""
+        if self._chunks:
+            self.target.write(''.join(self._chunks))
+            self._chunks = []
+            self._size = 0
+
+    def close(self):
+        """写出剩余内容 (HTML报告补上结尾)，不关闭目标文件"""
+        if self._closed:
+            return
+        if self.format == 'html':
+            if self._kind is None:
+                self._append(_HTML_HEAD.format(title=html.escape(self.title)))
+            else:
+                self._append("</tbody>\n")
+            self._append(_HTML_TAIL)
+        self.flush()
+        self._closed = True
+
+    def __enter__(self) -> 'ReportWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def render_report(results: Iterable[Union[Mapping, Tuple[str, Mapping]]], target: TextIO,
+                  format: str = 'text', **options) -> int:
+    """
+    把多个摘要写成一份报告
+
+    Args:
+        results: 摘要或 (账户, 摘要) 的迭代器
+        target: 可写的文本文件对象
+        format: 'text'、'csv' 或 'html'
+        **options: 传给 ReportWriter 的其他参数
+
+    Returns:
+        写入的摘要数
+    """
+    with ReportWriter(target, format, **options) as report:
+        report.write_many(results)
+    return report.count
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+佣金方案 / Commission Schedules
+
+可替换的佣金方案，统一通过 price_fill / price_fills 计价，可以传给
+IBStockCalculator.calculate_multiple_transactions 或 TransactionTotals 替换默认的固定费率:
+    - FixedSchedule: IB固定费率 (与 IBStockCalculator 相同)
+    - TieredSchedule: IB阶梯费率，每股费率随当月累计成交量下降，
+      另加交易所费、清算费和监管费 (SEC费、FINRA交易活动费)
+
+阶梯费率按月累计成交量，用有序断点二分查找 (bisect) 确定每笔成交所在档位，
+一年的成交可以一次遍历完成计价，无需回看历史。
+"""
+
+from bisect import bisect_left
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Hashable, Iterable, Iterator, Optional, Sequence
+
+from ib_calculator import IBStockCalculator, capped_commission
+
+
+class FixedSchedule:
+    """IB固定费率方案，佣金与 IBStockCalculator.calculate_commission 相同，无额外费用"""
+
+    def __init__(self, calculator: Optional[IBStockCalculator] = None):
+        """
+        Args:
+            calculator: 使用的计算器 (默认IB默认费率)
+        """
+        self.calculator = calculator or IBStockCalculator()
+
+    def price_fill(self, shares: int, price: float, side: str = 'buy',
+                   month: Hashable = None) -> Dict[str, Decimal]:
+        """
+        计算一笔成交的费用
+
+        Args:
+            shares: 股数
+            price: 价格
+            side: 'buy' 或 'sell' (固定费率方案不区分)
+            month: 成交月份 (固定费率方案不使用)
+
+        Returns:
+            包含 commission、exchange_fee、clearing_fee、regulatory_fee、total_fees 的字典
+        """
+        commission = self.calculator.calculate_commission(shares, price)
+        zero = Decimal('0.00')
+        return {
+            'commission': commission,
+            'exchange_fee': zero,
+            'clearing_fee': zero,
+            'regulatory_fee': zero,
+            'total_fees': commission
+        }
+
+    def price_fills(self, fills: Iterable[Dict]) -> Iterator[Dict[str, Decimal]]:
+        """
+        依次计算多笔成交的费用
+
+        Args:
+            fills: 成交迭代器，每个成交包含 shares、price，可选 type、month
+        """
+        for fill in fills:
+            yield self.price_fill(fill['shares'], fill['price'], fill.get('type', 'buy'),
+                                  fill.get('month'))
+
+
+class TieredSchedule:
+    """
+    IB阶梯费率方案
+
+    每股费率由成交前的当月累计股数决定 (默认档位):
+        <= 300,000 股:          $0.0035
+        300,001 - 3,000,000:    $0.0020
+        3,000,001 - 20,000,000: $0.0015
+        20,000,001 - 100,000,000: $0.0010
+        > 100,000,000:          $0.0005
+    佣金适用最低 $0.35、最高交易额1% 的限制；交易所费、清算费按股收取，
+    卖出另收SEC费 (按成交额) 和FINRA交易活动费 (按股，有上限)。
+    默认费用仅为示例，实际费率请以IB官网为准。
+    """
+
+    DEFAULT_BREAKPOINTS = (300_000, 3_000_000, 20_000_000, 100_000_000)
+    DEFAULT_RATES = (0.0035, 0.0020, 0.0015, 0.0010, 0.0005)
+
+    def __init__(self, breakpoints: Sequence[int] = DEFAULT_BREAKPOINTS,
+                 rates: Sequence[float] = DEFAULT_RATES,
+                 min_commission: float = 0.35, max_commission_rate: float = 0.01,
+                 exchange_fee: float = 0.0003, clearing_fee: float = 0.0002,
+                 sec_fee_rate: float = 0.0000278, finra_taf: float = 0.000166,
+                 finra_taf_max: float = 8.30):
+        """
+        初始化阶梯费率方案
+
+        Args:
+            breakpoints: 升序排列的月累计股数断点，成交前累计量超过第i个断点时适用 rates[i+1]
+            rates: 各档每股费率，比断点多一个
+            min_commission: 每单最低佣金
+            max_commission_rate: 每单最高佣金 (占交易额比例)
+            exchange_fee: 每股交易所费
+            clearing_fee: 每股清算费
+            sec_fee_rate: 卖出成交额的SEC费率
+            finra_taf: 卖出每股FINRA交易活动费
+            finra_taf_max: 每单FINRA交易活动费上限
+        """
+        if len(rates) != len(breakpoints) + 1:
+            raise ValueError("rates 必须比 breakpoints 多一个")
+        if any(a >= b for a, b in zip(breakpoints, breakpoints[1:])):
+            raise ValueError("breakpoints 必须严格升序")
+        self.breakpoints = list(breakpoints)
+        self.rates = [Decimal(str(rate)) for rate in rates]
+        self.min_commission = Decimal(str(min_commission))
+        self.max_commission_rate = Decimal(str(max_commission_rate))
+        self.exchange_fee = Decimal(str(exchange_fee))
+        self.clearing_fee = Decimal(str(clearing_fee))
+        self.sec_fee_rate = Decimal(str(sec_fee_rate))
+        self.finra_taf = Decimal(str(finra_taf))
+        self.finra_taf_max = Decimal(str(finra_taf_max))
+        self._monthly_volume: Dict[Hashable, int] = {}
+
+    def rate_for_volume(self, volume: int) -> Decimal:
+        """
+        按月累计股数查找每股费率 (二分查找)
+
+        Args:
+            volume: 成交前的当月累计股数
+        """
+        return self.rates[bisect_left(self.breakpoints, volume)]
+
+    def monthly_volume(self, month: Hashable) -> int:
+        """获取某月已累计的成交股数"""
+        return self._monthly_volume.get(month, 0)
+
+    def reset(self):
+        """清空所有月份的累计成交量"""
+        self._monthly_volume.clear()
+
+    def price_fill(self, shares: int, price: float, side: str = 'buy',
+                   month: Hashable = None) -> Dict[str, Decimal]:
+        """
+        计算一笔成交的费用并累计当月成交量
+
+        Args:
+            shares: 股数
+            price: 价格
+            side: 'buy' 或 'sell'，卖出另收监管费
+            month: 成交月份，可以是任意可哈希值 (例如 '2026-10' 或 (2026, 10))
+
+        Returns:
+            包含 rate、commission、exchange_fee、clearing_fee、regulatory_fee、total_fees 的字典
+        """
+        volume = self._monthly_volume.get(month, 0)
+        rate = self.rate_for_volume(volume)
+        self._monthly_volume[month] = volume + shares
+
+        shares_dec = Decimal(str(shares))
+        trade_value = shares_dec * Decimal(str(price))
+
+        commission = capped_commission(shares_dec, trade_value, rate,
+                                       self.min_commission, self.max_commission_rate)
+
+        exchange_fee = (shares_dec * self.exchange_fee).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        clearing_fee = (shares_dec * self.clearing_fee).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        if side == 'sell':
+            regulatory_fee = (trade_value * self.sec_fee_rate
+                              + min(shares_dec * self.finra_taf, self.finra_taf_max))
+            regulatory_fee = regulatory_fee.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        else:
+            regulatory_fee = Decimal('0.00')
+
+        return {
+            'rate': rate,
+            'commission': commission,
+            'exchange_fee': exchange_fee,
+            'clearing_fee': clearing_fee,
+            'regulatory_fee': regulatory_fee,
+            'total_fees': commission + exchange_fee + clearing_fee + regulatory_fee
+        }
+
+    def price_fills(self, fills: Iterable[Dict]) -> Iterator[Dict[str, Decimal]]:
+        """
+        按时间顺序一次遍历计价多笔成交
+
+        Args:
+            fills: 按时间排序的成交迭代器，每个成交包含 shares、price、month，可选 type
+        """
+        for fill in fills:
+            yield self.price_fill(fill['shares'], fill['price'], fill.get('type', 'buy'),
+                                  fill.get('month'))
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+计算器JSON服务 / Calculator JSON Service
+
+基于标准库 asyncio 的小型HTTP/JSON服务，多个工具共享同一个计算器进程。
+短时间窗口内到达的请求合并为一批计算: 佣金和保本价格走批量接口，
+其他操作在同一次线程池调度中依次计算。
+
+接口:
+    GET  /health                 服务状态和批处理统计
+    POST /commission             {"shares", "price"}
+    POST /buy_cost               {"shares", "price"}
+    POST /sell_proceeds          {"shares", "price"}
+    POST /profit                 {"buy_shares", "buy_price", "sell_shares", "sell_price"}
+    POST /break_even             {"buy_shares", "buy_price", "sell_shares" (可选)}
+    POST /transactions           {"transactions": [...]}
+    POST /transactions/stream    请求体为JSONL交易，逐块返回JSONL摘要 (?summary_every=N)
+
+单笔接口的请求体也可以是参数对象的数组，返回结果数组 (出错的元素为 {"error": ...})。
+金额以字符串返回，保持精确到分。
+
+用法:
+    python3 ib_service.py --port 8080 --max-batch-size 64 --max-wait-ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from ib_calculator import IBStockCalculator, TransactionTotals
+
+
+# 操作名: (必需参数, 可选参数)
+OPERATIONS = {
+    'commission': (('shares', 'price'), ()),
+    'buy_cost': (('shares', 'price'), ()),
+    'sell_proceeds': (('shares', 'price'), ()),
+    'profit': (('buy_shares', 'buy_price', 'sell_shares', 'sell_price'), ()),
+    'break_even': (('buy_shares', 'buy_price'), ('sell_shares',)),
+    'transactions': (('transactions',), ()),
+}
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            411: 'Length Required'}
+
+
+def _jsonable(value):
+    """把计算结果转换为可JSON序列化的对象，Decimal 转为字符串"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Mapping):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _params(operation: str, payload) -> Dict:
+    """校验并提取操作参数"""
+    if operation not in OPERATIONS:
+        raise KeyError(operation)
+    if not isinstance(payload, Mapping):
+        raise ValueError("请求参数必须是JSON对象")
+    required, optional = OPERATIONS[operation]
+    missing = [name for name in required if name not in payload]
+    if missing:
+        raise ValueError(f"缺少参数: {', '.join(missing)}")
+    return {name: payload[name] for name in required + optional if name in payload}
+
+
+def _check_shares(*values, minimum: int = 0):
+    for value in values:
+        if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+            kind = "非负整数" if minimum == 0 else f"不小于{minimum}的整数"
+            raise ValueError(f"股数必须是{kind}: {value!r}")
+
+
+def _check_price(value):
+    # JSON中的 NaN / Infinity 会被解析为浮点数，必须拒绝
+    if (not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0
+            or isinstance(value, float) and not math.isfinite(value)):
+        raise ValueError(f"价格必须是非负有限数: {value!r}")
+
+
+def _transaction(trans) -> Dict:
+    """校验一笔交易 (type、shares、price)，买卖交易的股数必须为正整数、价格为非负有限数"""
+    if not isinstance(trans, Mapping):
+        raise ValueError("交易必须是JSON对象")
+    missing = [name for name in ('type', 'shares', 'price') if name not in trans]
+    if missing:
+        raise ValueError(f"交易缺少字段: {', '.join(missing)}")
+    if trans['type'] in ('buy', 'sell'):
+        _check_shares(trans['shares'], minimum=1)
+        _check_price(trans['price'])
+    return trans
+
+
+def _fill_cents(results: List, indices: List[int], compute):
+    """
+    用一次批量调用计算 indices 对应请求的美分结果，写入 results
+
+    整批调用出错时逐个重新计算，只有出错的请求得到异常，其余请求不受影响。
+
+    Args:
+        results: 结果列表
+        indices: 请求下标
+        compute: 接收下标列表、返回美分数组的批量计算函数
+    """
+    try:
+        values = list(compute(indices))
+    except Exception:
+        values = []
+        for index in indices:
+            try:
+                values.extend(compute([index]))
+            except Exception as e:
+                values.append(ValueError(str(e)))
+    for index, value in zip(indices, values):
+        results[index] = value if isinstance(value, Exception) else str(Decimal(int(value)).scaleb(-2))
+
+
+def _add_lines(totals: TransactionTotals, lines: List[bytes],
+               summary_every: Optional[int]) -> List[Dict]:
+    """在计算线程中累加一块JSONL交易，返回期间产生的中间摘要"""
+    summaries = []
+    for line in lines:
+        trans = _transaction(json.loads(line))
+        totals.add(trans['type'], trans['shares'], trans['price'])
+        if summary_every and totals.transaction_count % summary_every == 0:
+            summaries.append(_jsonable(dict(totals.summary(), transaction_count=totals.transaction_count)))
+    return summaries
+
+
+class CalculatorService:
+    """
+    微批处理的计算器服务
+
+    submit() 把请求放入队列；后台任务收集最多 max_batch_size 个请求，
+    或在第一个请求到达后等待最多 max_wait 秒，然后在计算线程中一次计算整批，
+    事件循环在计算期间继续接收请求。
+    """
+
+    # 流式接口每次交给计算线程的交易行数
+    STREAM_CHUNK = 1024
+
+    def __init__(self, calculator: Optional[IBStockCalculator] = None,
+                 max_batch_size: int = 64, max_wait: float = 0.002):
+        """
+        Args:
+            calculator: 使用的计算器 (默认IB默认费率)
+            max_batch_size: 每批最多合并的请求数
+            max_wait: 第一个请求到达后最多等待的秒数
+        """
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size 必须为正整数")
+        if max_wait < 0:
+            raise ValueError("max_wait 不能为负数")
+        self.calculator = calculator or IBStockCalculator()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.request_count = 0
+        self.batch_count = 0
+        self.largest_batch = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            包含 requests、batches、largest_batch 的字典
+        """
+        return {
+            'requests': self.request_count,
+            'batches': self.batch_count,
+            'largest_batch': self.largest_batch
+        }
+
+    async def start(self):
+        """启动批处理任务 (submit 会自动启动)"""
+        if self._batcher is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ib-service')
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.get_running_loop().create_task(self._run_batches())
+
+    async def close(self):
+        """停止批处理任务和计算线程"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._executor.shutdown(wait=True)
+            self._batcher = None
+            self._executor = None
+            self._queue = None
+
+    async def submit(self, operation: str, payload: Mapping):
+        """
+        提交一个请求并等待所在批次计算完成
+
+        Args:
+            operation: 操作名，见 OPERATIONS
+            payload: 参数对象
+
+        Returns:
+            可JSON序列化的结果
+        """
+        params = _params(operation, payload)
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, params, future))
+        return await future
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.request_count += len(batch)
+            self.batch_count += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            requests = [(operation, params) for operation, params, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.evaluate_batch, requests)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def evaluate_batch(self, requests: List[Tuple[str, Dict]]) -> List:
+        """
+        计算一批请求
+
+        佣金和保本价格请求分别合并为一次批量接口调用，其他请求逐个计算。
+        单个请求的参数或计算错误只影响该请求 (批量调用出错时逐个重算)。
+
+        Args:
+            requests: (操作名, 参数) 列表
+
+        Returns:
+            与请求一一对应的结果列表，出错的请求对应异常对象
+        """
+        calculator = self.calculator
+        results: List = [None] * len(requests)
+        commissions = []
+        break_evens = []
+
+        for index, (operation, params) in enumerate(requests):
+            try:
+                if operation == 'commission':
+                    _check_shares(params['shares'])
+                    _check_price(params['price'])
+                    commissions.append(index)
+                elif operation == 'break_even':
+                    sell_shares = params.get('sell_shares', params['buy_shares'])
+                    _check_shares(params['buy_shares'], sell_shares)
+                    _check_price(params['buy_price'])
+                    if not 0 < sell_shares <= params['buy_shares']:
+                        raise ValueError("卖出股数必须为正且不能大于买入股数")
+                    break_evens.append(index)
+                elif operation == 'buy_cost':
+                    _check_shares(params['shares'], minimum=1)
+                    _check_price(params['price'])
+                    results[index] = _jsonable(calculator.calculate_buy_cost(params['shares'], params['price']))
+                elif operation == 'sell_proceeds':
+                    _check_shares(params['shares'], minimum=1)
+                    _check_price(params['price'])
+                    results[index] = _jsonable(calculator.calculate_sell_proceeds(params['shares'], params['price']))
+                elif operation == 'profit':
+                    _check_shares(params['buy_shares'], params['sell_shares'], minimum=1)
+                    _check_price(params['buy_price'])
+                    _check_price(params['sell_price'])
+                    results[index] = _jsonable(calculator.calculate_profit(
+                        params['buy_shares'], params['buy_price'],
+                        params['sell_shares'], params['sell_price']
+                    ))
+                elif operation == 'transactions':
+                    if not isinstance(params['transactions'], list):
+                        raise ValueError("transactions 必须是数组")
+                    results[index] = _jsonable(calculator.calculate_multiple_transactions(
+                        map(_transaction, params['transactions'])))
+            except (ValueError, TypeError, KeyError, ArithmeticError) as e:
+                results[index] = ValueError(str(e))
+
+        def commission_cents(indices):
+            return calculator.calculate_commissions_cents(
+                [requests[i][1]['shares'] for i in indices],
+                [requests[i][1]['price'] for i in indices]
+            )
+
+        def break_even_cents(indices):
+            params = [requests[i][1] for i in indices]
+            return calculator.calculate_break_even_cents(
+                [p['buy_shares'] for p in params],
+                [p['buy_price'] for p in params],
+                [p.get('sell_shares', p['buy_shares']) for p in params]
+            )
+
+        if commissions:
+            _fill_cents(results, commissions, commission_cents)
+        if break_evens:
+            _fill_cents(results, break_evens, break_even_cents)
+        return results
+
+    async def stream_summaries(self, lines: AsyncIterator[bytes],
+                               summary_every: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        流式处理JSONL交易，逐笔累计，不保留交易列表
+
+        每读入 STREAM_CHUNK 行交给计算线程处理一次，与批处理请求共用同一个线程，
+        计算器 (包括其缓存) 始终只在一个线程中使用。
+
+        Args:
+            lines: JSONL行的异步迭代器，每行一个交易 (type、shares、price)，空行会被忽略
+            summary_every: 每处理N笔交易产出一次中间摘要
+
+        Yields:
+            可JSON序列化的摘要，额外包含 transaction_count；最后一个为最终摘要
+        """
+        if summary_every is not None and summary_every <= 0:
+            raise ValueError("summary_every 必须为正整数")
+        await self.start()
+        loop = asyncio.get_running_loop()
+        totals = TransactionTotals(self.calculator)
+        pending = []
+        async for line in lines:
+            if line.strip():
+                pending.append(line)
+            if len(pending) >= self.STREAM_CHUNK:
+                for summary in await loop.run_in_executor(self._executor, _add_lines,
+                                                          totals, pending, summary_every):
+                    yield summary
+                pending = []
+        for summary in await loop.run_in_executor(self._executor, _add_lines,
+                                                  totals, pending, summary_every):
+            yield summary
+        if not summary_every or totals.transaction_count % summary_every != 0:
+            yield _jsonable(dict(totals.summary(), transaction_count=totals.transaction_count))
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        """
+        处理一个非流式请求
+
+        Returns:
+            (HTTP状态码, 响应对象)
+        """
+        if path == '/health':
+            if method != 'GET':
+                return 405, {'error': '只支持GET'}
+            return 200, dict(self.stats(), status='ok')
+
+        operation = path.strip('/')
+        if operation not in OPERATIONS:
+            return 404, {'error': f'未知的接口 {path}'}
+        if method != 'POST':
+            return 405, {'error': '只支持POST'}
+
+        try:
+            payload = json.loads(body or b'null')
+            if isinstance(payload, list):
+                results = await asyncio.gather(*(self.submit(operation, item) for item in payload),
+                                               return_exceptions=True)
+                return 200, [{'error': str(result)} if isinstance(result, Exception) else result
+                             for result in results]
+            return 200, await self.submit(operation, payload)
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        """
+        开始监听HTTP请求
+
+        Returns:
+            asyncio 服务器对象 (port=0 时可从 sockets 读取实际端口)
+        """
+        await self.start()
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split()
+                except ValueError:
+                    _write_response(writer, 400, {'error': '无效的请求行'}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                close = headers.get('connection', '').lower() == 'close'
+                if 'transfer-encoding' in headers:
+                    _write_response(writer, 411, {'error': '请求体需要 Content-Length'}, close=True)
+                    break
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    _write_response(writer, 400, {'error': '无效的 Content-Length'}, close=True)
+                    break
+                path, _, query = target.partition('?')
+
+                if path == '/transactions/stream' and method == 'POST':
+                    if not await self._write_stream(reader, writer, length, parse_qs(query)):
+                        close = True
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.dispatch(method, path, body)
+                    _write_response(writer, status, payload, close)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            length: int, query: Dict[str, List[str]]) -> bool:
+        """以分块编码逐行返回摘要，请求体未读完就出错时返回False (需关闭连接)"""
+        remaining = length
+
+        async def lines():
+            nonlocal remaining
+            while remaining > 0:
+                line = await reader.readline()
+                if not line:
+                    raise asyncio.IncompleteReadError(b'', remaining)
+                remaining -= len(line)
+                yield line
+
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n'
+                     b'Transfer-Encoding: chunked\r\n\r\n')
+        try:
+            summary_every = int(query['summary_every'][0]) if 'summary_every' in query else None
+            async for summary in self.stream_summaries(lines(), summary_every):
+                _write_chunk(writer, json.dumps(summary, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+        except (ValueError, TypeError, KeyError, ArithmeticError) as e:
+            message = f"缺少字段 {e}" if isinstance(e, KeyError) else str(e) or type(e).__name__
+            _write_chunk(writer, json.dumps({'error': message}, ensure_ascii=False).encode() + b'\n')
+        writer.write(b'0\r\n\r\n')
+        return remaining <= 0
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload, close: bool = False):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    head = [
+        f"HTTP/1.1 {status} {_REASONS[status]}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+    ]
+    if close:
+        head.append("Connection: close")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+
+def _write_chunk(writer: asyncio.StreamWriter, data: bytes):
+    writer.write(f"{len(data):x}\r\n".encode() + data + b'\r\n')
+
+
+class InProcessClient:
+    """
+    进程内客户端
+
+    直接调用服务的分发逻辑，不经过网络，请求同样参与微批处理，便于测试和嵌入其他异步程序。
+    """
+
+    def __init__(self, service: CalculatorService):
+        self.service = service
+
+    async def call(self, operation: str, **params):
+        """调用一个操作，出错时抛出 ValueError"""
+        return await self.service.submit(operation, params)
+
+    async def request(self, method: str, path: str, payload=None) -> Tuple[int, object]:
+        """按HTTP接口的格式发送请求，返回 (状态码, 响应对象)"""
+        body = json.dumps(payload).encode() if payload is not None else b''
+        return await self.service.dispatch(method, path, body)
+
+    async def stream_transactions(self, transactions, summary_every: Optional[int] = None) -> List[Dict]:
+        """与 /transactions/stream 相同的流式摘要"""
+        async def lines():
+            for trans in transactions:
+                yield json.dumps(trans).encode()
+
+        return [summary async for summary in self.service.stream_summaries(lines(), summary_every)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='IBStockCalculator JSON服务 / JSON service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=64, help='每批最多合并的请求数')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='合并请求的最长等待时间 (毫秒)')
+    parser.add_argument('--backend', choices=IBStockCalculator.BACKENDS, default='decimal')
+    parser.add_argument('--cache-size', type=int, default=None, help='启用LRU缓存')
+    args = parser.parse_args(argv)
+
+    async def run():
+        service = CalculatorService(
+            IBStockCalculator(backend=args.backend, cache_size=args.cache_size),
+            max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000
+        )
+        server = await service.serve(args.host, args.port)
+        print(f"服务已启动 Listening on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
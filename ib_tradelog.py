@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+二进制交易日志 / Binary Trade Log
+
+定长二进制记录格式，配合内存映射读取，重放历史交易时无需解析文本或为每笔交易构造字典。
+
+文件格式 (小端序):
+    文件头 16 字节: 魔数 b'IBTL'、版本号 (uint16)、记录长度 (uint16)、8字节保留
+    每条记录 24 字节:
+        side          uint8   1 = 买入, 2 = 卖出
+        (填充)        3字节
+        shares        uint32  股数
+        price_micros  int64   价格 (微单位，1美元 = 1,000,000)
+        timestamp     int64   时间戳 (纳秒，Unix纪元起)
+"""
+
+import mmap
+import struct
+import weakref
+from array import array
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from ib_calculator import IBStockCalculator, MICROS_PER_UNIT, TransactionTotals, _numpy
+
+
+MAGIC = b'IBTL'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8x')
+RECORD = struct.Struct('<B3xIqq')
+
+SIDE_BUY = 1
+SIDE_SELL = 2
+_SIDE_CODES = {'buy': SIDE_BUY, 'sell': SIDE_SELL}
+_SIDE_NAMES = (None, 'buy', 'sell')
+
+# 与 RECORD 对应的NumPy结构化类型的字段
+RECORD_FIELDS = [
+    ('side', 'u1'), ('_pad', 'V3'), ('shares', '<u4'),
+    ('price_micros', '<i8'), ('timestamp', '<i8'),
+]
+
+
+class TradeLogWriter:
+    """
+    二进制交易日志写入器
+
+    用法:
+        with TradeLogWriter('trades.ibtl') as writer:
+            writer.write('buy', 100, 50.25, timestamp)
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20):
+        """
+        创建 (覆盖) 日志文件并写入文件头
+
+        Args:
+            path: 文件路径
+            buffer_size: 写缓冲区大小 (字节)
+        """
+        self._file = open(path, 'wb', buffering=buffer_size)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.count = 0
+
+    def write(self, side: str, shares: int, price: float, timestamp: int = 0):
+        """
+        写入一笔交易
+
+        Args:
+            side: 'buy' 或 'sell'
+            shares: 股数
+            price: 价格，最多6位小数
+            timestamp: 时间戳 (纳秒)
+        """
+        try:
+            code = _SIDE_CODES[side]
+        except KeyError:
+            raise ValueError(f"未知的交易类型 {side!r}") from None
+        self._file.write(RECORD.pack(code, shares, round(price * MICROS_PER_UNIT), timestamp))
+        self.count += 1
+
+    def write_many(self, transactions: Iterable[Dict]):
+        """
+        写入多笔交易
+
+        Args:
+            transactions: 交易迭代器，每个交易包含 type、shares、price，可选 timestamp
+        """
+        for trans in transactions:
+            self.write(trans['type'], trans['shares'], trans['price'], trans.get('timestamp', 0))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'TradeLogWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TradeLogReader:
+    """
+    内存映射的二进制交易日志读取器
+
+    记录直接从映射内存中解码，不复制文件内容。columns() 返回的NumPy数组
+    引用映射内存，使用期间不要关闭读取器；records() 的迭代器在关闭时自动结束。
+    """
+
+    def __init__(self, path: str):
+        """
+        打开并映射日志文件
+
+        Args:
+            path: 文件路径
+        """
+        self._file = open(path, 'rb')
+        self._iterators = weakref.WeakSet()
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} 不是有效的交易日志") from None
+        if len(self._mmap) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} 不是有效的交易日志")
+        magic, version, record_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} 不是有效的交易日志 (版本 {version})")
+        body = len(self._mmap) - HEADER.size
+        if body % RECORD.size:
+            self.close()
+            raise ValueError(f"{path} 末尾有不完整的记录")
+        self._count = body // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def records(self) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        逐条解码原始记录
+
+        迭代器持有映射内存的视图，迭代结束、迭代器被回收或读取器关闭时释放。
+
+        Yields:
+            (side, shares, price_micros, timestamp) 元组，side 为 SIDE_BUY 或 SIDE_SELL
+        """
+        iterator = self._records()
+        self._iterators.add(iterator)
+        return iterator
+
+    def _records(self) -> Iterator[Tuple[int, int, int, int]]:
+        view = memoryview(self._mmap)[HEADER.size:]
+        unpacker = RECORD.iter_unpack(view)
+        try:
+            yield from unpacker
+        finally:
+            del unpacker
+            view.release()
+
+    def __iter__(self) -> Iterator[Tuple[str, int, float]]:
+        """
+        Yields:
+            ('buy'/'sell', 股数, 价格) 元组
+        """
+        for side, shares, micros, _ in self.records():
+            yield _SIDE_NAMES[side], shares, micros / MICROS_PER_UNIT
+
+    def columns(self):
+        """
+        按列读取整个日志，供批量接口使用
+
+        Returns:
+            安装了NumPy时返回零拷贝的结构化数组 (字段 side、shares、price_micros、timestamp)；
+            否则返回 {字段: array.array} 字典
+        """
+        np = _numpy()
+        if np is not None:
+            return np.frombuffer(self._mmap, dtype=np.dtype(RECORD_FIELDS), count=self._count,
+                                 offset=HEADER.size)
+        columns = {'side': array('B'), 'shares': array('q'),
+                   'price_micros': array('q'), 'timestamp': array('q')}
+        for side, shares, micros, timestamp in self.records():
+            columns['side'].append(side)
+            columns['shares'].append(shares)
+            columns['price_micros'].append(micros)
+            columns['timestamp'].append(timestamp)
+        return columns
+
+    def replay(self, calculator: Optional[IBStockCalculator] = None) -> Dict:
+        """
+        重放日志并计算总体结果，等价于对同样的交易调用 calculate_multiple_transactions
+
+        Args:
+            calculator: 使用的计算器 (默认IB默认费率)
+
+        Returns:
+            与 calculate_multiple_transactions 相同格式的摘要
+        """
+        totals = TransactionTotals(calculator or IBStockCalculator())
+        add = totals.add
+        for side, shares, price in self:
+            add(side, shares, price)
+        return totals.summary()
+
+    def commissions_cents(self, calculator: Optional[IBStockCalculator] = None):
+        """
+        用批量接口计算每笔交易的佣金
+
+        股数和微单位价格列直接传给 calculate_commissions_cents_micros，
+        不经过浮点价格换算，也不复制映射内存。
+
+        Returns:
+            calculate_commissions_cents_micros 的结果 (美分)
+        """
+        calculator = calculator or IBStockCalculator()
+        columns = self.columns()
+        return calculator.calculate_commissions_cents_micros(columns['shares'], columns['price_micros'])
+
+    def close(self):
+        """关闭读取器，未迭代完的 records() 迭代器随之结束"""
+        for iterator in list(self._iterators):
+            iterator.close()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'TradeLogReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -6,63 +6,271 @@
 Provides various interactive probability games to help children understand probability concepts.
 """
 
+import math
 import random
+from bisect import bisect_left
+from collections.abc import Sequence
+from fractions import Fraction
+from statistics import NormalDist
 from typing import Dict, List, Tuple, Optional
 
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时模拟退回纯Python实现 | optional, falls back to pure Python
+    np = None
+
+
+# 批量模拟时每批的最大试验次数，限制数组占用的内存 | Max trials per vectorized block, bounds array memory
+SIMULATION_BLOCK = 1 << 20
+
+
+def _wilson_interval(successes: int, trials: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    成功率的Wilson置信区间 | Wilson score interval for a success rate
+
+    比正态近似在接近0或1的比例上更可靠。
+    More reliable than the normal approximation for rates close to 0 or 1.
+    """
+    if trials == 0:
+        return (0.0, 1.0)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (rate + z * z / (2 * trials)) / denominator
+    half_width = z * ((rate * (1 - rate) + z * z / (4 * trials)) / trials) ** 0.5 / denominator
+    return (max(0.0, centre - half_width), min(1.0, centre + half_width))
+
+
+def _chi_square_sf(statistic: float, df: int) -> float:
+    """
+    卡方分布的上尾概率 (p值) | Upper-tail probability (p-value) of the chi-square distribution
+
+    用自由度为整数时的闭式级数计算，不依赖scipy。
+    Uses the closed-form series for integer degrees of freedom, without scipy.
+    """
+    if statistic <= 0:
+        return 1.0
+    half = statistic / 2
+    if df % 2 == 0:
+        term, total = 1.0, 1.0
+        for j in range(1, df // 2):
+            term *= half / j
+            total += term
+        return min(1.0, math.exp(-half) * total)
+    total = math.erfc(math.sqrt(half))
+    term = math.sqrt(half) * 2 / math.sqrt(math.pi)
+    for j in range(1, (df + 1) // 2):
+        total += math.exp(-half) * term
+        term *= half / (j + 0.5)
+    return min(1.0, total)
+
+
+def _nth_door(index: int, excluded: List[int]) -> int:
+    """
+    跳过 excluded 中的门后的第 index 扇门 (从0开始) | The index-th door (0-based) skipping excluded doors
+
+    excluded 必须按升序排列，耗时只与 excluded 的长度有关，与门的总数无关。
+    excluded must be sorted; the cost depends only on len(excluded), not on the number of doors.
+    """
+    door = index + 1
+    for skipped in excluded:
+        if door >= skipped:
+            door += 1
+        else:
+            break
+    return door
+
+
+class _RemainingDoors(Sequence):
+    """
+    门 1..N 中除去 excluded 后剩下的门，按需计算 | Doors 1..N minus the excluded ones, computed on demand
+
+    长度、下标访问和成员判断的耗时只与 excluded 的长度有关，不生成N个元素的列表。
+    Length, indexing and membership cost depends only on len(excluded); no N-element list is built.
+    """
+
+    __slots__ = ('num_doors', 'excluded')
+
+    def __init__(self, num_doors: int, excluded: List[int]):
+        """
+        Args:
+            num_doors: 门的数量 | number of doors
+            excluded: 升序排列、互不相同的被排除的门 | sorted, distinct excluded doors
+        """
+        self.num_doors = num_doors
+        self.excluded = excluded
+
+    def __len__(self) -> int:
+        return self.num_doors - len(self.excluded)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("门的下标超出范围 | door index out of range")
+        return _nth_door(index, self.excluded)
+
+    def __contains__(self, door) -> bool:
+        if not isinstance(door, int) or not 1 <= door <= self.num_doors:
+            return False
+        position = bisect_left(self.excluded, door)
+        return position == len(self.excluded) or self.excluded[position] != door
+
+    def __iter__(self):
+        door = 1
+        for skipped in self.excluded:
+            yield from range(door, skipped)
+            door = skipped + 1
+        yield from range(door, self.num_doors + 1)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Sequence, range)) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.num_doors}, excluded={self.excluded})'
+
 
 class MontyHallGame:
     """
     三门问题游戏 | Monty Hall Problem Game
     
-    经典的概率悖论游戏，展示条件概率的反直觉特性。
+    经典的概率悖论游戏，展示条件概率的反直觉特性。可以推广为N扇门、主持人打开k扇门，
+    以及主持人不知道汽车位置、随机开门的版本 (打开的门里有汽车时这一局作废)。
     A classic probability paradox that demonstrates counter-intuitive properties of conditional probability.
+    Generalizes to N doors with k doors opened, including an ignorant host who opens doors at random
+    (a game where the host reveals the car is void).
     """
     
-    def __init__(self):
-        self.doors = [1, 2, 3]
+    def __init__(self, num_doors: int = 3, opened: int = 1, host_knows: bool = True,
+                 rng: Optional[random.Random] = None, lazy_doors: bool = False):
+        """
+        Args:
+            num_doors: 门的数量 | number of doors
+            opened: 主持人打开的门数，1 到 num_doors-2 | doors the host opens, 1 to num_doors-2
+            host_knows: 主持人是否知道汽车在哪 | whether the host knows where the car is
+            rng: 随机数生成器 (默认使用 random 模块的全局状态) | random generator (default: the global random state)
+            lazy_doors: 为True时 doors 和 remaining_doors 是按需计算的只读序列而不是列表，
+                门很多时每局的耗时与门的数量无关 (结果不能直接JSON序列化)
+                | if True, doors and remaining_doors are lazy read-only sequences instead of lists,
+                so a game with very many doors does not cost O(N) (results are not JSON serializable)
+        """
+        if num_doors < 3:
+            raise ValueError("至少需要3扇门 | At least 3 doors are required")
+        if not 1 <= opened <= num_doors - 2:
+            raise ValueError(f"打开的门数必须在1到{num_doors - 2}之间 | Opened doors must be between 1 and {num_doors - 2}")
+        self.num_doors = num_doors
+        self.opened = opened
+        self.host_knows = host_knows
+        self.rng = rng if rng is not None else random
+        self.lazy_doors = lazy_doors
+        self.doors = range(1, num_doors + 1) if lazy_doors else list(range(1, num_doors + 1))
         self.car_door = None
         self.player_choice = None
+        self.opened_doors = None
         self.opened_door = None
-        
+    
     def new_game(self) -> Dict:
         """开始新游戏 | Start a new game"""
-        self.car_door = random.choice(self.doors)
+        self.car_door = self.rng.randint(1, self.num_doors)
         self.player_choice = None
+        self.opened_doors = None
         self.opened_door = None
         return {
-            'message': '三扇门中有一扇门后有汽车，另外两扇门后是山羊。请选择一扇门！',
-            'message_en': 'Behind one of three doors is a car, behind the other two are goats. Choose a door!',
+            'message': f'{self.num_doors}扇门中有一扇门后有汽车，另外{self.num_doors - 1}扇门后是山羊。请选择一扇门！',
+            'message_en': f'Behind one of {self.num_doors} doors is a car, behind the other {self.num_doors - 1} are goats. Choose a door!',
             'doors': self.doors
         }
     
+    def _door(self, door) -> Optional[int]:
+        """
+        door 在 self.doors 中时返回对应的整数门号，否则返回 None | The integer door if door is in self.doors, else None
+
+        与 door in self.doors 的结果相同 (例如 2.0 算作门2，1.5 不是门)，但不逐个比较。
+        Same answer as door in self.doors (2.0 is door 2, 1.5 is not a door) without scanning the doors.
+        """
+        try:
+            number = int(door)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return number if number == door and 1 <= number <= self.num_doors else None
+
     def make_choice(self, choice: int) -> Dict:
-        """玩家做出初始选择 | Player makes initial choice"""
-        if choice not in self.doors:
-            raise ValueError("选择必须是1, 2, 或3 | Choice must be 1, 2, or 3")
+        """
+        玩家做出初始选择 | Player makes initial choice
+        
+        主持人按下标跳过排除的门开门，耗时只与打开的门数k有关；默认 remaining_doors 为列表 (O(N))，
+        lazy_doors=True 时为按需计算的序列 (长度 N-k，支持下标、迭代和 in)，整局与门的数量无关。
+        The host picks doors by index while skipping excluded ones in O(k log k); remaining_doors is a
+        list by default (O(N)), or a lazy sequence with lazy_doors=True so the whole game is independent of N.
+        """
+        door = self._door(choice)
+        if door is None:
+            raise ValueError(f"选择必须是1到{self.num_doors}之间的门 | Choice must be a door from 1 to {self.num_doors}")
+        choice = door
         
         self.player_choice = choice
         
-        # 主持人打开一扇有山羊的门 | Host opens a door with a goat
-        available_doors = [d for d in self.doors if d != self.car_door and d != self.player_choice]
-        self.opened_door = random.choice(available_doors)
-        
-        remaining_doors = [d for d in self.doors if d != self.opened_door]
+        # 主持人打开门：知道汽车位置时只开山羊门，否则在其他门中随机开
+        # Host opens doors: only goat doors if the host knows, otherwise any of the other doors
+        if self.host_knows:
+            excluded = sorted({self.car_door, choice})
+        else:
+            excluded = [choice]
+        candidates = self.num_doors - len(excluded)
+        self.opened_doors = sorted(_nth_door(index, excluded)
+                                   for index in self.rng.sample(range(candidates), self.opened))
+        self.opened_door = self.opened_doors[0]
+        car_revealed = self.car_door in self.opened_doors
+        remaining_doors = _RemainingDoors(self.num_doors, self.opened_doors)
+        if not self.lazy_doors:
+            remaining_doors = list(remaining_doors)
+        
+        if car_revealed:
+            message = f'主持人打开了门{", ".join(map(str, self.opened_doors))}，里面有汽车！这一局作废。'
+            message_en = f'The host opened door(s) {", ".join(map(str, self.opened_doors))} and revealed the car! This game is void.'
+        elif self.opened == 1:
+            message = f'主持人打开了门{self.opened_door}，里面是山羊！你要换门吗？'
+            message_en = f'The host opened door {self.opened_door}, revealing a goat! Do you want to switch?'
+        else:
+            message = f'主持人打开了门{", ".join(map(str, self.opened_doors))}，里面都是山羊！你要换门吗？'
+            message_en = f'The host opened doors {", ".join(map(str, self.opened_doors))}, all goats! Do you want to switch?'
         
         return {
             'player_choice': self.player_choice,
             'opened_door': self.opened_door,
+            'opened_doors': self.opened_doors,
             'remaining_doors': remaining_doors,
-            'message': f'主持人打开了门{self.opened_door}，里面是山羊！你要换门吗？',
-            'message_en': f'The host opened door {self.opened_door}, revealing a goat! Do you want to switch?'
+            'car_revealed': car_revealed,
+            'message': message,
+            'message_en': message_en
         }
     
-    def final_decision(self, switch: bool) -> Dict:
-        """最终决定是否换门 | Final decision to switch or not"""
-        if self.player_choice is None or self.opened_door is None:
+    def final_decision(self, switch: bool, door: Optional[int] = None) -> Dict:
+        """
+        最终决定是否换门 | Final decision to switch or not
+        
+        Args:
+            switch: 是否换门 | whether to switch
+            door: 换到哪扇门 (默认在其他未打开的门中随机选一扇；三扇门时只有一扇可选)
+                | door to switch to (default: a random other unopened door; with three doors there is only one)
+        """
+        if self.player_choice is None or self.opened_doors is None:
             raise ValueError("游戏尚未开始 | Game not started")
         
         if switch:
-            final_choice = [d for d in self.doors if d != self.player_choice and d != self.opened_door][0]
+            excluded = sorted(self.opened_doors + [self.player_choice])
+            if door is not None:
+                final_choice = self._door(door)
+                if final_choice is None or final_choice in excluded:
+                    raise ValueError("只能换到其他未打开的门 | Can only switch to another unopened door")
+            else:
+                choices = self.num_doors - len(excluded)
+                index = self.rng.randrange(choices) if choices > 1 else 0
+                final_choice = _nth_door(index, excluded)
         else:
             final_choice = self.player_choice
         
@@ -76,6 +284,131 @@ class MontyHallGame:
             'message': f'汽车在门{self.car_door}！你{"赢了" if won else "输了"}！',
             'message_en': f'The car was behind door {self.car_door}! You {"won" if won else "lost"}!'
         }
+    
+    def exact_probabilities(self) -> Dict[str, Fraction]:
+        """
+        精确胜率 | Exact closed-form probabilities
+        
+        玩家选中汽车的概率是 1/N。主持人知道汽车位置时汽车一定留在未打开的门中，
+        换门 (在其余 N-1-k 扇门中随机选一扇) 的胜率为 (N-1)/N × 1/(N-1-k)。
+        主持人随机开门时，打开的门里有汽车的概率为 k/N；排除这些作废的局后，
+        换门和不换门的胜率都是 1/(N-k)。
+        The first pick holds the car with probability 1/N. With a knowing host, switching to one of the
+        other N-1-k doors wins with (N-1)/N × 1/(N-1-k). With an ignorant host the car is revealed with
+        probability k/N, and among the remaining games both strategies win with 1/(N-k).
+        
+        Returns:
+            包含 stay、switch (不作废的局中的胜率) 和 car_revealed 的字典，值为分数
+            | dict with stay, switch (win rates among non-void games) and car_revealed as Fractions
+        """
+        n, k = self.num_doors, self.opened
+        if self.host_knows:
+            return {
+                'stay': Fraction(1, n),
+                'switch': Fraction(n - 1, n * (n - 1 - k)),
+                'car_revealed': Fraction(0)
+            }
+        return {
+            'stay': Fraction(1, n - k),
+            'switch': Fraction(1, n - k),
+            'car_revealed': Fraction(k, n)
+        }
+    
+    def simulate(self, trials: int, strategy: str = 'switch', seed: Optional[int] = None,
+                 confidence: float = 0.95) -> Dict:
+        """
+        批量模拟多局游戏 | Simulate many games at once
+        
+        与交互式游戏的结果分布相同，但不生成每局的门列表：按对称性，汽车不在玩家手中时，
+        它在主持人可开的其他门中的位置是均匀的，换门时在 N-1-k 扇门中的位置也是均匀的，
+        因此每局只需抽几个整数，耗时与门的数量无关。有numpy时按数组整批计算，
+        否则逐局用独立的随机数生成器计算，不修改当前游戏的状态。
+        不指定种子时从游戏的 rng 抽取种子，因此带种子的 rng 得到可复现的结果。
+        Same outcome distribution as the interactive game without building per-game door lists: by
+        symmetry, when the player does not hold the car its position among the other doors and among
+        the N-1-k switch targets is uniform, so each game needs a few integers regardless of N.
+        Uses whole-array operations when numpy is available and does not touch the current game state.
+        Without a seed, the generator is seeded from the game's rng, so a seeded rng is reproducible.
+        
+        Args:
+            trials: 模拟局数 | number of games
+            strategy: 'switch' (换门) 或 'stay' (不换) | 'switch' or 'stay'
+            seed: 随机种子，相同种子得到相同结果 (默认从 rng 抽取) | seed for a reproducible run (default: drawn from rng)
+            confidence: 置信区间的置信水平 | confidence level of the interval
+        
+        Returns:
+            包含 wins、losses、voided (作废局数)、win_rate (不作废的局中的胜率)、
+            exact_win_rate 和 confidence_interval 的字典
+            | dict with wins, losses, voided, win_rate (among non-void games), exact_win_rate
+            and confidence_interval
+        """
+        if strategy not in ('switch', 'stay'):
+            raise ValueError("策略必须是 'switch' 或 'stay' | Strategy must be 'switch' or 'stay'")
+        if trials <= 0:
+            raise ValueError("模拟局数必须为正整数 | Trials must be a positive integer")
+        switch = strategy == 'switch'
+        n, k = self.num_doors, self.opened
+        targets = n - 1 - k
+        if seed is None:
+            seed = self.rng.getrandbits(64)
+        
+        wins = voided = 0
+        if np is not None:
+            rng = np.random.default_rng(seed)
+            done = 0
+            while done < trials:
+                size = min(SIMULATION_BLOCK, trials - done)
+                car = rng.integers(0, n, size)
+                pick = rng.integers(0, n, size)
+                held = car == pick
+                if self.host_knows:
+                    revealed = np.zeros(size, dtype=bool)
+                else:
+                    # 汽车在其他 N-1 扇门中的位置均匀，排在前 k 位即被打开
+                    # The car's slot among the N-1 other doors is uniform; it is opened if among the first k
+                    revealed = ~held & (rng.integers(0, n - 1, size) < k)
+                if switch:
+                    # 换到的门在 N-1-k 扇候选门中均匀，汽车占其中一个位置
+                    # The switch target is uniform over the N-1-k candidates, one of which holds the car
+                    won = ~held & ~revealed & (rng.integers(0, targets, size) == 0)
+                else:
+                    won = held
+                wins += int(np.count_nonzero(won))
+                voided += int(np.count_nonzero(revealed))
+                done += size
+        else:
+            rng = random.Random(seed)
+            randrange = rng.randrange
+            for _ in range(trials):
+                held = randrange(n) == randrange(n)
+                if not self.host_knows and not held and randrange(n - 1) < k:
+                    voided += 1
+                elif switch:
+                    wins += not held and randrange(targets) == 0
+                else:
+                    wins += held
+        
+        valid = trials - voided
+        win_rate = wins / valid if valid else 0.0
+        low, high = _wilson_interval(wins, valid, confidence)
+        return {
+            'trials': trials,
+            'strategy': strategy,
+            'doors': n,
+            'opened': k,
+            'host_knows': self.host_knows,
+            'wins': wins,
+            'losses': valid - wins,
+            'voided': voided,
+            'win_rate': win_rate,
+            'exact_win_rate': float(self.exact_probabilities()[strategy]),
+            'confidence': confidence,
+            'confidence_interval': (low, high),
+            'message': f'{"换门" if switch else "不换门"}策略胜率 {win_rate*100:.2f}% '
+                       f'({confidence*100:.0f}%置信区间 {low*100:.2f}%~{high*100:.2f}%)',
+            'message_en': f'{strategy.capitalize()} strategy win rate {win_rate*100:.2f}% '
+                          f'({confidence*100:.0f}% CI {low*100:.2f}%-{high*100:.2f}%)'
+        }
 
 
 class NumberGuessingGame:
@@ -86,7 +419,8 @@ class NumberGuessingGame:
     Understand information entropy and probability inference by narrowing down the range.
     """
     
-    def __init__(self, min_num: int = 1, max_num: int = 100):
+    def __init__(self, min_num: int = 1, max_num: int = 100, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random
         self.min_num = min_num
         self.max_num = max_num
         self.target = None
@@ -95,7 +429,7 @@ class NumberGuessingGame:
         
     def new_game(self, difficulty: str = 'medium') -> Dict:
         """开始新游戏 | Start a new game"""
-        self.target = random.randint(self.min_num, self.max_num)
+        self.target = self.rng.randint(self.min_num, self.max_num)
         self.guesses = []
         
         # 根据难度设置尝试次数 | Set max attempts based on difficulty
@@ -166,7 +500,8 @@ class ProbabilityRaceGame:
     Choose optimal paths by calculating expected values.
     """
     
-    def __init__(self):
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random
         self.current_position = 0
         self.target_position = 10
         self.path_history = []
@@ -197,7 +532,7 @@ class ProbabilityRaceGame:
         paths = []
         
         # 安全路径：小步前进，100%成功 | Safe path: small step, 100% success
-        safe_distance = random.randint(1, 2)
+        safe_distance = self.rng.randint(1, 2)
         paths.append({
             'id': 'safe',
             'name': '安全路径 | Safe Path',
@@ -209,8 +544,8 @@ class ProbabilityRaceGame:
         })
         
         # 冒险路径：大步前进，有风险 | Risky path: big step, has risk
-        risky_distance = random.randint(3, 5)
-        risky_success_rate = round(random.uniform(0.5, 0.7), 2)
+        risky_distance = self.rng.randint(3, 5)
+        risky_success_rate = round(self.rng.uniform(0.5, 0.7), 2)
         paths.append({
             'id': 'risky',
             'name': '冒险路径 | Risky Path',
@@ -222,8 +557,8 @@ class ProbabilityRaceGame:
         })
         
         # 平衡路径：中等距离，中等风险 | Balanced path: medium distance, medium risk
-        balanced_distance = random.randint(2, 3)
-        balanced_success_rate = round(random.uniform(0.75, 0.9), 2)
+        balanced_distance = self.rng.randint(2, 3)
+        balanced_success_rate = round(self.rng.uniform(0.75, 0.9), 2)
         paths.append({
             'id': 'balanced',
             'name': '平衡路径 | Balanced Path',
@@ -248,7 +583,7 @@ class ProbabilityRaceGame:
             raise ValueError("无效的路径选择 | Invalid path choice")
         
         # 根据成功率判断是否成功 | Determine success based on success rate
-        success = random.random() < selected_path['success_rate']
+        success = self.rng.random() < selected_path['success_rate']
         
         old_position = self.current_position
         if success:
@@ -289,11 +624,24 @@ class SlotMachineSimulator:
     Demonstrates independent events and law of large numbers, for educational purposes only.
     """
     
-    def __init__(self):
+    def __init__(self, rng: Optional[random.Random] = None, keep_history: bool = True):
+        """
+        Args:
+            rng: 随机数生成器 (默认使用 random 模块的全局状态) | random generator (default: the global random state)
+            keep_history: 是否在 spin_history 中保存每次转动；统计数据始终由累计计数得出，
+                关闭后内存占用不随转动次数增长
+                | whether to keep every spin in spin_history; statistics always come from running
+                counts, so turning this off keeps memory constant
+        """
+        self.rng = rng if rng is not None else random
         self.symbols = ['🍎', '🍌', '⭐', '🍒', '🔔']
         self.probabilities = [0.35, 0.25, 0.20, 0.15, 0.05]
         self.reels = 3
+        self.keep_history = keep_history
         self.spin_history = []
+        self.total_spins = 0
+        self.symbol_counts = {symbol: 0 for symbol in self.symbols}
+        self.win_counts = {'jackpot': 0, 'small_win': 0, 'no_win': 0}
         
     def get_symbol_probabilities(self) -> Dict:
         """获取符号概率 | Get symbol probabilities"""
@@ -308,7 +656,7 @@ class SlotMachineSimulator:
         """转动老虎机 | Spin the slot machine"""
         result = []
         for _ in range(self.reels):
-            symbol = random.choices(self.symbols, weights=self.probabilities, k=1)[0]
+            symbol = self.rng.choices(self.symbols, weights=self.probabilities, k=1)[0]
             result.append(symbol)
         
         # 判断是否中奖 | Check if won
@@ -328,57 +676,69 @@ class SlotMachineSimulator:
             message = '未中奖，再试一次！'
             message_en = 'No win, try again!'
         
-        self.spin_history.append({
-            'result': result,
-            'win_type': win_type
-        })
+        # 累计计数，统计时无需扫描历史 | Running counts, so statistics never rescan the history
+        self.total_spins += 1
+        for symbol in result:
+            self.symbol_counts[symbol] += 1
+        self.win_counts[win_type] += 1
+        if self.keep_history:
+            self.spin_history.append({
+                'result': result,
+                'win_type': win_type
+            })
         
         return {
             'result': result,
             'win_type': win_type,
             'message': message,
             'message_en': message_en,
-            'total_spins': len(self.spin_history)
+            'total_spins': self.total_spins
         }
     
     def get_statistics(self) -> Dict:
-        """获取统计数据 | Get statistics"""
-        if not self.spin_history:
+        """
+        获取统计数据 | Get statistics
+        
+        由累计计数得出，耗时与转动次数无关；chi_square 和 p_value 是实际符号频率
+        相对 self.probabilities 的卡方拟合优度检验。
+        Derived from running counts, so the cost does not depend on the number of spins; chi_square
+        and p_value are a goodness-of-fit test of symbol counts against self.probabilities.
+        """
+        if not self.total_spins:
             return {
                 'total_spins': 0,
                 'message': '还没有转动记录',
                 'message_en': 'No spins yet'
             }
         
-        # 统计每个符号出现的次数 | Count symbol occurrences
-        symbol_counts = {symbol: 0 for symbol in self.symbols}
-        total_symbols = 0
-        
-        for spin in self.spin_history:
-            for symbol in spin['result']:
-                symbol_counts[symbol] += 1
-                total_symbols += 1
+        total_symbols = self.total_spins * self.reels
+        symbol_counts = dict(self.symbol_counts)
         
         # 计算实际频率 | Calculate actual frequencies
         symbol_frequencies = {
-            symbol: round(count / total_symbols, 3) if total_symbols > 0 else 0
+            symbol: round(count / total_symbols, 3)
             for symbol, count in symbol_counts.items()
         }
         
-        # 统计中奖类型 | Count win types
-        win_types = {'jackpot': 0, 'small_win': 0, 'no_win': 0}
-        for spin in self.spin_history:
-            win_types[spin['win_type']] += 1
+        # 卡方拟合优度检验 | Chi-square goodness of fit
+        chi_square = 0.0
+        for symbol, probability in zip(self.symbols, self.probabilities):
+            expected = total_symbols * probability
+            chi_square += (symbol_counts[symbol] - expected) ** 2 / expected
+        degrees_of_freedom = len(self.symbols) - 1
         
         return {
-            'total_spins': len(self.spin_history),
+            'total_spins': self.total_spins,
             'total_symbols': total_symbols,
             'symbol_counts': symbol_counts,
             'symbol_frequencies': symbol_frequencies,
             'expected_probabilities': dict(zip(self.symbols, self.probabilities)),
-            'win_types': win_types,
-            'message': f'已转动{len(self.spin_history)}次',
-            'message_en': f'{len(self.spin_history)} spins completed'
+            'win_types': dict(self.win_counts),
+            'chi_square': chi_square,
+            'degrees_of_freedom': degrees_of_freedom,
+            'p_value': _chi_square_sf(chi_square, degrees_of_freedom),
+            'message': f'已转动{self.total_spins}次',
+            'message_en': f'{self.total_spins} spins completed'
         }
 
 
@@ -391,29 +751,13 @@ def demo_monty_hall():
     game = MontyHallGame()
     
     # 模拟1000次游戏，统计换门和不换门的胜率
-    switch_wins = 0
-    stay_wins = 0
     trials = 1000
-    
-    for _ in range(trials):
-        game.new_game()
-        game.make_choice(1)  # 总是选择门1
-        
-        # 换门策略
-        result = game.final_decision(switch=True)
-        if result['won']:
-            switch_wins += 1
-        
-        # 不换门策略
-        game.new_game()
-        game.make_choice(1)
-        result = game.final_decision(switch=False)
-        if result['won']:
-            stay_wins += 1
+    switch_result = game.simulate(trials, 'switch')
+    stay_result = game.simulate(trials, 'stay')
     
     print(f"\n模拟{trials}次游戏的结果 | Results from {trials} simulations:")
-    print(f"换门策略胜率 | Switch strategy win rate: {switch_wins/trials*100:.1f}%")
-    print(f"不换策略胜率 | Stay strategy win rate: {stay_wins/trials*100:.1f}%")
+    print(f"换门策略胜率 | Switch strategy win rate: {switch_result['win_rate']*100:.1f}%")
+    print(f"不换策略胜率 | Stay strategy win rate: {stay_result['win_rate']*100:.1f}%")
     print(f"\n结论：换门策略的胜率约为2/3！")
     print(f"Conclusion: Switching has approximately 2/3 win rate!\n")
 
@@ -504,6 +848,7 @@ def demo_slot_machine():
     print(f"  大奖 | Jackpot: {stats['win_types']['jackpot']}")
     print(f"  小奖 | Small win: {stats['win_types']['small_win']}")
     print(f"  未中奖 | No win: {stats['win_types']['no_win']}")
+    print(f"\n卡方检验 | Chi-square test: χ² = {stats['chi_square']:.2f}, p = {stats['p_value']:.3f}")
 
 
 if __name__ == '__main__':
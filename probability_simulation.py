@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+概率游戏并行模拟 | Parallel Probability Game Simulation
+
+把四个游戏的大量模拟局分成固定大小的块，分发到进程池计算。每块使用由主种子和块编号
+派生的独立随机数生成器，各块的计数直接相加合并，因此相同的种子总是得到相同的结果，
+与进程数无关。
+Splits many simulated games into fixed-size blocks and spreads them across a process pool.
+Each block draws from its own generator derived from the master seed and the block index, and
+block counts are merged by summation, so a seed always gives the same result whatever the worker count.
+
+用法 | Usage:
+    run_simulation('monty_hall', 10_000_000, seed=42, strategy='switch')
+    run_simulation('slot_machine', 1_000_000, seed=42, workers=8)
+"""
+
+import hashlib
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from probability_games import (
+    MontyHallGame,
+    NumberGuessingGame,
+    ProbabilityRaceGame,
+    SlotMachineSimulator,
+    _wilson_interval
+)
+
+
+GAMES = ('monty_hall', 'number_guessing', 'probability_race', 'slot_machine')
+
+# 自适应模拟默认估计的统计量 | Statistic estimated by run_until by default
+DEFAULT_STATISTICS = {
+    'monty_hall': 'win',
+    'number_guessing': 'attempts',
+    'probability_race': 'turns',
+    'slot_machine': 'jackpot',
+}
+
+# 取值只有0和1的统计量，自适应模拟用Wilson区间判断停止 | 0/1 statistics; run_until uses the Wilson interval
+BERNOULLI_STATISTICS = frozenset({'win', 'jackpot'})
+
+
+class RunningStats:
+    """
+    Welford在线均值和方差 | Welford online mean and variance
+
+    每次 add 为O(1)且数值稳定；两个累计值用Chan等人的公式合并 (a + b)，
+    因此各块的结果可以像计数一样相加。
+    Each add is O(1) and numerically stable; two accumulators merge with Chan et al.'s formula
+    (a + b), so block results add up like counts.
+    """
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_bernoulli(cls, successes: int, trials: int) -> 'RunningStats':
+        """由成功次数直接构造0/1变量的累计值 | Accumulator of a 0/1 variable from its success count"""
+        if trials == 0:
+            return cls()
+        mean = successes / trials
+        return cls(trials, mean, trials * mean * (1 - mean))
+
+    def add(self, value: float):
+        """加入一个观测值 | Add one observation"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def __add__(self, other: 'RunningStats') -> 'RunningStats':
+        if not isinstance(other, RunningStats):
+            return NotImplemented
+        if not other.count:
+            return RunningStats(self.count, self.mean, self.m2)
+        if not self.count:
+            return RunningStats(other.count, other.mean, other.m2)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.count / count
+        m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / count
+        return RunningStats(count, mean, m2)
+
+    def __radd__(self, other):
+        # 让 sum() 和 merge_counts 可以从0开始累加 | Lets sum() and merge_counts start from 0
+        if other == 0:
+            return self + RunningStats()
+        return NotImplemented
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RunningStats):
+            return NotImplemented
+        return (self.count, self.mean, self.m2) == (other.count, other.mean, other.m2)
+
+    def __repr__(self) -> str:
+        return f"RunningStats(count={self.count}, mean={self.mean!r}, m2={self.m2!r})"
+
+    @property
+    def variance(self) -> float:
+        """样本方差 | Sample variance"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """均值的正态近似置信区间 | Normal-approximation confidence interval of the mean"""
+        if self.count < 2:
+            return (float('-inf'), float('inf'))
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        half_width = z * (self.variance / self.count) ** 0.5
+        return (self.mean - half_width, self.mean + half_width)
+
+    def summary(self, confidence: float = 0.95) -> Dict:
+        """均值、标准差和置信区间 | Mean, standard deviation and confidence interval"""
+        low, high = self.interval(confidence)
+        return {'count': self.count, 'mean': self.mean, 'std': self.variance ** 0.5,
+                'confidence_interval': (low, high), 'width': high - low}
+
+
+def block_seed(seed: int, index: int) -> int:
+    """
+    由主种子和块编号派生块的种子 | Derive a block seed from the master seed and block index
+
+    使用SHA-256，相邻编号的块得到互不相关的随机数流。
+    Uses SHA-256 so neighbouring blocks get unrelated streams.
+    """
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def _play_monty_hall(rng: random.Random, trials: int, num_doors: int = 3, opened: int = 1,
+                     host_knows: bool = True, strategy: str = 'switch') -> Dict:
+    game = MontyHallGame(num_doors, opened, host_knows)
+    result = game.simulate(trials, strategy, seed=rng.getrandbits(64))
+    valid = trials - result['voided']
+    return {'games': trials, 'wins': result['wins'], 'voided': result['voided'],
+            'moments': {'win': RunningStats.from_bernoulli(result['wins'], valid)}}
+
+
+def _play_number_guessing(rng: random.Random, trials: int, min_num: int = 1, max_num: int = 100,
+                          difficulty: str = 'medium', strategy: str = 'binary') -> Dict:
+    if strategy not in ('binary', 'random'):
+        raise ValueError("策略必须是 'binary' 或 'random' | Strategy must be 'binary' or 'random'")
+    game = NumberGuessingGame(min_num, max_num, rng=rng)
+    counts = {'games': trials, 'wins': 0, 'attempts': 0}
+    attempts = RunningStats()
+    for _ in range(trials):
+        game.new_game(difficulty)
+        low, high = min_num, max_num
+        while True:
+            guess = (low + high) // 2 if strategy == 'binary' else rng.randint(low, high)
+            result = game.make_guess(guess)
+            if result['game_over']:
+                break
+            if result['result'] == 'too_high':
+                high = guess - 1
+            else:
+                low = guess + 1
+        counts['wins'] += result['won']
+        counts['attempts'] += result['attempts_used']
+        attempts.add(result['attempts_used'])
+    counts['moments'] = {'attempts': attempts,
+                         'win': RunningStats.from_bernoulli(counts['wins'], trials)}
+    return counts
+
+
+def _play_probability_race(rng: random.Random, trials: int, target: int = 10,
+                           strategy: str = 'expected_value') -> Dict:
+    if strategy not in ('expected_value', 'safe', 'risky', 'balanced'):
+        raise ValueError("策略必须是 'expected_value'、'safe'、'risky' 或 'balanced' "
+                         "| Strategy must be 'expected_value', 'safe', 'risky' or 'balanced'")
+    game = ProbabilityRaceGame(rng=rng)
+    counts = {'games': trials, 'turns': 0, 'successes': 0}
+    turns = RunningStats()
+    for _ in range(trials):
+        game.new_game(target)
+        start = counts['turns']
+        while True:
+            paths = game.get_paths()
+            if paths['game_over']:
+                break
+            if strategy == 'expected_value':
+                path_id = max(paths['paths'], key=lambda p: p['expected_value'])['id']
+            else:
+                path_id = strategy
+            result = game.choose_path(path_id, paths['paths'])
+            counts['turns'] += 1
+            counts['successes'] += result['success']
+        turns.add(counts['turns'] - start)
+    counts['moments'] = {'turns': turns}
+    return counts
+
+
+def _play_slot_machine(rng: random.Random, trials: int) -> Dict:
+    simulator = SlotMachineSimulator(rng=rng, keep_history=False)
+    for _ in range(trials):
+        simulator.spin()
+    stats = simulator.get_statistics()
+    win_types = stats['win_types']
+    return {'games': trials, 'symbol_counts': stats['symbol_counts'], 'win_types': win_types,
+            'moments': {'jackpot': RunningStats.from_bernoulli(win_types['jackpot'], trials),
+                        'win': RunningStats.from_bernoulli(trials - win_types['no_win'], trials)}}
+
+
+_PLAYERS = {
+    'monty_hall': _play_monty_hall,
+    'number_guessing': _play_number_guessing,
+    'probability_race': _play_probability_race,
+    'slot_machine': _play_slot_machine,
+}
+
+
+def _run_block(game: str, options: Dict, seed: int, block: Tuple[int, int]) -> Dict:
+    """在工作进程中模拟一块 | Simulate one block in a worker process"""
+    index, trials = block
+    return _PLAYERS[game](random.Random(block_seed(seed, index)), trials, **options)
+
+
+def merge_counts(parts: Iterable[Dict]) -> Dict:
+    """
+    按字段相加合并各块的计数 | Merge block counts by summation
+
+    嵌套的字典 (例如老虎机的符号计数、各统计量的 RunningStats) 逐键相加。
+    Nested dicts such as slot symbol counts or per-statistic RunningStats are summed key by key.
+    """
+    merged: Dict = {}
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, dict):
+                bucket = merged.setdefault(key, {})
+                for name, count in value.items():
+                    bucket[name] = bucket.get(name, 0) + count
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _describe(game: str, counts: Dict, confidence: float) -> Dict:
+    """由合并后的计数计算比率 | Derive rates from merged counts"""
+    games = counts['games']
+    if game == 'monty_hall':
+        valid = games - counts['voided']
+        return {'win_rate': counts['wins'] / valid if valid else 0.0,
+                'confidence_interval': _wilson_interval(counts['wins'], valid, confidence)}
+    if game == 'number_guessing':
+        return {'win_rate': counts['wins'] / games,
+                'confidence_interval': _wilson_interval(counts['wins'], games, confidence),
+                'mean_attempts': counts['attempts'] / games}
+    if game == 'probability_race':
+        return {'mean_turns': counts['turns'] / games,
+                'success_rate': counts['successes'] / counts['turns']}
+    total_symbols = sum(counts['symbol_counts'].values())
+    return {'symbol_frequencies': {symbol: count / total_symbols
+                                   for symbol, count in counts['symbol_counts'].items()},
+            'win_rates': {win_type: count / games for win_type, count in counts['win_types'].items()}}
+
+
+def run_simulation(game: str, trials: int, seed: int = 0, workers: Optional[int] = None,
+                   block_size: int = 10000, confidence: float = 0.95, **options) -> Dict:
+    """
+    并行模拟多局游戏 | Simulate many games in parallel
+
+    模拟局按 block_size 分块，第 i 块使用 block_seed(seed, i) 的随机数流。
+    结果只由 seed、trials、block_size 和 options 决定，与 workers 无关。
+    Trials are split into blocks of block_size and block i uses the stream block_seed(seed, i).
+    The result depends only on seed, trials, block_size and options, never on workers.
+
+    Args:
+        game: 'monty_hall'、'number_guessing'、'probability_race' 或 'slot_machine'
+        trials: 模拟局数 (老虎机为转动次数) | number of games (spins for the slot machine)
+        seed: 主种子 | master seed
+        workers: 进程数 (默认CPU核数)；为1时在当前进程串行计算 | processes; 1 runs serially in-process
+        block_size: 每块的局数 | games per block
+        confidence: 置信区间的置信水平 | confidence level of the intervals
+        **options: 游戏参数 | game options
+            monty_hall: num_doors, opened, host_knows, strategy ('switch' / 'stay')
+            number_guessing: min_num, max_num, difficulty, strategy ('binary' / 'random')
+            probability_race: target, strategy ('expected_value' / 'safe' / 'risky' / 'balanced')
+
+    Returns:
+        合并后的计数和由此计算的比率 | merged counts and the rates derived from them
+    """
+    if game not in _PLAYERS:
+        raise ValueError(f"未知的游戏 {game!r}，可选: {', '.join(GAMES)} | Unknown game")
+    if trials <= 0 or block_size <= 0:
+        raise ValueError("trials 和 block_size 必须为正整数 | trials and block_size must be positive")
+
+    blocks: List[Tuple[int, int]] = [(index, min(block_size, trials - start))
+                                     for index, start in enumerate(range(0, trials, block_size))]
+    args = (repeat(game), repeat(options), repeat(seed), blocks)
+    if workers == 1 or len(blocks) == 1:
+        counts = merge_counts(map(_run_block, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = merge_counts(executor.map(_run_block, *args))
+
+    return _result(game, counts, seed, len(blocks), options, confidence)
+
+
+def _result(game: str, counts: Dict, seed: int, blocks: int, options: Dict, confidence: float) -> Dict:
+    moments = counts.pop('moments')
+    result = {'game': game, 'trials': counts['games'], 'seed': seed, 'blocks': blocks, 'options': options}
+    result.update(counts)
+    result.update(_describe(game, counts, confidence))
+    result['statistics'] = {name: stats.summary(confidence) for name, stats in moments.items()}
+    return result
+
+
+def _interval(stats: RunningStats, bernoulli: bool, confidence: float) -> Tuple[float, float, bool]:
+    """
+    run_until 停止判断用的置信区间 | Confidence interval used by run_until's stopping rule
+
+    0/1统计量用Wilson区间：全是0或全是1时正态近似的区间宽度为0，会在第一批后就误判为收敛。
+    0/1 statistics use the Wilson interval: with all zeros or all ones the normal approximation
+    has zero width and would stop after the first batch.
+
+    Returns:
+        (下限, 上限, 样本是否没有变化) | (low, high, whether the sample has zero variance)
+    """
+    if bernoulli:
+        successes = round(stats.mean * stats.count)
+        low, high = _wilson_interval(successes, stats.count, confidence)
+        return low, high, successes in (0, stats.count)
+    low, high = stats.interval(confidence)
+    return low, high, stats.m2 == 0
+
+
+def run_until(game: str, tolerance: float, statistic: Optional[str] = None, seed: int = 0,
+              batch_size: int = 10000, max_trials: int = 10_000_000, confidence: float = 0.95,
+              workers: Optional[int] = 1, min_trials: int = 10000, **options) -> Dict:
+    """
+    自适应模拟：置信区间足够窄时停止 | Adaptive simulation that stops at a target interval width
+
+    按批模拟，用Welford方法在线更新所选统计量的均值和方差，每批之后检查置信区间宽度，
+    小于 tolerance 时停止。0/1统计量 (见 BERNOULLI_STATISTICS) 用Wilson区间；样本没有变化时
+    (例如稀有事件还没有出现过) 至少模拟 min_trials 局才算收敛。第 i 批与 run_simulation 的第 i 块使用相同的随机数流，
+    多进程时每轮并行计算 workers 批、按顺序检查，停止点之后多算的批被丢弃，
+    因此结果与进程数无关，且等于 run_simulation(game, 返回的 trials, seed, block_size=batch_size)。
+    Runs batches, updates the mean and variance of the chosen statistic online with Welford's method
+    and stops once the confidence interval is narrower than tolerance. 0/1 statistics (see
+    BERNOULLI_STATISTICS) use the Wilson interval, and a sample with no variation (e.g. no wins yet
+    for a rare event) only counts as converged after min_trials games. Batch i uses the same stream
+    as block i of run_simulation; with several workers each round computes workers batches in parallel
+    and checks them in order, discarding batches past the stopping point, so the result does not
+    depend on workers and equals run_simulation(game, returned trials, seed, block_size=batch_size).
+
+    Args:
+        game: 游戏名 (见 GAMES) | game name
+        tolerance: 置信区间的目标宽度 (上限减下限) | target interval width (high - low)
+        statistic: 估计的统计量 (默认见 DEFAULT_STATISTICS) | statistic to estimate
+            monty_hall: 'win'；number_guessing: 'attempts' / 'win'；
+            probability_race: 'turns'；slot_machine: 'jackpot' / 'win'
+        seed: 主种子 | master seed
+        batch_size: 每批的局数 | games per batch
+        max_trials: 最多模拟的局数 | maximum number of games
+        confidence: 置信水平 | confidence level
+        workers: 进程数 (默认1，在当前进程串行计算；None为CPU核数) | processes (None: CPU count)
+        min_trials: 样本没有变化时判定收敛所需的最少局数 | games required before a zero-variance
+            sample can count as converged
+        **options: 游戏参数，同 run_simulation | game options, as for run_simulation
+
+    Returns:
+        run_simulation 格式的结果，另含 statistic、estimate (均值)、confidence_interval、
+        width 和 converged (是否在 max_trials 内达到目标宽度)
+        | run_simulation-style result plus statistic, estimate, confidence_interval, width and converged
+    """
+    if game not in _PLAYERS:
+        raise ValueError(f"未知的游戏 {game!r}，可选: {', '.join(GAMES)} | Unknown game")
+    if tolerance <= 0 or batch_size <= 0 or max_trials <= 0:
+        raise ValueError("tolerance、batch_size 和 max_trials 必须为正数 | tolerance, batch_size and max_trials must be positive")
+    statistic = statistic or DEFAULT_STATISTICS[game]
+    bernoulli = statistic in BERNOULLI_STATISTICS
+    workers = workers or os.cpu_count() or 1
+
+    counts: Dict = {}
+    used = batches = 0
+    converged = False
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while used < max_trials and not converged:
+            round_blocks = []
+            planned = used
+            for index in range(batches, batches + workers):
+                if planned >= max_trials:
+                    break
+                size = min(batch_size, max_trials - planned)
+                round_blocks.append((index, size))
+                planned += size
+            args = (repeat(game), repeat(options), repeat(seed), round_blocks)
+            parts = executor.map(_run_block, *args) if executor else map(_run_block, *args)
+            for part in parts:
+                if statistic not in part['moments']:
+                    raise ValueError(f"{game} 没有统计量 {statistic!r}，可选: "
+                                     f"{', '.join(part['moments'])} | Unknown statistic")
+                counts = merge_counts([counts, part])
+                used += part['games']
+                batches += 1
+                stats = counts['moments'][statistic]
+                low, high, constant = _interval(stats, bernoulli, confidence)
+                if high - low < tolerance and (not constant or stats.count >= min_trials):
+                    converged = True
+                    break
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    estimate = counts['moments'][statistic]
+    result = _result(game, counts, seed, batches, options, confidence)
+    result.update({
+        'statistic': statistic,
+        'estimate': estimate.mean,
+        'confidence_interval': (low, high),
+        'width': high - low,
+        'tolerance': tolerance,
+        'converged': converged
+    })
+    return result
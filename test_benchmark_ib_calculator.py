@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+性能基准工具测试脚本 | Benchmark Tool Test Script
+
+测试基线比较能发现回退，并拒绝比较不同运行环境的结果。
+Checks that baseline comparison flags regressions and refuses mismatched environments.
+"""
+
+import json
+import os
+import tempfile
+
+import benchmark_ib_calculator as bench
+from ib_calculator import IBStockCalculator
+
+
+def test_compare():
+    """测试基线回退检查 | Test baseline regression check"""
+    print("Testing compare...")
+    baseline = {
+        'calculate_commission': {'per_call_us': 2.0},
+        'calculate_profit': {'per_call_us': 10.0},
+        'calculate_buy_cost': {'per_call_us': 0.0},
+    }
+    results = {
+        'calculate_commission': {'per_call_us': 2.3},
+        'calculate_profit': {'per_call_us': 13.0},
+        'calculate_buy_cost': {'per_call_us': 5.0},
+        'calculate_multiple_transactions[1000]': {'per_call_us': 1.0},
+    }
+    regressions = bench.compare(results, baseline, tolerance=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('calculate_profit:') and '+30.0%' in regressions[0]
+    assert bench.compare(results, baseline, tolerance=0.5) == []
+    assert len(bench.compare(results, baseline, tolerance=0.1)) == 2
+    print("✓ compare passed all tests")
+
+
+def test_environment_mismatch():
+    """测试运行环境校验 | Test environment check"""
+    print("Testing environment check...")
+    report = bench.environment('decimal', None)
+    assert bench.environment_mismatches(report, dict(report)) == []
+    assert bench.environment_mismatches(report, {'backend': 'decimal'}) == []
+
+    mismatches = bench.environment_mismatches(report, dict(report, backend='integer', machine='other'))
+    assert len(mismatches) == 2
+    assert any(line.startswith('backend:') for line in mismatches)
+    assert any(line.startswith('machine:') for line in mismatches)
+    print("✓ environment check passed all tests")
+
+
+def test_main_compare():
+    """测试命令行比较的退出码 | Test CLI exit codes"""
+    print("Testing --compare exit codes...")
+    args = ['--sizes', '100', '--calls', '50', '--repeat', '1']
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'baseline.json')
+        assert bench.main(args + ['--save', path]) == 0
+        with open(path, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        assert baseline['backend'] == 'decimal'
+        assert 'calculate_multiple_transactions[100]' in baseline['results']
+
+        # 基线快得不现实时报告回退
+        for result in baseline['results'].values():
+            result['per_call_us'] = 1e-6
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(baseline, handle)
+        assert bench.main(args + ['--compare', path]) == 1
+
+        # 后端不同时拒绝比较
+        assert bench.main(args + ['--backend', 'integer', '--compare', path]) == 2
+    print("✓ --compare exit codes passed all tests")
+
+
+def test_ledger_built_before_timing():
+    """测试账本在计时前生成 | Test ledger is generated before timing"""
+    print("Testing ledger generation...")
+    calls = []
+    original = bench._ledger
+
+    def counting_ledger(size, seed=42):
+        calls.append(size)
+        return original(size, seed)
+
+    bench._ledger = counting_ledger
+    try:
+        results = bench.run_benchmarks(IBStockCalculator(), calls=10, sizes=[50], repeat=3)
+    finally:
+        bench._ledger = original
+    # 三次计时和一次内存测量共用同一份账本
+    assert calls == [50]
+    assert results['calculate_multiple_transactions[50]']['calls'] == 50
+    print("✓ ledger generation passed all tests")
+
+
+if __name__ == '__main__':
+    test_compare()
+    test_environment_mismatch()
+    test_main_compare()
+    test_ledger_built_before_timing()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+股票计算器测试脚本 | IB Stock Calculator Test Script
+
+测试计算器的批量、流式等扩展功能与原有Decimal计算路径保持一致。
+Checks that the calculator's extended paths agree with the original Decimal path.
+"""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+from array import array
+from decimal import Decimal
+
+import ib_calculator
+from ib_calculator import IBStockCalculator, _numpy, main, print_transaction_summary
+
+
+def _random_trades(count: int, seed: int = 7):
+    """生成随机的 (股数, 价格) 列表，价格最多4位小数"""
+    rng = random.Random(seed)
+    trades = []
+    for _ in range(count):
+        shares = rng.choice([1, 5, 10, 100, 250, 1000, rng.randint(1, 200000)])
+        price = round(rng.uniform(0.01, 900), rng.choice([2, 3, 4]))
+        trades.append((shares, price))
+    return trades
+
+
+def test_commissions_cents_batch():
+    """测试批量佣金计算 | Test batch commission engine"""
+    print("Testing calculate_commissions_cents...")
+    calculator = IBStockCalculator()
+    trades = _random_trades(2000)
+    shares = array('q', [s for s, _ in trades])
+    prices = array('d', [p for _, p in trades])
+
+    batch = calculator.calculate_commissions_cents(shares, prices)
+    assert len(batch) == len(trades)
+    for cents, (s, p) in zip(batch, trades):
+        assert Decimal(cents) / 100 == calculator.calculate_commission(s, p)
+
+    # 单笔计算和纯Python批量接口不导入numpy
+    check = ("import sys, ib_calculator; c = ib_calculator.IBStockCalculator(); "
+             "c.calculate_commission(100, 50.0); c.calculate_commissions_cents([100], [50.0]); "
+             "assert 'numpy' not in sys.modules")
+    assert subprocess.run([sys.executable, '-c', check], cwd=os.path.dirname(os.path.abspath(__file__))).returncode == 0
+
+    np = _numpy()
+    if np is not None:
+        np_batch = calculator.calculate_commissions_cents(np.array(shares), np.array(prices))
+        assert np_batch.tolist() == batch.tolist()
+
+    # 超过6位小数的价格无法精确换算为微单位，结果仍与逐笔计算一致
+    shares = [1, 1, 1000, 3, 100]
+    prices = [0.4999999, 0.5, 12.3456789, 1e-7, 50.0]
+    expected = [int(calculator.calculate_commission(s, p).scaleb(2)) for s, p in zip(shares, prices)]
+    assert expected[0] == 0
+    assert list(calculator.calculate_commissions_cents(shares, prices)) == expected
+    assert list(IBStockCalculator(backend='integer').calculate_commissions_cents(shares, prices)) == expected
+    if np is not None:
+        assert calculator.calculate_commissions_cents(np.array(shares), np.array(prices)).tolist() == expected
+
+    print("✓ calculate_commissions_cents passed all tests")
+
+
+def test_streaming_transactions():
+    """测试流式多笔交易处理 | Test streaming ledger processing"""
+    print("Testing iter_transaction_summaries...")
+    calculator = IBStockCalculator()
+    transactions = [
+        {'type': 'buy', 'shares': 100, 'price': 50.00},
+        {'type': 'buy', 'shares': 50, 'price': 52.00},
+        {'type': 'sell', 'shares': 80, 'price': 55.00},
+        {'type': 'sell', 'shares': 30, 'price': 57.00},
+        {'type': 'buy', 'shares': 10, 'price': 49.50},
+    ]
+    expected = calculator.calculate_multiple_transactions(transactions)
+
+    # 迭代器只能遍历一次
+    assert calculator.calculate_multiple_transactions(iter(transactions)) == expected
+
+    summaries = list(calculator.iter_transaction_summaries(iter(transactions), summary_every=2))
+    assert [s['transaction_count'] for s in summaries] == [2, 4, 5]
+    assert summaries[0] == dict(calculator.calculate_multiple_transactions(transactions[:2]),
+                                transaction_count=2)
+    final = dict(summaries[-1])
+    del final['transaction_count']
+    assert final == expected
+
+    # 直接读取CSV
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=['type', 'shares', 'price'])
+    writer.writeheader()
+    writer.writerows(transactions)
+    buffer.seek(0)
+    summaries = list(calculator.iter_transaction_summaries(csv.DictReader(buffer)))
+    assert len(summaries) == 1
+    assert summaries[0]['total_profit'] == expected['total_profit']
+    assert summaries[0]['total_commission'] == expected['total_commission']
+
+    print("✓ iter_transaction_summaries passed all tests")
+
+
+def test_integer_backend_matches_decimal():
+    """差分测试：整数后端与Decimal后端 | Differential test of the integer backend"""
+    print("Testing integer backend...")
+    decimal_calc = IBStockCalculator()
+    integer_calc = IBStockCalculator(backend='integer')
+    rng = random.Random(11)
+
+    for _ in range(3000):
+        buy_shares = rng.choice([1, 3, 10, 100, rng.randint(1, 500000)])
+        sell_shares = rng.randint(1, buy_shares)
+        buy_price = round(rng.uniform(0.0001, 2000), rng.choice([0, 2, 4, 6, 8]))
+        sell_price = round(rng.uniform(0.0001, 2000), rng.choice([2, 3, 4]))
+        cases = [
+            ('calculate_commission', (buy_shares, buy_price)),
+            ('calculate_buy_cost', (buy_shares, buy_price)),
+            ('calculate_sell_proceeds', (sell_shares, sell_price)),
+            ('calculate_profit', (buy_shares, buy_price, sell_shares, sell_price)),
+        ]
+        for method, args in cases:
+            expected = getattr(decimal_calc, method)(*args)
+            actual = getattr(integer_calc, method)(*args)
+            # 比较字符串表示，确保指数 (小数位数) 和符号也一致
+            assert str(actual) == str(expected), (method, args, actual, expected)
+
+    try:
+        IBStockCalculator(backend='float')
+        assert False, "未知后端应抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✓ integer backend passed all tests")
+
+
+def test_lru_cache():
+    """测试LRU缓存 | Test bounded memoization cache"""
+    print("Testing LRU cache...")
+    calculator = IBStockCalculator(cache_size=2)
+    uncached = IBStockCalculator()
+
+    first = calculator.calculate_buy_cost(100, 50.0)
+    assert calculator.calculate_buy_cost(100, 50.0) is first
+    assert dict(first) == uncached.calculate_buy_cost(100, 50.0)
+    try:
+        first['total_cost'] = Decimal('0')
+        assert False, "缓存结果应为只读"
+    except TypeError:
+        pass
+
+    # 类型不同的参数不共享缓存条目
+    assert str(calculator.calculate_commission(100, 50)) == str(uncached.calculate_commission(100, 50))
+    info = calculator.cache_info()
+    assert info['hits'] == 1
+    assert info['size'] == 2
+    assert info['maxsize'] == 2
+    assert info['evictions'] >= 1
+
+    # 修改费率会清空缓存
+    calculator.min_commission = 1
+    assert calculator.cache_info()['size'] == 0
+    assert calculator.calculate_commission(10, 50.0) == Decimal('1.00')
+    assert calculator.calculate_commission(10, 50.0) == IBStockCalculator(min_commission=1).calculate_commission(10, 50.0)
+
+    calculator.cache_clear()
+    assert calculator.cache_info() == {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 2}
+    assert IBStockCalculator().cache_info()['maxsize'] == 0
+
+    # 未启用缓存时方法就是类方法本身，没有包装开销
+    assert 'calculate_commission' not in vars(uncached)
+    assert 'calculate_commission' in vars(calculator)
+
+    # 启用缓存的计算器可以pickle (传给工作进程)，恢复后缓存仍然有效
+    calculator.calculate_commission(10, 50.0)
+    restored = pickle.loads(pickle.dumps(calculator))
+    restored.calculate_commission(10, 50.0)
+    assert restored.cache_info()['hits'] == calculator.cache_info()['hits'] + 1
+
+    print("✓ LRU cache passed all tests")
+
+
+def test_lazy_results():
+    """测试延迟舍入结果对象 | Test slotted lazy result objects"""
+    print("Testing lazy results...")
+    eager = IBStockCalculator()
+    lazy = IBStockCalculator(lazy_results=True)
+    rng = random.Random(3)
+
+    for _ in range(500):
+        buy_shares = rng.randint(1, 100000)
+        sell_shares = rng.randint(1, buy_shares)
+        buy_price = round(rng.uniform(0.01, 900), 2)
+        sell_price = round(rng.uniform(0.01, 900), 3)
+        expected = eager.calculate_profit(buy_shares, buy_price, sell_shares, sell_price)
+        actual = lazy.calculate_profit(buy_shares, buy_price, sell_shares, sell_price)
+        assert actual == expected
+        assert dict(actual['buy_info']) == expected['buy_info']
+        assert actual.profit == expected['profit']
+
+    result = lazy.calculate_buy_cost(100, 150.0)
+    assert 'avg_cost_per_share' in result
+    assert 'missing' not in result
+    assert result.get('missing') is None
+    try:
+        result.commission = Decimal('0')
+        assert False, "结果对象应为只读"
+    except AttributeError:
+        pass
+
+    # print_transaction_summary 的输出保持一致
+    outputs = []
+    for calculator in (eager, lazy):
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            print_transaction_summary(calculator.calculate_profit(200, 50.0, 100, 55.0))
+        outputs.append(buffer.getvalue())
+    assert outputs[0] == outputs[1]
+
+    transactions = [
+        {'type': 'buy', 'shares': 100, 'price': 50.00},
+        {'type': 'sell', 'shares': 80, 'price': 55.00},
+    ]
+    assert lazy.calculate_multiple_transactions(transactions) == \
+        eager.calculate_multiple_transactions(transactions)
+
+    try:
+        IBStockCalculator(backend='integer', lazy_results=True)
+        assert False, "整数后端不支持 lazy_results"
+    except ValueError:
+        pass
+
+    print("✓ lazy results passed all tests")
+
+
+def test_profit_grid():
+    """测试盈利网格与逐点计算一致 | Test what-if profit grid against calculate_profit"""
+    print("Testing calculate_profit_grid...")
+    calculator = IBStockCalculator()
+    # 小股数触发最低佣金，低价大股数触发1%上限
+    prices = [0.05, 0.3, 1.0, 9.99, 48.5, 50.0, 50.01, 55.25, 120.0]
+    quantities = [1, 10, 99, 100, 500, 1000, 1200]
+
+    def check(grid):
+        assert len(grid['net_profit']) == len(quantities)
+        for i, quantity in enumerate(quantities):
+            for j, price in enumerate(prices):
+                profit = grid['net_profit'][i][j]
+                if quantity > 1000:
+                    assert profit != profit
+                    continue
+                expected = calculator.calculate_profit(1000, 50.0, quantity, price)
+                assert profit == float(expected['profit'])
+                assert grid['profit_percentage'][i][j] == float(expected['profit_percentage'])
+                assert grid['commission'][i][j] == float(expected['sell_info']['commission'])
+
+    np = _numpy()
+    if np is not None:
+        grid = calculator.calculate_profit_grid(1000, 50.0, np.array(prices), quantities)
+        assert grid['net_profit'].shape == (len(quantities), len(prices))
+        check(grid)
+
+    # 模拟未安装numpy
+    ib_calculator._np = None
+    try:
+        check(calculator.calculate_profit_grid(1000, 50.0, prices, quantities))
+    finally:
+        ib_calculator._np = np
+
+    print("✓ calculate_profit_grid passed all tests")
+
+
+def test_break_even():
+    """测试保本价格 | Test break-even price solver"""
+    print("Testing break-even prices...")
+    calculator = IBStockCalculator()
+    rng = random.Random(11)
+    positions = [(1000, 50.0, 1000), (1, 0.5, 1), (1000, 0.05, 1000), (200, 50.0, 100)]
+    for _ in range(300):
+        bought = rng.choice([1, 10, 100, 1000, rng.randint(1, 50000)])
+        price = round(rng.choice([rng.uniform(0.01, 1), rng.uniform(1, 500)]), rng.choice([2, 4]))
+        positions.append((bought, price, rng.randint(1, bought)))
+
+    def covered(bought, price, shares, sell_price):
+        result = calculator.calculate_profit(bought, price, shares, float(sell_price))
+        return result['sell_info']['net_proceeds'] >= result['buy_info']['avg_cost_per_share'] * shares
+
+    for bought, price, shares in positions:
+        break_even = calculator.calculate_break_even_price(bought, price, shares)
+        assert covered(bought, price, shares, break_even)
+        assert not covered(bought, price, shares, break_even - Decimal('0.01'))
+
+    # 最低佣金和1%上限两种情况的保本价格
+    assert calculator.calculate_break_even_price(1000, 50.0) == Decimal('50.01')
+    assert calculator.calculate_break_even_price(1000, 0.05) == Decimal('0.06')
+
+    columns = [list(column) for column in zip(*positions)]
+    batch = calculator.calculate_break_even_cents(*columns)
+    expected = [int(calculator.calculate_break_even_price(*p).scaleb(2)) for p in positions]
+    assert batch.tolist() == expected
+    np = _numpy()
+    if np is not None:
+        np_batch = calculator.calculate_break_even_cents(*(np.array(column) for column in columns))
+        assert np_batch.tolist() == expected
+
+    try:
+        calculator.calculate_break_even_price(100, 50.0, 200)
+        assert False, "卖出股数超过买入股数应报错"
+    except ValueError:
+        pass
+
+    print("✓ break-even prices passed all tests")
+
+
+def test_bulk_cli():
+    """测试批量命令行模式 | Test bulk CLI mode"""
+    print("Testing bulk CLI...")
+    calculator = IBStockCalculator()
+    transactions = [
+        {'type': 'buy', 'shares': 100, 'price': 50.0},
+        {'type': 'buy', 'shares': 1, 'price': 0.5},
+        {'type': 'sell', 'shares': 80, 'price': 55.25},
+        {'type': 'sell', 'shares': 20, 'price': 57.0},
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'trades.csv')
+        with open(source, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, ['type', 'shares', 'price'])
+            writer.writeheader()
+            writer.writerows(transactions)
+
+        outputs = []
+        for extra in ([], ['--workers', '2', '--chunk-size', '1']):
+            target = os.path.join(directory, 'results.jsonl')
+            assert main(['bulk', source, '-o', target] + extra) == 0
+            with open(target) as handle:
+                outputs.append([json.loads(line) for line in handle])
+        assert outputs[0] == outputs[1]
+        for trans, result in zip(transactions, outputs[0]):
+            if trans['type'] == 'buy':
+                expected = calculator.calculate_buy_cost(trans['shares'], trans['price'])['total_cost']
+            else:
+                expected = calculator.calculate_sell_proceeds(trans['shares'], trans['price'])['net_proceeds']
+            assert result['net'] == str(expected)
+
+        target = os.path.join(directory, 'summary.jsonl')
+        assert main(['bulk', source, '--summary', '-o', target]) == 0
+        with open(target) as handle:
+            summary = json.loads(handle.read())
+        expected = calculator.calculate_multiple_transactions(transactions)
+        assert summary['total_profit'] == str(expected['total_profit'])
+
+        with open(source, 'a') as handle:
+            handle.write('hold,1,1\n')
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            assert main(['bulk', source, '-o', target]) == 1
+        assert '第6行' in errors.getvalue()
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+        assert main([]) == 0
+    assert '示例 1' in buffer.getvalue()
+
+    print("✓ bulk CLI passed all tests")
+
+
+if __name__ == '__main__':
+    test_commissions_cents_batch()
+    test_streaming_transactions()
+    test_integer_backend_matches_decimal()
+    test_lru_cache()
+    test_lazy_results()
+    test_profit_grid()
+    test_break_even()
+    test_bulk_cli()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+检查点测试脚本 | Checkpoint Test Script
+
+测试中断后从检查点恢复的重放结果与一次完成的重放完全一致。
+Checks that a replay resumed from a checkpoint matches an uninterrupted replay.
+"""
+
+import os
+import random
+import tempfile
+from decimal import Decimal
+
+from ib_calculator import IBStockCalculator
+from ib_checkpoint import LedgerReplay, replay_with_checkpoints
+from ib_portfolio import LOT_METHODS
+
+
+def _ledger(count: int = 3000, seed: int = 9):
+    rng = random.Random(seed)
+    held = {'AAPL': 0, 'MSFT': 0, 'TSLA': 0}
+    transactions = []
+    for _ in range(count):
+        symbol = rng.choice(sorted(held))
+        if held[symbol] and rng.random() < 0.4:
+            shares = rng.randint(1, held[symbol])
+            held[symbol] -= shares
+            trans_type = 'sell'
+        else:
+            shares = rng.randint(1, 500)
+            held[symbol] += shares
+            trans_type = 'buy'
+        transactions.append({'symbol': symbol, 'type': trans_type, 'shares': shares,
+                             'price': round(rng.uniform(10, 400), 2)})
+    return transactions
+
+
+def _crashing(transactions, crash_at):
+    for index, trans in enumerate(transactions):
+        if index == crash_at:
+            raise RuntimeError("模拟崩溃")
+        yield trans
+
+
+def test_resume_matches_uninterrupted():
+    """测试恢复后的结果 | Test resumed replay"""
+    print("Testing checkpoint resume...")
+    transactions = _ledger()
+    calculator = IBStockCalculator()
+
+    for method in LOT_METHODS:
+        expected = LedgerReplay(calculator, method)
+        for trans in transactions:
+            expected.apply(trans)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replay.ckpt')
+            try:
+                replay_with_checkpoints(_crashing(transactions, 2345), path, every=500,
+                                        calculator=calculator, lot_method=method)
+                assert False, "应模拟崩溃"
+            except RuntimeError:
+                pass
+            assert LedgerReplay.load(path, calculator).transaction_count == 2000
+
+            resumed = replay_with_checkpoints(transactions, path, every=500, calculator=calculator)
+            assert resumed.portfolio.method == method
+            assert resumed.summary() == expected.summary()
+            assert resumed.summary() == calculator.calculate_multiple_transactions(transactions)
+            assert resumed.portfolio.positions() == expected.portfolio.positions()
+            assert resumed.state() == expected.state()
+
+            # 重放已完成的账本时不再重新计算
+            again = replay_with_checkpoints(transactions, path, every=500, calculator=calculator)
+            assert again.summary() == expected.summary()
+
+    print("✓ checkpoint resume passed all tests")
+
+
+def test_checkpoint_validation():
+    """测试检查点校验 | Test checkpoint validation"""
+    print("Testing checkpoint validation...")
+    transactions = _ledger(200)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'replay.ckpt')
+        replay_with_checkpoints(transactions[:100], path, every=1000)
+        assert os.path.getsize(path) < 400
+
+        changed = [dict(trans) for trans in transactions]
+        changed[99]['price'] += 1
+        try:
+            replay_with_checkpoints(changed, path)
+            assert False, "账本被修改应报错"
+        except ValueError:
+            pass
+
+        try:
+            LedgerReplay.load(path, IBStockCalculator(commission_rate=0.005))
+            assert False, "费率不同应报错"
+        except ValueError:
+            pass
+
+        with open(path, 'wb') as handle:
+            handle.write(b'not a checkpoint')
+        try:
+            LedgerReplay.load(path)
+            assert False, "无效文件应报错"
+        except ValueError:
+            pass
+
+        # Decimal 价格按字符串保存和核对
+        ledger = [dict(trans, price=Decimal(str(trans['price']))) for trans in transactions]
+        os.remove(path)
+        replay_with_checkpoints(ledger[:100], path, every=1000)
+        resumed = replay_with_checkpoints(ledger, path)
+        assert resumed.summary() == IBStockCalculator().calculate_multiple_transactions(ledger)
+        changed = [dict(trans) for trans in ledger]
+        changed[-1]['price'] += 1
+        try:
+            replay_with_checkpoints(changed, path)
+            assert False, "账本被修改应报错"
+        except ValueError:
+            pass
+
+    print("✓ checkpoint validation passed all tests")
+
+
+if __name__ == '__main__':
+    test_resume_matches_uninterrupted()
+    test_checkpoint_validation()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+多币种测试脚本 | Multi-Currency Test Script
+
+测试汇率的 as-of 查找、缓存，以及以基准货币汇总的佣金和盈亏。
+Checks as-of FX lookups, the rate cache, and base-currency roll-ups.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from ib_calculator import IBStockCalculator
+from ib_fx import FXRates, MultiCurrencyLedger, calculate_multi_currency
+
+
+CENT = Decimal('0.01')
+
+
+def _rates():
+    fx = FXRates('USD')
+    fx.load([
+        ('EUR/USD', '2024-01-03', '1.10'),
+        ('EURUSD', '2024-01-02', 1.08),
+        ('EURUSD', '2024-01-05', '1.12'),
+        ('USDJPY', '2024-01-02', '125'),
+    ])
+    return fx
+
+
+def test_fx_lookup():
+    """测试汇率查找 | Test FX lookup"""
+    print("Testing FX lookup...")
+    fx = _rates()
+    assert set(fx.currencies) == {'EUR', 'JPY'}
+    assert fx.rate('USD', '1999-01-01') == 1
+    assert fx.rate('EUR', '2024-01-02') == Decimal('1.08')
+    assert fx.rate('EUR', datetime(2024, 1, 3, 15, 30)) == Decimal('1.10')
+    # 周末没有汇率，使用之前最近的汇率
+    assert fx.rate('EUR', date(2024, 1, 4)) == Decimal('1.10')
+    assert fx.rate('EUR', '2024-03-01T09:30:00') == Decimal('1.12')
+    assert fx.rate('EUR', 1704456000) == Decimal('1.12')
+    assert fx.rate('JPY', '2024-01-09') == Decimal('0.008')
+    assert fx.convert(Decimal('1000'), 'JPY', '2024-01-09') == Decimal('8.00')
+
+    info = fx.cache_info()
+    fx.rate('EUR', '2024-01-04T20:00:00')
+    assert fx.cache_info()['hits'] == info['hits'] + 1
+
+    for currency, when, error in (('EUR', '2023-12-31', ValueError), ('GBP', '2024-01-02', KeyError)):
+        try:
+            fx.rate(currency, when)
+            assert False, "应报错"
+        except error:
+            pass
+    try:
+        fx.load([('EURGBP', '2024-01-02', '0.86')])
+        assert False, "不含基准货币的货币对应报错"
+    except ValueError:
+        pass
+
+    print("✓ FX lookup passed all tests")
+
+
+def test_base_currency_rollup():
+    """测试基准货币汇总 | Test base-currency roll-up"""
+    print("Testing base-currency roll-up...")
+    fx = _rates()
+    calculator = IBStockCalculator()
+    transactions = [
+        {'currency': 'EUR', 'timestamp': '2024-01-02', 'symbol': 'SAP', 'type': 'buy', 'shares': 100, 'price': 150.00},
+        {'currency': 'USD', 'timestamp': '2024-01-02', 'symbol': 'AAPL', 'type': 'buy', 'shares': 50, 'price': 180.00},
+        {'currency': 'EUR', 'timestamp': '2024-01-05', 'symbol': 'SAP', 'type': 'sell', 'shares': 40, 'price': 150.00},
+        {'currency': 'USD', 'timestamp': '2024-01-05', 'symbol': 'AAPL', 'type': 'sell', 'shares': 50, 'price': 190.00},
+    ]
+    summary = calculate_multi_currency(transactions, fx)
+    assert summary['base_currency'] == 'USD'
+
+    sap_buy = calculator.calculate_buy_cost(100, 150.00)
+    sap_sell = calculator.calculate_sell_proceeds(40, 150.00)
+    aapl_buy = calculator.calculate_buy_cost(50, 180.00)
+    aapl_sell = calculator.calculate_sell_proceeds(50, 190.00)
+
+    sap_cost = (sap_buy['total_cost'] * Decimal('1.08')).quantize(CENT, rounding=ROUND_HALF_UP)
+    sap_proceeds = (sap_sell['net_proceeds'] * Decimal('1.12')).quantize(CENT, rounding=ROUND_HALF_UP)
+    assert summary['total_cost'] == sap_cost + aapl_buy['total_cost']
+    assert summary['total_proceeds'] == sap_proceeds + aapl_sell['net_proceeds']
+    assert summary['total_commission'] == summary['total_buy_commission'] + summary['total_sell_commission']
+    # 同样的欧元价格买卖，盈亏来自汇率上涨
+    expected = (sap_proceeds - sap_cost * 40 / 100) + (aapl_sell['net_proceeds'] - aapl_buy['total_cost'])
+    assert summary['realized_profit'] == expected.quantize(CENT, rounding=ROUND_HALF_UP)
+    assert summary['open_cost_basis'] == (sap_cost * 60 / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    # 本币摘要与单币种计算一致
+    eur = [trans for trans in transactions if trans['currency'] == 'EUR']
+    assert summary['by_currency']['EUR'] == calculator.calculate_multiple_transactions(eur)
+
+    ledger = MultiCurrencyLedger(fx)
+    ledger.extend(transactions[:1])
+    try:
+        ledger.add(dict(transactions[2], shares=101))
+        assert False, "卖出超过持有股数应报错"
+    except ValueError:
+        pass
+
+    # 不同币种可以使用不同的佣金规则
+    tokyo = IBStockCalculator(commission_rate=0.001, min_commission=0.8)
+    summary = calculate_multi_currency([
+        {'currency': 'JPY', 'timestamp': '2024-01-02', 'type': 'buy', 'shares': 100, 'price': 2500},
+    ], fx, {'JPY': tokyo})
+    assert summary['by_currency']['JPY']['total_buy_commission'] == tokyo.calculate_buy_cost(100, 2500)['commission']
+
+    print("✓ base-currency roll-up passed all tests")
+
+
+if __name__ == '__main__':
+    test_fx_lookup()
+    test_base_currency_rollup()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+计算器指标测试脚本 | Calculator Instrumentation Test Script
+
+测试指标采集的计数、缓存命中率和导出格式，以及卸载后计算器恢复原状。
+Checks call counts, cache hit rates, export formats and clean detaching.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+
+import ib_calculator
+from ib_calculator import IBStockCalculator
+from ib_instrumentation import Instrumentation
+
+
+def test_call_metrics():
+    """测试调用次数和Decimal计数 | Test call counts and Decimal counts"""
+    print("Testing call metrics...")
+    calculator = IBStockCalculator(cache_size=16)
+    expected = calculator.calculate_profit(200, 50.0, 100, 55.0)
+    calculator.cache_clear()
+
+    instrumentation = Instrumentation()
+    with instrumentation.attached(calculator):
+        result = calculator.calculate_profit(200, 50.0, 100, 55.0)
+        calculator.calculate_buy_cost(200, 50.0)
+        try:
+            calculator.calculate_profit(100, 50.0, 200, 55.0)
+        except ValueError:
+            pass
+        assert ib_calculator.Decimal is not Decimal
+        assert type(result['profit']) is Decimal
+
+    assert result == expected
+    assert ib_calculator.Decimal is Decimal
+    assert 'calculate_profit' not in vars(calculator)
+
+    methods = instrumentation.snapshot()['methods']
+    assert methods['calculate_profit']['calls'] == 2
+    assert methods['calculate_profit']['errors'] == 1
+    assert methods['calculate_buy_cost']['calls'] == 2
+    assert methods['calculate_profit']['decimals_constructed'] > 0
+    histogram = methods['calculate_profit']['histogram']
+    assert sum(histogram['counts']) == 2 and histogram['buckets'][-1] == '+Inf'
+
+    cache = instrumentation.snapshot()['cache']
+    assert (cache['hits'], cache['misses']) == (1, 4)
+    assert cache['hit_rate'] == 0.2
+
+    # 卸载后不再记录
+    calculator.calculate_profit(200, 50.0, 100, 55.0)
+    assert instrumentation.snapshot()['methods']['calculate_profit']['calls'] == 2
+    # 卸载后恢复实例上的缓存包装
+    hits = calculator.cache_info()['hits']
+    calculator.calculate_buy_cost(200, 50.0)
+    assert calculator.cache_info()['hits'] == hits + 1
+
+    instrumentation.reset()
+    assert instrumentation.snapshot()['methods']['calculate_profit']['calls'] == 0
+
+    # 只统计当前线程挂载方法内的构造: 调用期间其他线程构造的 Decimal 不计入
+    def transactions(busy_thread):
+        yield {'type': 'buy', 'shares': 100, 'price': 50.0}
+        if busy_thread:
+            thread = threading.Thread(target=lambda: [IBStockCalculator().calculate_commission(100, 50.0)
+                                                      for _ in range(100)])
+            thread.start()
+            thread.join()
+        yield {'type': 'sell', 'shares': 100, 'price': 55.0}
+
+    counts = []
+    for busy_thread in (False, True):
+        calculator = IBStockCalculator()
+        instrumentation = Instrumentation(methods=('calculate_multiple_transactions',))
+        with instrumentation.attached(calculator):
+            calculator.calculate_multiple_transactions(transactions(busy_thread))
+            ib_calculator.Decimal('1')
+        counts.append(instrumentation.snapshot()['methods']['calculate_multiple_transactions']
+                      ['decimals_constructed'])
+    assert counts[0] > 0 and counts[0] == counts[1]
+
+    print("✓ call metrics passed all tests")
+
+
+def test_exports():
+    """测试JSON和Prometheus导出 | Test JSON and Prometheus export"""
+    print("Testing exports...")
+    calculator = IBStockCalculator()
+    instrumentation = Instrumentation()
+    with instrumentation.attached(calculator):
+        for shares in (1, 100, 1000):
+            calculator.calculate_commission(shares, 50.0)
+
+    text = instrumentation.to_prometheus()
+    assert '# TYPE ib_calculator_call_duration_seconds histogram' in text
+    assert 'ib_calculator_calls_total{method="calculate_commission"} 3' in text
+    assert 'ib_calculator_call_duration_seconds_bucket{method="calculate_commission",le="+Inf"} 3' in text
+    assert 'ib_calculator_call_duration_seconds_count{method="calculate_commission"} 3' in text
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'metrics.prom')
+        instrumentation.write_prometheus(path)
+        with open(path) as handle:
+            assert handle.read() == text
+        path = os.path.join(directory, 'metrics.json')
+        instrumentation.write_json(path)
+        with open(path) as handle:
+            assert json.load(handle)['methods']['calculate_commission']['calls'] == 3
+        assert sorted(os.listdir(directory)) == ['metrics.json', 'metrics.prom']
+
+    print("✓ exports passed all tests")
+
+
+if __name__ == '__main__':
+    test_call_metrics()
+    test_exports()
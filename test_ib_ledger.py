@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+账本测试脚本 | Ledger Test Script
+
+测试增量账本与 calculate_multiple_transactions 的结果一致。
+Checks that the ledgers agree with calculate_multiple_transactions.
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from ib_calculator import IBStockCalculator
+from ib_ledger import IncrementalLedger, TimestampedLedger
+from ib_portfolio import Portfolio
+
+
+TRANSACTIONS = [
+    {'type': 'buy', 'shares': 100, 'price': 50.00},
+    {'type': 'buy', 'shares': 50, 'price': 52.00},
+    {'type': 'sell', 'shares': 80, 'price': 55.00},
+    {'type': 'sell', 'shares': 30, 'price': 57.00},
+    {'type': 'buy', 'shares': 10, 'price': 49.50},
+]
+
+
+def test_incremental_ledger():
+    """测试增量账本 | Test incremental ledger"""
+    print("Testing IncrementalLedger...")
+    calculator = IBStockCalculator()
+    ledger = IncrementalLedger(calculator)
+
+    for count, trans in enumerate(TRANSACTIONS, 1):
+        ledger.append(trans['type'], trans['shares'], trans['price'])
+        assert ledger.summary() == calculator.calculate_multiple_transactions(TRANSACTIONS[:count])
+    assert len(ledger) == len(TRANSACTIONS)
+
+    ledger.rollback(3)
+    assert len(ledger) == 2
+    assert ledger.remaining_shares == 150
+    assert ledger.summary() == calculator.calculate_multiple_transactions(TRANSACTIONS[:2])
+
+    ledger.rollback(2)
+    assert ledger.summary() == calculator.calculate_multiple_transactions([])
+
+    bounded = IncrementalLedger(calculator, max_history=2)
+    bounded.extend(TRANSACTIONS)
+    bounded.rollback(2)
+    assert bounded.summary() == calculator.calculate_multiple_transactions(TRANSACTIONS[:3])
+    try:
+        bounded.rollback(1)
+        assert False, "超出可撤销历史应抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✓ IncrementalLedger passed all tests")
+
+
+def test_timestamped_ledger():
+    """测试时间区间查询 | Test time-range queries"""
+    print("Testing TimestampedLedger...")
+    calculator = IBStockCalculator()
+    rng = random.Random(5)
+    start = date(2026, 1, 1)
+    transactions = []
+    held = 0
+    for day in sorted(rng.randint(0, 364) for _ in range(400)):
+        if held and rng.random() < 0.4:
+            shares = rng.randint(1, held)
+            held -= shares
+            trans_type = 'sell'
+        else:
+            shares = rng.randint(1, 2000)
+            held += shares
+            trans_type = 'buy'
+        transactions.append({'timestamp': start + timedelta(days=day), 'type': trans_type,
+                             'shares': shares, 'price': round(rng.uniform(10, 200), 2)})
+
+    ledger = TimestampedLedger(transactions, calculator)
+    assert len(ledger) == len(transactions)
+
+    # 用平均成本法的投资组合逐笔重放作为对照
+    portfolio = Portfolio(calculator, method='average')
+    realized = [Decimal('0')]
+    for trans in transactions:
+        portfolio.apply([dict(trans, symbol='X')])
+        realized.append(portfolio._positions['X'].realized_profit)
+
+    for _ in range(200):
+        low, high = sorted(start + timedelta(days=rng.randint(0, 370)) for _ in range(2))
+        selected = [i for i, trans in enumerate(transactions) if low <= trans['timestamp'] < high]
+        summary = ledger.range_summary(low, high)
+        assert summary['transaction_count'] == len(selected)
+        assert summary['volume'] == ledger.volume(low, high) == sum(transactions[i]['shares'] for i in selected)
+
+        commission = Decimal('0')
+        for i in selected:
+            trans = transactions[i]
+            commission += calculator.calculate_commission(trans['shares'], trans['price'])
+        assert summary['total_commission'] == ledger.commission(low, high) == commission
+
+        if selected:
+            expected = realized[selected[-1] + 1] - realized[selected[0]]
+        else:
+            expected = Decimal('0')
+        expected = expected.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        assert summary['realized_profit'] == ledger.realized_profit(low, high) == expected
+
+    assert ledger.realized_profit() == portfolio.position('X')['realized_profit']
+
+    try:
+        ledger.append(start, 'buy', 1, 10.0)
+        assert False, "时间戳早于最后一笔交易应报错"
+    except ValueError:
+        pass
+
+    print("✓ TimestampedLedger passed all tests")
+
+
+if __name__ == '__main__':
+    test_incremental_ledger()
+    test_timestamped_ledger()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+多账户并行计算测试脚本 | Parallel Evaluation Test Script
+
+测试进程池计算结果与串行计算完全一致。
+Checks that the process-pool run matches a serial run exactly.
+"""
+
+import random
+from decimal import Decimal
+
+from ib_calculator import IBStockCalculator
+from ib_parallel import evaluate_ledgers
+
+
+def _random_ledgers(count: int, seed: int = 5):
+    """生成随机账户交易记录"""
+    rng = random.Random(seed)
+    ledgers = {}
+    for index in range(count):
+        held = 0
+        transactions = []
+        for _ in range(rng.randint(1, 12)):
+            if held and rng.random() < 0.4:
+                shares = rng.randint(1, held)
+                held -= shares
+                transactions.append({'type': 'sell', 'shares': shares, 'price': round(rng.uniform(1, 300), 2)})
+            else:
+                shares = rng.randint(1, 2000)
+                held += shares
+                transactions.append({'type': 'buy', 'shares': shares, 'price': round(rng.uniform(1, 300), 2)})
+        ledgers[f'ACC{index:04d}'] = transactions
+    return ledgers
+
+
+def test_parallel_matches_serial():
+    """测试并行与串行一致 | Test parallel run matches serial run"""
+    print("Testing evaluate_ledgers...")
+    ledgers = _random_ledgers(200)
+    calculator = IBStockCalculator()
+
+    serial = evaluate_ledgers(ledgers, calculator, max_workers=1, chunk_size=16)
+    parallel = evaluate_ledgers(ledgers, calculator, max_workers=2, chunk_size=16)
+    assert parallel == serial
+    assert list(parallel['accounts']) == list(ledgers)
+
+    for account in ('ACC0000', 'ACC0123'):
+        assert serial['accounts'][account] == calculator.calculate_multiple_transactions(ledgers[account])
+
+    rollup = serial['rollup']
+    assert rollup['accounts'] == 200
+    assert rollup['total_profit'] == sum(
+        (summary['total_profit'] for summary in serial['accounts'].values()), Decimal('0')
+    )
+
+    try:
+        evaluate_ledgers({'BAD': [{'type': 'sell', 'shares': 1, 'price': 1.0}]}, max_workers=1)
+        assert False, "超卖应抛出 ValueError"
+    except ValueError as e:
+        assert 'BAD' in str(e)
+
+    # 重复的账户ID不会互相覆盖
+    duplicated = [('ACC', ledgers['ACC0000']), ('ACC', ledgers['ACC0001'])]
+    for workers in (1, 2):
+        try:
+            evaluate_ledgers(duplicated, calculator, max_workers=workers)
+            assert False, "重复账户ID应抛出 ValueError"
+        except ValueError as e:
+            assert 'ACC' in str(e)
+
+    # 账户数远多于在途窗口时结果仍按输入顺序
+    windowed = evaluate_ledgers(iter(ledgers.items()), calculator, max_workers=2, chunk_size=1)
+    assert windowed == serial
+
+    print("✓ evaluate_ledgers passed all tests")
+
+
+if __name__ == '__main__':
+    test_parallel_matches_serial()
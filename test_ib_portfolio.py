@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+投资组合引擎测试脚本 | Portfolio Engine Test Script
+
+测试各批次匹配方法的已实现盈亏和多股票持仓。
+Tests realized profit for each lot matching method and multi-symbol positions.
+"""
+
+from decimal import Decimal
+
+from ib_portfolio import Portfolio
+
+
+TRANSACTIONS = [
+    {'symbol': 'AAPL', 'type': 'buy', 'shares': 100, 'price': 10.00},
+    {'symbol': 'AAPL', 'type': 'buy', 'shares': 100, 'price': 20.00},
+    {'symbol': 'MSFT', 'type': 'buy', 'shares': 50, 'price': 300.00},
+    {'symbol': 'AAPL', 'type': 'buy', 'shares': 100, 'price': 15.00},
+    {'symbol': 'AAPL', 'type': 'sell', 'shares': 100, 'price': 30.00},
+]
+
+
+def test_lot_methods():
+    """测试批次匹配方法 | Test lot matching methods"""
+    print("Testing Portfolio lot methods...")
+    # 每笔买入成本含$0.35佣金，卖出净收入 3000.00 - 0.35 = 2999.65
+    expected = {
+        'fifo': Decimal('1999.30'),          # 匹配 100@10
+        'lifo': Decimal('1499.30'),          # 匹配 100@15
+        'highest_cost': Decimal('999.30'),   # 匹配 100@20
+        'average': Decimal('1499.30'),       # 平均成本 1500.35
+    }
+    for method, profit in expected.items():
+        portfolio = Portfolio(method=method).apply(TRANSACTIONS)
+        aapl = portfolio.position('AAPL')
+        assert aapl['realized_profit'] == profit, (method, aapl)
+        assert aapl['shares'] == 200
+        assert portfolio.position('MSFT')['realized_profit'] == Decimal('0')
+
+    portfolio = Portfolio(method='fifo').apply(TRANSACTIONS)
+    assert portfolio.position('AAPL')['lot_count'] == 2
+    assert portfolio.position('AAPL')['cost_basis'] == Decimal('3500.70')
+    summary = portfolio.summary()
+    assert summary['symbols'] == 2
+    assert summary['realized_profit'] == Decimal('1999.30')
+    assert summary['total_commission'] == Decimal('1.75')
+
+    print("✓ Portfolio lot methods passed all tests")
+
+
+def test_partial_lots():
+    """测试部分消耗批次 | Test partially consumed lots"""
+    print("Testing Portfolio partial lots...")
+    portfolio = Portfolio(method='fifo')
+    portfolio.buy('XYZ', 3, 10.00)
+    portfolio.sell('XYZ', 1, 10.00)
+    portfolio.sell('XYZ', 1, 10.00)
+    portfolio.sell('XYZ', 1, 10.00)
+    position = portfolio.position('XYZ')
+    assert position['shares'] == 0
+    assert position['lot_count'] == 0
+    assert position['cost_basis'] == Decimal('0')
+
+    try:
+        portfolio.sell('XYZ', 1, 10.00)
+        assert False, "卖出超过持仓应抛出 ValueError"
+    except ValueError:
+        pass
+
+    try:
+        Portfolio(method='random')
+        assert False, "未知匹配方法应抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✓ Portfolio partial lots passed all tests")
+
+
+if __name__ == '__main__':
+    test_lot_methods()
+    test_partial_lots()
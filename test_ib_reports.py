@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+报告输出测试脚本 | Report Rendering Test Script
+
+测试文本报告与 print_transaction_summary 输出一致，以及CSV和HTML报告的内容。
+Checks text reports against print_transaction_summary and the CSV/HTML contents.
+"""
+
+import contextlib
+import csv
+import io
+
+from ib_calculator import IBStockCalculator, print_transaction_summary
+from ib_reports import ReportWriter, render_report
+
+
+class _CountingTarget(io.StringIO):
+    """记录 write 调用次数的输出目标"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def _results():
+    calculator = IBStockCalculator()
+    return [(f"U{i:04d}", calculator.calculate_profit(200, 50.0 + i % 5, 100 + i % 100, 55.0))
+            for i in range(500)]
+
+
+def test_text_report():
+    """测试文本报告 | Test text report"""
+    print("Testing text report...")
+    results = _results()
+
+    expected = io.StringIO()
+    with contextlib.redirect_stdout(expected):
+        for _, result in results:
+            print_transaction_summary(result)
+
+    target = _CountingTarget()
+    assert render_report((result for _, result in results), target) == len(results)
+    assert target.getvalue() == expected.getvalue()
+    assert target.writes < len(results) / 10
+
+    target = io.StringIO()
+    render_report(results[:1], target)
+    assert target.getvalue().startswith("\n账户 Account: U0000\n")
+
+    print("✓ text report passed all tests")
+
+
+def test_table_reports():
+    """测试CSV和HTML报告 | Test CSV and HTML reports"""
+    print("Testing CSV and HTML reports...")
+    results = _results()
+
+    target = io.StringIO()
+    render_report(results, target, 'csv')
+    rows = list(csv.DictReader(io.StringIO(target.getvalue())))
+    assert len(rows) == len(results)
+    for row, (account, result) in zip(rows, results):
+        assert row['account'] == account
+        assert row['profit'] == str(result['profit'])
+        assert row['sell_commission'] == str(result['sell_info']['commission'])
+
+    calculator = IBStockCalculator()
+    summary = calculator.calculate_multiple_transactions([
+        {'type': 'buy', 'shares': 100, 'price': 50.00},
+        {'type': 'sell', 'shares': 80, 'price': 55.00},
+    ])
+    target = io.StringIO()
+    with ReportWriter(target, 'html', title='EOD <test>') as report:
+        report.write(summary, '<acct & co>')
+        try:
+            report.write(results[0][1])
+            assert False, "混用两种摘要应报错"
+        except ValueError:
+            pass
+    page = target.getvalue()
+    assert page.startswith('<!DOCTYPE html>') and page.endswith('</html>\n')
+    assert '<title>EOD &lt;test&gt;</title>' in page
+    assert '&lt;acct &amp; co&gt;' in page
+    assert f"<td>{summary['total_profit']}</td>" in page
+    assert page.count('<tr>') == 2
+
+    try:
+        ReportWriter(io.StringIO(), 'pdf')
+        assert False, "未知格式应报错"
+    except ValueError:
+        pass
+
+    print("✓ CSV and HTML reports passed all tests")
+
+
+if __name__ == '__main__':
+    test_text_report()
+    test_table_reports()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+佣金方案测试脚本 | Commission Schedule Test Script
+
+测试阶梯费率的档位查找、月度累计和费用构成。
+Tests tier lookup, monthly accumulation and fee components of the tiered schedule.
+"""
+
+from decimal import Decimal
+
+from ib_calculator import IBStockCalculator
+from ib_schedules import FixedSchedule, TieredSchedule
+
+
+def test_fixed_schedule():
+    """测试固定费率方案 | Test fixed schedule"""
+    print("Testing FixedSchedule...")
+    schedule = FixedSchedule()
+    fees = schedule.price_fill(10000, 10.0)
+    assert fees['commission'] == IBStockCalculator().calculate_commission(10000, 10.0)
+    assert fees['total_fees'] == fees['commission']
+    print("✓ FixedSchedule passed all tests")
+
+
+def test_tiered_schedule():
+    """测试阶梯费率方案 | Test tiered schedule"""
+    print("Testing TieredSchedule...")
+    schedule = TieredSchedule(exchange_fee=0, clearing_fee=0)
+    assert schedule.rate_for_volume(0) == Decimal('0.0035')
+    assert schedule.rate_for_volume(300_000) == Decimal('0.0035')
+    assert schedule.rate_for_volume(300_001) == Decimal('0.0020')
+    assert schedule.rate_for_volume(10 ** 9) == Decimal('0.0005')
+
+    fills = [
+        {'shares': 300_000, 'price': 50.0, 'month': '2026-01'},
+        {'shares': 1, 'price': 50.0, 'month': '2026-01'},      # 累计正好300,000，仍为第一档
+        {'shares': 1000, 'price': 50.0, 'month': '2026-01'},   # 进入第二档
+        {'shares': 1000, 'price': 50.0, 'month': '2026-02'},   # 新的月份重新累计
+    ]
+    results = list(schedule.price_fills(fills))
+    assert [r['rate'] for r in results] == [
+        Decimal('0.0035'), Decimal('0.0035'), Decimal('0.0020'), Decimal('0.0035')
+    ]
+    assert results[0]['commission'] == Decimal('1050.00')
+    assert results[1]['commission'] == Decimal('0.35')
+    assert results[2]['commission'] == Decimal('2.00')
+    assert schedule.monthly_volume('2026-01') == 301_001
+
+    # 卖出收取监管费
+    sell = TieredSchedule().price_fill(1000, 100.0, side='sell', month='2026-03')
+    assert sell['exchange_fee'] == Decimal('0.30')
+    assert sell['clearing_fee'] == Decimal('0.20')
+    assert sell['regulatory_fee'] == Decimal('2.95')  # 100000 * 0.0000278 + 1000 * 0.000166
+    assert sell['total_fees'] == sell['commission'] + Decimal('3.45')
+
+    try:
+        TieredSchedule(breakpoints=(10, 5), rates=(1, 2, 3))
+        assert False, "断点未排序应抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✓ TieredSchedule passed all tests")
+
+
+def test_schedule_in_calculator():
+    """测试佣金方案接入计算器 | Test plugging schedules into the calculator"""
+    print("Testing schedules in calculate_multiple_transactions...")
+    calculator = IBStockCalculator()
+    transactions = [
+        {'type': 'buy', 'shares': 400_000, 'price': 10.0, 'month': '2026-01'},
+        {'type': 'buy', 'shares': 1000, 'price': 10.0, 'month': '2026-01'},
+        {'type': 'sell', 'shares': 1000, 'price': 12.0, 'month': '2026-01'},
+    ]
+    # 固定费率方案与默认计算一致
+    assert calculator.calculate_multiple_transactions(transactions, FixedSchedule(calculator)) == \
+        calculator.calculate_multiple_transactions(transactions)
+
+    schedule = TieredSchedule()
+    summary = calculator.calculate_multiple_transactions(transactions, schedule)
+    fees = list(TieredSchedule().price_fills(transactions))
+    assert summary['total_buy_commission'] == fees[0]['total_fees'] + fees[1]['total_fees']
+    assert summary['total_sell_commission'] == fees[2]['total_fees']
+    assert fees[1]['rate'] == Decimal('0.0020')
+    assert schedule.monthly_volume('2026-01') == 402_000
+
+    # 阶梯方案的佣金与固定费率使用同一套最低/最高限制
+    assert TieredSchedule(rates=(0.0035,) * 5).price_fill(10, 1.0)['commission'] == \
+        calculator.calculate_commission(10, 1.0)
+
+    print("✓ schedules in calculate_multiple_transactions passed all tests")
+
+
+if __name__ == '__main__':
+    test_fixed_schedule()
+    test_tiered_schedule()
+    test_schedule_in_calculator()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+计算器服务测试脚本 | Calculator Service Test Script
+
+测试微批处理、HTTP接口和流式接口的结果与直接调用计算器一致。
+Checks that batched, HTTP and streaming results match direct calculator calls.
+"""
+
+import asyncio
+import json
+
+from ib_calculator import IBStockCalculator
+from ib_service import CalculatorService, InProcessClient
+
+
+async def _http(port: int, method: str, path: str, body: bytes = b''):
+    """发送一个HTTP请求，返回 (状态码, 响应体)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    if b'Transfer-Encoding: chunked' in head:
+        chunks = []
+        while True:
+            size, _, payload = payload.partition(b'\r\n')
+            size = int(size, 16)
+            if not size:
+                break
+            chunks.append(payload[:size])
+            payload = payload[size + 2:]
+        payload = b''.join(chunks)
+    return status, payload
+
+
+def test_micro_batching():
+    """测试请求合并 | Test micro-batching"""
+    print("Testing micro-batching...")
+    calculator = IBStockCalculator()
+
+    async def run():
+        service = CalculatorService(max_batch_size=4, max_wait=0.05)
+        client = InProcessClient(service)
+        trades = [(shares, 10.0 + shares / 100) for shares in (1, 50, 100, 150, 300, 1000, 5000, 10000, 99, 7)]
+        results = await asyncio.gather(*(client.call('commission', shares=s, price=p) for s, p in trades))
+        assert results == [str(calculator.calculate_commission(s, p)) for s, p in trades]
+        assert service.stats() == {'requests': 10, 'batches': 3, 'largest_batch': 4}
+
+        mixed = await asyncio.gather(
+            client.call('buy_cost', shares=100, price=50.0),
+            client.call('profit', buy_shares=200, buy_price=50.0, sell_shares=100, sell_price=55.0),
+            client.call('break_even', buy_shares=1000, buy_price=50.0),
+            client.call('commission', shares=-1, price=10.0),
+            return_exceptions=True
+        )
+        assert mixed[0]['total_cost'] == str(calculator.calculate_buy_cost(100, 50.0)['total_cost'])
+        assert mixed[1]['profit'] == str(calculator.calculate_profit(200, 50.0, 100, 55.0)['profit'])
+        assert mixed[2] == str(calculator.calculate_break_even_price(1000, 50.0))
+        assert isinstance(mixed[3], ValueError)
+
+        # 非有限价格被拒绝；批量计算出错时只影响出错的请求
+        for price in (float('nan'), float('inf')):
+            try:
+                await client.call('commission', shares=100, price=price)
+                assert False, "非有限价格应报错"
+            except ValueError:
+                pass
+        results = service.evaluate_batch([
+            ('commission', {'shares': 100, 'price': 50.0}),
+            ('commission', {'shares': 10 ** 30, 'price': 1e300}),
+            ('break_even', {'buy_shares': 1000, 'buy_price': 50.0}),
+            ('break_even', {'buy_shares': 10 ** 30, 'buy_price': 1e300}),
+        ])
+        assert results[0] == str(calculator.calculate_commission(100, 50.0))
+        assert results[2] == str(calculator.calculate_break_even_price(1000, 50.0))
+        assert isinstance(results[1], ValueError) and isinstance(results[3], ValueError)
+
+        # 非批量操作同样校验股数和价格
+        invalid = service.evaluate_batch([
+            ('buy_cost', {'shares': 100, 'price': 'abc'}),
+            ('sell_proceeds', {'shares': 0, 'price': 50.0}),
+            ('profit', {'buy_shares': 100, 'buy_price': float('nan'), 'sell_shares': 50, 'sell_price': 55.0}),
+            ('transactions', {'transactions': [{'type': 'buy', 'shares': 100, 'price': 'abc'}]}),
+            ('transactions', {'transactions': [{'type': 'buy', 'shares': 100}]}),
+        ])
+        assert all(isinstance(result, ValueError) for result in invalid)
+        await service.close()
+
+    asyncio.run(run())
+    print("✓ micro-batching passed all tests")
+
+
+def test_http_endpoints():
+    """测试HTTP接口 | Test HTTP endpoints"""
+    print("Testing HTTP endpoints...")
+    calculator = IBStockCalculator()
+    transactions = [
+        {'type': 'buy', 'shares': 100, 'price': 50.00},
+        {'type': 'buy', 'shares': 50, 'price': 52.00},
+        {'type': 'sell', 'shares': 80, 'price': 55.00},
+        {'type': 'sell', 'shares': 30, 'price': 57.00},
+    ]
+
+    async def run():
+        service = CalculatorService()
+        server = await service.serve('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        status, body = await _http(port, 'POST', '/commission',
+                                   json.dumps([{'shares': 100, 'price': 50.0}, {'shares': 1}]).encode())
+        assert status == 200
+        results = json.loads(body)
+        assert results[0] == str(calculator.calculate_commission(100, 50.0))
+        assert 'error' in results[1]
+
+        status, body = await _http(port, 'POST', '/transactions',
+                                   json.dumps({'transactions': transactions}).encode())
+        expected = calculator.calculate_multiple_transactions(transactions)
+        assert status == 200
+        assert json.loads(body)['total_profit'] == str(expected['total_profit'])
+
+        ledger = b''.join(json.dumps(t).encode() + b'\n' for t in transactions)
+        status, body = await _http(port, 'POST', '/transactions/stream?summary_every=3', ledger)
+        summaries = [json.loads(line) for line in body.splitlines()]
+        assert status == 200
+        assert [s['transaction_count'] for s in summaries] == [3, 4]
+        assert summaries[-1]['total_profit'] == str(expected['total_profit'])
+
+        # 无效的行返回错误行，分块响应仍然正常结束
+        for bad in (b'{"type":"buy","shares":100,"price":"abc"}', b'{"type":"buy","shares":100,"price":NaN}',
+                    b'{"type":"buy","shares":0,"price":50.0}', b'[1, 2]'):
+            status, body = await _http(port, 'POST', '/transactions/stream?summary_every=1', ledger + bad + b'\n')
+            lines = [json.loads(line) for line in body.splitlines()]
+            assert status == 200
+            assert 'error' in lines[-1]
+            assert all(line['transaction_count'] <= 4 for line in lines[:-1])
+
+        assert (await _http(port, 'GET', '/missing'))[0] == 404
+        assert (await _http(port, 'GET', '/commission'))[0] == 405
+        assert (await _http(port, 'POST', '/commission', b'{'))[0] == 400
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"POST /commission HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        await writer.drain()
+        assert (await reader.read()).startswith(b'HTTP/1.1 400')
+        writer.close()
+        status, body = await _http(port, 'GET', '/health')
+        assert status == 200 and json.loads(body)['status'] == 'ok'
+
+        server.close()
+        await server.wait_closed()
+        await service.close()
+
+    asyncio.run(run())
+    print("✓ HTTP endpoints passed all tests")
+
+
+def test_stream_client():
+    """测试进程内流式客户端 | Test in-process streaming client"""
+    print("Testing in-process streaming...")
+    calculator = IBStockCalculator()
+    transactions = [{'type': 'buy', 'shares': 10, 'price': 20.0 + i} for i in range(2500)]
+    transactions.append({'type': 'sell', 'shares': 5000, 'price': 30.0})
+
+    async def run():
+        service = CalculatorService()
+        summaries = await InProcessClient(service).stream_transactions(transactions, summary_every=1000)
+        await service.close()
+        return summaries
+
+    summaries = asyncio.run(run())
+    assert [s['transaction_count'] for s in summaries] == [1000, 2000, 2501]
+    expected = calculator.calculate_multiple_transactions(transactions)
+    assert summaries[-1]['total_profit'] == str(expected['total_profit'])
+    print("✓ in-process streaming passed all tests")
+
+
+if __name__ == '__main__':
+    test_micro_batching()
+    test_http_endpoints()
+    test_stream_client()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+二进制交易日志测试脚本 | Binary Trade Log Test Script
+
+测试写入、内存映射读取和重放结果与 calculate_multiple_transactions 一致。
+Checks write/read round trips and that replays match calculate_multiple_transactions.
+"""
+
+import os
+import tempfile
+
+from ib_calculator import IBStockCalculator
+from ib_tradelog import TradeLogReader, TradeLogWriter
+
+
+TRANSACTIONS = [
+    {'type': 'buy', 'shares': 100, 'price': 50.00, 'timestamp': 1},
+    {'type': 'buy', 'shares': 50, 'price': 52.125, 'timestamp': 2},
+    {'type': 'sell', 'shares': 80, 'price': 55.00, 'timestamp': 3},
+    {'type': 'sell', 'shares': 30, 'price': 57.000001, 'timestamp': 4},
+]
+
+
+def test_trade_log_round_trip():
+    """测试交易日志读写 | Test trade log round trip"""
+    print("Testing TradeLogWriter / TradeLogReader...")
+    calculator = IBStockCalculator()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trades.ibtl')
+        with TradeLogWriter(path) as writer:
+            writer.write_many(TRANSACTIONS)
+        assert os.path.getsize(path) == 16 + 24 * len(TRANSACTIONS)
+
+        with TradeLogReader(path) as reader:
+            assert len(reader) == len(TRANSACTIONS)
+            assert list(reader) == [(t['type'], t['shares'], t['price']) for t in TRANSACTIONS]
+            assert [r[3] for r in reader.records()] == [1, 2, 3, 4]
+            assert reader.replay(calculator) == calculator.calculate_multiple_transactions(TRANSACTIONS)
+
+            cents = reader.commissions_cents(calculator)
+            assert [int(c) for c in cents] == [
+                int(calculator.calculate_commission(t['shares'], t['price']) * 100) for t in TRANSACTIONS
+            ]
+            columns = reader.columns()
+            assert list(columns['shares']) == [100, 50, 80, 30]
+            assert list(calculator.calculate_commissions_cents_micros(
+                [100, 50, 80, 30], [50000000, 52125000, 55000000, 57000001])) == [int(c) for c in cents]
+            del columns, cents
+
+        # 未迭代完的 records() 迭代器不妨碍关闭
+        reader = TradeLogReader(path)
+        pending = reader.records()
+        assert next(pending)[1] == 100
+        reader.close()
+        assert list(pending) == []
+
+        with open(path, 'r+b') as handle:
+            handle.write(b'XXXX')
+        try:
+            TradeLogReader(path)
+            assert False, "损坏的文件头应抛出 ValueError"
+        except ValueError:
+            pass
+
+    print("✓ trade log passed all tests")
+
+
+if __name__ == '__main__':
+    test_trade_log_round_trip()
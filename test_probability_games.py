@@ -6,6 +6,10 @@
 Quick test of all game basic functions.
 """
 
+import json
+import random
+
+import probability_games
 from probability_games import (
     MontyHallGame,
     NumberGuessingGame,
@@ -37,6 +41,140 @@ def test_monty_hall():
     print("✓ MontyHallGame passed all tests")
 
 
+def test_monty_hall_simulation():
+    """测试三门问题批量模拟 | Test Monty Hall batch simulation"""
+    print("Testing MontyHallGame.simulate...")
+    game = MontyHallGame()
+    
+    switch = game.simulate(200000, 'switch', seed=1)
+    stay = game.simulate(200000, 'stay', seed=1)
+    assert switch['wins'] + switch['losses'] == 200000
+    low, high = switch['confidence_interval']
+    assert low < 2 / 3 < high
+    low, high = stay['confidence_interval']
+    assert low < 1 / 3 < high
+    assert game.simulate(1000, 'switch', seed=7) == game.simulate(1000, 'switch', seed=7)
+    assert game.car_door is None
+    
+    # 不指定种子时从游戏的 rng 派生，带种子的 rng 可复现
+    seeded_rng = random.Random(11)
+    seeded = MontyHallGame(rng=seeded_rng).simulate(1000)
+    assert MontyHallGame(rng=random.Random(11)).simulate(1000) == seeded
+    assert seeded == MontyHallGame().simulate(1000, seed=random.Random(11).getrandbits(64))
+    random.seed(4)
+    default_run = MontyHallGame().simulate(1000)
+    random.seed(4)
+    assert MontyHallGame().simulate(1000) == default_run
+    
+    # 与逐局交互式游戏的胜率一致
+    random.seed(3)
+    interactive_wins = 0
+    for _ in range(3000):
+        game.new_game()
+        game.make_choice(random.choice(game.doors))
+        interactive_wins += game.final_decision(switch=True)['won']
+    assert abs(interactive_wins / 3000 - switch['win_rate']) < 0.03
+    
+    # 没有numpy时的纯Python实现
+    saved, probability_games.np = probability_games.np, None
+    try:
+        fallback = game.simulate(50000, 'switch', seed=2)
+        assert fallback == game.simulate(50000, 'switch', seed=2)
+        low, high = fallback['confidence_interval']
+        assert low < 2 / 3 < high
+    finally:
+        probability_games.np = saved
+    
+    try:
+        game.simulate(10, 'maybe')
+        assert False, "未知策略应报错"
+    except ValueError:
+        pass
+    
+    print("✓ MontyHallGame.simulate passed all tests")
+
+
+def test_monty_hall_variants():
+    """测试N门、k门和不知情主持人的三门问题 | Test N-door, k-opened and ignorant-host variants"""
+    print("Testing MontyHallGame variants...")
+    from fractions import Fraction
+    
+    game = MontyHallGame(1000, 998)
+    exact = game.exact_probabilities()
+    assert exact['switch'] == Fraction(999, 1000) and exact['stay'] == Fraction(1, 1000)
+    game.new_game()
+    result = game.make_choice(500)
+    assert len(result['opened_doors']) == 998 and game.car_door not in result['opened_doors']
+    assert len(result['remaining_doors']) == 2 and 500 in result['remaining_doors']
+    assert sorted(result['remaining_doors']) == sorted({500, game.car_door})
+    assert result['remaining_doors'][-1] == max(500, game.car_door)
+    
+    # 剩余的门按需计算，与逐门筛选的结果一致 | Lazy remaining doors match a full scan
+    huge = MontyHallGame(10 ** 9, 5, rng=random.Random(2), lazy_doors=True)
+    huge.new_game()
+    remaining = huge.make_choice(1)['remaining_doors']
+    assert len(remaining) == 10 ** 9 - 5 and 1 in remaining
+    assert all(door not in remaining for door in huge.opened_doors)
+    small = MontyHallGame(10, 4, rng=random.Random(3), lazy_doors=True)
+    small.new_game()
+    remaining = small.make_choice(7)['remaining_doors']
+    expected = [door for door in range(1, 11) if door not in small.opened_doors]
+    assert list(remaining) == expected and remaining == expected
+    assert [remaining[i] for i in range(-len(expected), len(expected))] == expected * 2
+    
+    # 默认返回列表，可以直接JSON序列化 | Lists by default, JSON serializable
+    plain = MontyHallGame(10, 4, rng=random.Random(3))
+    assert plain.new_game()['doors'] == list(range(1, 11))
+    plain_result = plain.make_choice(7)
+    assert plain_result['remaining_doors'] == expected and type(plain_result['remaining_doors']) is list
+    json.dumps(plain_result)
+    for invalid in (1.5, 0, 11, '3', None):
+        try:
+            plain.make_choice(invalid)
+            assert False, "无效的门应报错 | invalid door should raise"
+        except ValueError:
+            pass
+    assert plain.make_choice(2.0)['player_choice'] == 2
+    assert game.final_decision(True)['final_choice'] not in result['opened_doors']
+    
+    ignorant = MontyHallGame(5, 2, host_knows=False)
+    exact = ignorant.exact_probabilities()
+    assert exact == {'stay': Fraction(1, 3), 'switch': Fraction(1, 3), 'car_revealed': Fraction(2, 5)}
+    
+    for variant in (MontyHallGame(5, 2), ignorant, MontyHallGame(1000, 10, host_knows=False)):
+        for strategy in ('switch', 'stay'):
+            result = variant.simulate(400000, strategy, seed=5)
+            low, high = result['confidence_interval']
+            assert low < result['exact_win_rate'] < high, (variant.num_doors, strategy, result)
+            revealed = float(variant.exact_probabilities()['car_revealed'])
+            assert abs(result['voided'] / 400000 - revealed) < 0.005
+    
+    # 交互式游戏的作废局
+    random.seed(11)
+    voided = 0
+    for _ in range(2000):
+        ignorant.new_game()
+        voided += ignorant.make_choice(1)['car_revealed']
+    assert 0.35 < voided / 2000 < 0.45
+    
+    ignorant.new_game()
+    choice = ignorant.make_choice(2)
+    try:
+        ignorant.final_decision(True, door=choice['opened_doors'][0])
+        assert False, "换到打开的门应报错"
+    except ValueError:
+        pass
+    
+    for doors, opened in ((2, 1), (5, 4), (5, 0)):
+        try:
+            MontyHallGame(doors, opened)
+            assert False, "无效的门数应报错"
+        except ValueError:
+            pass
+    
+    print("✓ MontyHallGame variants passed all tests")
+
+
 def test_number_guessing():
     """测试猜数字游戏 | Test Number Guessing Game"""
     print("Testing NumberGuessingGame...")
@@ -103,6 +241,42 @@ def test_slot_machine():
     print("✓ SlotMachineSimulator passed all tests")
 
 
+def test_slot_machine_streaming():
+    """测试老虎机的累计统计 | Test slot machine running statistics"""
+    print("Testing SlotMachineSimulator streaming statistics...")
+    streaming = SlotMachineSimulator(rng=random.Random(21), keep_history=False)
+    recorded = SlotMachineSimulator(rng=random.Random(21))
+    for _ in range(20000):
+        streaming.spin()
+        recorded.spin()
+    assert streaming.spin_history == [] and len(recorded.spin_history) == 20000
+    
+    stats = streaming.get_statistics()
+    assert stats == recorded.get_statistics()
+    assert stats['total_spins'] == 20000 and stats['total_symbols'] == 60000
+    
+    # 与扫描完整历史的结果一致
+    symbol_counts = {symbol: 0 for symbol in recorded.symbols}
+    win_types = {'jackpot': 0, 'small_win': 0, 'no_win': 0}
+    for spin in recorded.spin_history:
+        for symbol in spin['result']:
+            symbol_counts[symbol] += 1
+        win_types[spin['win_type']] += 1
+    assert stats['symbol_counts'] == symbol_counts and stats['win_types'] == win_types
+    
+    # 公平的机器通过拟合优度检验，概率不符时p值很小
+    assert stats['degrees_of_freedom'] == 4
+    assert stats['p_value'] > 0.001
+    streaming.probabilities = [0.2] * 5
+    biased = streaming.get_statistics()
+    assert biased['chi_square'] > stats['chi_square'] and biased['p_value'] < 1e-6
+    
+    stats['symbol_counts']['🍎'] = -1
+    assert recorded.get_statistics()['symbol_counts']['🍎'] == symbol_counts['🍎']
+    
+    print("✓ SlotMachineSimulator streaming statistics passed all tests")
+
+
 def test_all_games():
     """运行所有测试 | Run all tests"""
     print("=" * 60)
@@ -112,9 +286,12 @@ def test_all_games():
     
     try:
         test_monty_hall()
+        test_monty_hall_simulation()
+        test_monty_hall_variants()
         test_number_guessing()
         test_probability_race()
         test_slot_machine()
+        test_slot_machine_streaming()
         
         print()
         print("=" * 60)
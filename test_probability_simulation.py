@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+并行模拟测试脚本 | Parallel Simulation Test Script
+
+测试相同种子在不同进程数下得到相同结果，以及合并后的统计量合理。
+Checks that a seed gives identical results for any worker count and that merged statistics are sane.
+"""
+
+import random
+
+from probability_games import SlotMachineSimulator
+from probability_simulation import GAMES, RunningStats, block_seed, merge_counts, run_simulation, run_until
+
+
+def test_reproducible_across_workers():
+    """测试结果与进程数无关 | Test results do not depend on worker count"""
+    print("Testing reproducibility across workers...")
+    for game in GAMES:
+        serial = run_simulation(game, 2500, seed=7, workers=1, block_size=400)
+        parallel = run_simulation(game, 2500, seed=7, workers=3, block_size=400)
+        assert serial == parallel, game
+        assert serial['blocks'] == 7 and serial['games'] == 2500
+        assert run_simulation(game, 2500, seed=8, workers=1, block_size=400) != serial
+
+    assert block_seed(7, 0) != block_seed(7, 1) != block_seed(8, 0)
+    print("✓ reproducibility across workers passed all tests")
+
+
+def test_merged_statistics():
+    """测试合并后的统计量 | Test merged statistics"""
+    print("Testing merged statistics...")
+    monty = run_simulation('monty_hall', 200000, seed=1, block_size=50000, strategy='switch')
+    low, high = monty['confidence_interval']
+    assert low < 2 / 3 < high
+
+    guessing = run_simulation('number_guessing', 2000, seed=1, workers=1)
+    assert guessing['wins'] == 2000 and guessing['mean_attempts'] <= 7
+
+    race = run_simulation('probability_race', 500, seed=1, workers=1, strategy='safe')
+    assert race['success_rate'] == 1.0 and 5 <= race['mean_turns'] <= 10
+
+    slot = run_simulation('slot_machine', 6000, seed=1, workers=1, block_size=1000)
+    assert sum(slot['symbol_counts'].values()) == 18000
+    assert sum(slot['win_types'].values()) == 6000
+    assert abs(slot['symbol_frequencies']['🍎'] - 0.35) < 0.02
+
+    # 游戏使用传入的随机数生成器，不影响全局状态
+    random.seed(3)
+    expected = random.random()
+    random.seed(3)
+    SlotMachineSimulator(rng=random.Random(1)).spin()
+    assert random.random() == expected
+
+    assert merge_counts([{'a': 1, 'b': {'x': 2}}, {'a': 3, 'b': {'x': 1, 'y': 4}}]) == \
+        {'a': 4, 'b': {'x': 3, 'y': 4}}
+
+    for game, options in (('chess', {}), ('number_guessing', {'strategy': 'psychic'})):
+        try:
+            run_simulation(game, 10, workers=1, **options)
+            assert False, "无效参数应报错"
+        except ValueError:
+            pass
+
+    print("✓ merged statistics passed all tests")
+
+
+def test_running_stats():
+    """测试Welford累计值 | Test Welford accumulators"""
+    print("Testing RunningStats...")
+    rng = random.Random(4)
+    values = [1e6 + rng.uniform(0, 10) for _ in range(1000)]
+    whole = RunningStats()
+    for value in values:
+        whole.add(value)
+    mean = sum(values) / len(values)
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    assert abs(whole.mean - mean) < 1e-6 and abs(whole.variance - variance) < 1e-6
+
+    left, right = RunningStats(), RunningStats()
+    for value in values[:300]:
+        left.add(value)
+    for value in values[300:]:
+        right.add(value)
+    merged = left + right
+    assert merged.count == 1000
+    assert abs(merged.mean - whole.mean) < 1e-6 and abs(merged.variance - whole.variance) < 1e-6
+    assert sum([left, right]) == merged
+
+    bernoulli = RunningStats()
+    for value in [1] * 30 + [0] * 70:
+        bernoulli.add(value)
+    exact = RunningStats.from_bernoulli(30, 100)
+    assert abs(bernoulli.mean - exact.mean) < 1e-12 and abs(bernoulli.m2 - exact.m2) < 1e-9
+
+    print("✓ RunningStats passed all tests")
+
+
+def test_adaptive_simulation():
+    """测试自适应模拟 | Test adaptive simulation"""
+    print("Testing adaptive simulation...")
+    result = run_until('monty_hall', 0.01, seed=3, batch_size=2000)
+    assert result['converged'] and result['width'] < 0.01
+    assert result['trials'] % 2000 == 0 and result['trials'] < 100000
+    low, high = result['confidence_interval']
+    assert low < 2 / 3 < high
+
+    # 与进程数无关，且等于同样局数的 run_simulation
+    parallel = run_until('monty_hall', 0.01, seed=3, batch_size=2000, workers=3)
+    assert parallel == result
+    fixed = run_simulation('monty_hall', result['trials'], seed=3, workers=1, block_size=2000)
+    assert fixed['wins'] == result['wins']
+
+    # 更小的容差需要更多的局数
+    tighter = run_until('slot_machine', 0.01, seed=3, batch_size=500)
+    looser = run_until('slot_machine', 0.04, seed=3, batch_size=500)
+    assert looser['trials'] < tighter['trials'] and tighter['statistic'] == 'jackpot'
+
+    capped = run_until('number_guessing', 1e-6, seed=3, batch_size=300, max_trials=1000)
+    assert not capped['converged'] and capped['trials'] == 1000 and capped['blocks'] == 4
+
+    # 稀有事件: 第一批没有胜局时区间不会退化为0宽度而提前停止
+    # Rare event: a first batch without wins must not collapse the interval and stop early
+    rare = run_until('monty_hall', 0.01, seed=0, batch_size=200, num_doors=1000, strategy='stay')
+    assert rare['trials'] > 200 and rare['wins'] > 0
+    low, high = rare['confidence_interval']
+    assert low < 1 / 1000 < high and high - low < 0.01
+    for seed in range(5):
+        loose = run_until('monty_hall', 0.5, seed=seed, batch_size=50, num_doors=1000,
+                          strategy='stay', min_trials=3000)
+        assert loose['converged'] and (loose['wins'] > 0 or loose['trials'] >= 3000)
+
+    try:
+        run_until('probability_race', 0.1, statistic='jackpot', batch_size=10)
+        assert False, "未知统计量应报错"
+    except ValueError:
+        pass
+
+    print("✓ adaptive simulation passed all tests")
+
+
+if __name__ == '__main__':
+    test_reproducible_across_workers()
+    test_merged_statistics()
+    test_running_stats()
+    test_adaptive_simulation()